@@ -1,9 +1,12 @@
 from blueprints.login.login import login_blueprint
 from dash_apps.run_together.run_together_app import run_together_app
 from blueprints.login.aad import authorisation
+from blueprints.login.server_session import init_server_session
+from blueprints.webhook.webhook import webhook_blueprint
+from dash_apps.run_together.job_worker import start_job_worker
 
 from os import environ as env
-from flask import Flask, session
+from flask import Flask
 from dash_extensions.enrich import DashProxy, MultiplexerTransform
 
 
@@ -12,8 +15,11 @@ from dash_extensions.enrich import DashProxy, MultiplexerTransform
 # Create the Flask App
 app = Flask(__name__)
 app.config["SECRET_KEY"] = env["cookiePassword"]
+# Session saved on the server, the cookie only contains the signed session id
+init_server_session(app)
 
 app.register_blueprint(login_blueprint)
+app.register_blueprint(webhook_blueprint)
 # To use the small icon in the app & use static file in a sub-folder of static
 # Define external stylesheets, including Font Awesome and a local CSS file
 external_stylesheets = [
@@ -36,14 +42,32 @@ dash_app = DashProxy(
     pages_folder="./dash_apps/run_together/pages/",  # Specify the folder containing Dash pages
     routes_pathname_prefix="/run-together/",  # Set the URL prefix for Dash routes
     use_pages=True,  # Enable the use of pages for organizing Dash layouts
+    # The layouts need the session of the athlete: no validation layout built on the
+    # first request (ex: a webhook event), the components are created by callbacks
+    suppress_callback_exceptions=True,
     assets_folder="./static",  # Specify the folder for static assets (e.g., CSS, images)
     external_stylesheets=external_stylesheets,  # Add external stylesheets to the Dash application
     external_scripts=external_script,  # Add external scripts to the Dash application
 )
 
 # Flask App need registration
-excluded = ["login.landing", "login.strava_callback", "static"]
-app = authorisation(app, session, excluded)
+excluded = [
+    "login.landing",
+    "login.strava_callback",
+    "webhook.validate_subscription",
+    "webhook.receive_event",
+    "static",
+]
+# Dash JavaScript / CSS files, served without login
+public_path_prefixes = [
+    f"{dash_app.config.routes_pathname_prefix}_dash-component-suites/",
+    f"{dash_app.config.routes_pathname_prefix}assets/",
+    f"{dash_app.config.routes_pathname_prefix}_favicon.ico",
+]
+app = authorisation(app, excluded, public_path_prefixes=public_path_prefixes)
+
+# Worker getting the activities pushed by the Strava webhook (see job_worker)
+start_job_worker()
 
 # For the deployement of the heroku application
 server = dash_app.server
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# The benchmarks run on synthetic data: the activity store and the caches are
+# created in a temporary folder, no call is sent to STRAVA API
+os.environ.setdefault("dataDir", tempfile.mkdtemp(prefix="run_together_bench_"))
+os.environ.setdefault("stravaClientId", "0")
+os.environ.setdefault("stravaClientSecret", "benchmark")
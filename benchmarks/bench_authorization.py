@@ -0,0 +1,68 @@
+"""
+Overhead of the login check on each request, measured with timeit inside a request
+context of a logged in user: a view (session checked) and a Dash asset (public
+prefix). The previous check (each view function wrapped, session read through the
+flask.session proxy) is the reference.
+
+    python -m benchmarks.bench_authorization
+"""
+import timeit
+from typing import Callable
+
+import flask
+from flask import Flask
+from flask.sessions import SessionMixin
+
+from blueprints.login.aad import (
+    authorisation,
+    is_user_authenticate,
+    no_logged_message,
+)
+
+NUMBER = 200000
+PUBLIC_PATH_PREFIXES = ["/home/_dash-component-suites/", "/home/assets/"]
+
+
+def create_app() -> Flask:
+    app = Flask(__name__)
+    app.secret_key = "benchmark"
+    app.add_url_rule("/home/", endpoint="home", view_func=lambda: "home")
+    app.add_url_rule("/home/assets/<path:path>", endpoint="assets", view_func=str)
+    return app
+
+
+def authorize_view(func: Callable, session: SessionMixin) -> Callable:
+    """Previous check: each view function wrapped"""
+
+    def check_authorization(*args, **kwargs):
+        if is_user_authenticate(session=session):
+            return func(*args, **kwargs)
+        return no_logged_message
+
+    return check_authorization
+
+
+def get_time_us(app: Flask, path: str, check) -> float:
+    with app.test_request_context(path):
+        flask.session["user"] = {"id": 1}
+        return min(timeit.repeat(check, number=NUMBER, repeat=5)) / NUMBER * 1e6
+
+
+def main():
+    app = authorisation(
+        create_app(), excluded=[], public_path_prefixes=PUBLIC_PATH_PREFIXES
+    )
+    (check_authorization,) = app.before_request_funcs[None]
+    view_wrapped = authorize_view(lambda: None, flask.session)
+
+    print(f"{'check':<24} {'path':<24} {'time':>8}")
+    for name, path, check in [
+        ("per-view wrapping", "/home/", view_wrapped),
+        ("before_request gate", "/home/", check_authorization),
+        ("before_request gate", "/home/assets/style.css", check_authorization),
+    ]:
+        print(f"{name:<24} {path:<24} {get_time_us(app, path, check):>6.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Size of the JSON of the heart rate figure and time to build and serialize it, for
+streams of 1k, 10k and 50k samples: every sample
+against the stream downsampled with LTTB (see get_graph_stream).
+
+    python -m benchmarks.bench_graph_stream
+"""
+import logging
+
+import plotly
+import plotly.graph_objects as go
+
+from benchmarks.synthetic import best_time_ms, make_stream
+from dash_apps.run_together.activity_stream import ActivityStream
+from dash_apps.run_together.components.activity_details import (
+    get_graph_heart_rate,
+    get_graph_stream,
+)
+
+SIZES = [1000, 10000, 50000]
+
+
+def get_figure_all_samples(activity_stream: ActivityStream) -> go.Figure:
+    """Same graph with every sample of the stream"""
+    return get_graph_heart_rate(activity_stream).figure
+
+
+def get_figure_downsampled(activity_stream: ActivityStream) -> go.Figure:
+    return get_graph_heart_rate(get_graph_stream(activity_stream)).figure
+
+
+def main():
+    print(f"{'samples':>8} {'graph':<12} {'points':>7} {'JSON':>9} {'time':>8}")
+    for n_samples in SIZES:
+        activity_stream = ActivityStream.from_strava(make_stream(n_samples))
+        for name, get_figure in [
+            ("all samples", get_figure_all_samples),
+            ("LTTB", get_figure_downsampled),
+        ]:
+            figure = get_figure(activity_stream)
+            size_kb = len(plotly.io.to_json(figure)) / 1024
+            time_ms = best_time_ms(
+                lambda: plotly.io.to_json(get_figure(activity_stream))
+            )
+            print(
+                f"{n_samples:>8} {name:<12} {len(figure.data[0].x):>7} "
+                f"{size_kb:>7.1f}KB {time_ms:>6.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
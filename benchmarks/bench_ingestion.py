@@ -0,0 +1,68 @@
+"""
+Ingestion of a year of activities from a BatchedResultsIterator of stravalib: pages
+fetched and time from the batch to the DataFrame.
+The pages are served by a local result fetcher (no call to STRAVA API), the
+previous ingestion (list() for the count then a second iteration with
+activity.dict()) is the reference.
+
+    python -m benchmarks.bench_ingestion
+"""
+import logging
+from datetime import datetime
+
+from stravalib import model
+from stravalib.client import BatchedResultsIterator, Client
+
+from benchmarks.synthetic import best_time_ms, make_activities
+from dash_apps.run_together.strava_manager import (
+    get_strava_activities_columns,
+    get_strava_activities_pandas,
+    get_strava_activity_column,
+)
+
+N_ACTIVITIES = 2000
+
+
+def get_columns_two_passes(activities: BatchedResultsIterator):
+    """Previous ingestion: the batch is iterated twice, each activity serialized"""
+    logging.info(f"Retrieve {len(list(activities))} activities")
+    columns = get_strava_activity_column()
+    data = []
+    for activity in activities:
+        activity_dict = activity.dict()
+        data.append([activity.id] + [activity_dict.get(x) for x in columns])
+    return data
+
+
+def main():
+    raw_activities = make_activities(
+        N_ACTIVITIES, start=datetime(2024, 1, 1), end=datetime(2024, 12, 31)
+    )
+    pages = [0]
+
+    def result_fetcher(page: int, per_page: int):
+        pages[0] += 1
+        return raw_activities[(page - 1) * per_page : page * per_page]
+
+    def get_batch() -> BatchedResultsIterator:
+        return BatchedResultsIterator(
+            entity=model.Activity, bind_client=Client(), result_fetcher=result_fetcher
+        )
+
+    print(f"{N_ACTIVITIES} activities, pages of 200")
+    for name, get_columns in [
+        ("two passes + dict()", get_columns_two_passes),
+        ("single pass columns", lambda batch: get_strava_activities_columns(batch)[0]),
+    ]:
+        pages[0] = 0
+        get_strava_activities_pandas(get_columns(get_batch()))
+        page_count = pages[0]
+        time_ms = best_time_ms(
+            lambda: get_strava_activities_pandas(get_columns(get_batch())), repeat=3
+        )
+        print(f"  {name:<22} {page_count:>3} page fetches  {time_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
@@ -0,0 +1,121 @@
+"""
+Rendering of the monthly calendar (cache of the fragments bypassed) for a month with
+30 and 200 activities: bucketing of the activities per day and build of the whole
+component tree. The previous bucketing (merge of the days with the activities, one
+mask per day and iterrows) is the reference.
+The activities are served by a local StravaManager (no activity store, no call to
+STRAVA API).
+
+    python -m benchmarks.bench_monthly_calendar
+"""
+import logging
+from datetime import date, datetime
+from unittest import mock
+
+import pandas as pd
+from stravalib import model
+from stravalib.client import BatchedResultsIterator, Client
+
+from benchmarks.synthetic import best_time_ms, make_activities
+from dash_apps.run_together.components import calendar_training
+from dash_apps.run_together.components.calendar_training import (
+    get_activities_by_day,
+    get_monthly_calendar,
+)
+from dash_apps.run_together.strava_manager import (
+    get_strava_activities_columns,
+    get_strava_activities_pandas,
+)
+
+YEAR, MONTH = 2024, "MAY"
+SIZES = [30, 200]
+
+
+class LocalStravaManager:
+    """StravaManager serving the activities of a DataFrame, without zones"""
+
+    def __init__(self, activities_df: pd.DataFrame):
+        self.activities_df = activities_df
+
+    def get_activities_between(self, start_date: date, end_date: date):
+        start_date_local = self.activities_df["start_date_local"].dt.date
+        return self.activities_df[
+            (start_date_local >= start_date) & (start_date_local <= end_date)
+        ].copy()
+
+    def get_zones_per_bucket(self, period: str, start_date: date, end_date: date):
+        return {"heartrate": pd.DataFrame(), "pace": pd.DataFrame()}
+
+
+def get_activities_df(n_activities: int) -> pd.DataFrame:
+    raw_activities = make_activities(
+        n_activities, start=datetime(2024, 4, 29), end=datetime(2024, 6, 2, 23)
+    )
+    batch = BatchedResultsIterator(
+        entity=model.Activity,
+        bind_client=Client(),
+        result_fetcher=lambda page, per_page: raw_activities if page == 1 else [],
+    )
+    return get_strava_activities_pandas(get_strava_activities_columns(batch)[0])
+
+
+def get_activities_by_day_merge(activities_df: pd.DataFrame, days: pd.DatetimeIndex):
+    """Previous bucketing: merge with the days then one mask per day"""
+    month_df = pd.DataFrame({"date": days})
+    month_df["date_str"] = month_df["date"].dt.strftime("%Y-%m-%d")
+    activities_df["start_date_local_str"] = activities_df[
+        "start_date_local"
+    ].dt.strftime("%Y-%m-%d")
+    full_calendar = pd.merge(
+        left=month_df,
+        right=activities_df,
+        left_on="date_str",
+        right_on="start_date_local_str",
+        how="left",
+    )
+    full_calendar["week_number"] = (
+        full_calendar["date"].dt.to_period("W").apply(lambda x: x.week)
+    )
+    full_calendar["day"] = (
+        full_calendar["date"].dt.to_period("D").apply(lambda x: x.day)
+    )
+    activities_by_day = {}
+    for week_number, week_data in full_calendar.groupby("week_number"):
+        for day in week_data.day.unique():
+            day_activities = week_data[
+                (week_data.day == day) & (~week_data.id.isna())
+            ].copy()
+            activities_by_day[(week_number, day)] = [
+                (activity.type, activity.distance_km)
+                for _, activity in day_activities.iterrows()
+            ]
+    return activities_by_day
+
+
+def main():
+    days = pd.date_range(start="2024-04-29", end="2024-06-02", freq="D")
+    print(f"{MONTH} {YEAR}, {len(days)} days")
+    print(f"{'activities':>10} {'merge + masks':>14} {'groupby':>9} {'calendar':>9}")
+    for n_activities in SIZES:
+        activities_df = get_activities_df(n_activities)
+        merge_ms = best_time_ms(
+            lambda: get_activities_by_day_merge(activities_df.copy(), days)
+        )
+        groupby_ms = best_time_ms(lambda: get_activities_by_day(activities_df))
+        with mock.patch.object(
+            calendar_training,
+            "StravaManager",
+            lambda: LocalStravaManager(activities_df),
+        ):
+            calendar_ms = best_time_ms(
+                lambda: get_monthly_calendar.__wrapped__(YEAR, MONTH)
+            )
+        print(
+            f"{n_activities:>10} {merge_ms:>12.1f}ms {groupby_ms:>7.1f}ms "
+            f"{calendar_ms:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
@@ -0,0 +1,57 @@
+"""
+Payload of the activity polyline sent to Leaflet and time of its simplification,
+for streams of 1k, 10k and 50k GPS points: every point (previous map) against
+the level of detail of the zoom fitting the activity and of the maximum zoom.
+
+    python -m benchmarks.bench_polyline
+"""
+import json
+import logging
+
+import numpy as np
+
+from benchmarks.synthetic import best_time_ms, make_stream
+from dash_apps.run_together.activity_stream import ActivityStream
+from dash_apps.run_together.components.activity_details import (
+    MAP_SIZE,
+    get_polyline_positions,
+)
+from dash_apps.run_together.polyline_simplification import (
+    encode_positions,
+    get_fit_zoom,
+)
+
+SIZES = [1000, 10000, 50000]
+
+
+def get_json_kb(value) -> float:
+    return len(json.dumps(value, separators=(",", ":"))) / 1024
+
+
+def main():
+    print(
+        f"{'points':>7} {'all points':>11} {'zoom':>5} {'kept':>6} {'JSON':>9} "
+        f"{'encoded':>9} {'time':>8}"
+    )
+    for n_points in SIZES:
+        activity_stream = ActivityStream.from_strava(make_stream(n_points))
+        all_kb = get_json_kb(activity_stream.get_latlng_list())
+        fit_zoom = get_fit_zoom(
+            bounds=activity_stream.bounds, width=MAP_SIZE, height=MAP_SIZE
+        )
+        for zoom in [fit_zoom, 18]:
+            positions = get_polyline_positions(activity_stream, zoom=zoom)
+            encoded_kb = len(encode_positions(np.array(positions))) / 1024
+            time_ms = best_time_ms(
+                lambda: get_polyline_positions(activity_stream, zoom=zoom)
+            )
+            print(
+                f"{n_points:>7} {all_kb:>9.1f}KB {zoom:>5} {len(positions):>6} "
+                f"{get_json_kb(positions):>7.1f}KB {encoded_kb:>7.1f}KB "
+                f"{time_ms:>6.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
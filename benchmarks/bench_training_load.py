@@ -0,0 +1,110 @@
+"""
+Training load of 10 years of activities: computation of the fitness / fatigue /
+form of each day (a Python loop over the days is the reference), and in the
+activity store the save of the whole history, the incremental update when a new
+activity is saved (against a full recompute), and the read of one year.
+The activity store is created in a temporary folder (no call to STRAVA API).
+
+    python -m benchmarks.bench_training_load
+"""
+import logging
+import tempfile
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from stravalib import model
+from stravalib.client import BatchedResultsIterator, Client
+
+from benchmarks.synthetic import best_time_ms, make_activities
+from dash_apps.run_together.activity_store import ActivityStore
+from dash_apps.run_together.strava_manager import (
+    get_strava_activities_columns,
+    get_strava_activity_column,
+)
+from dash_apps.run_together.training_load import (
+    ATL_DAYS,
+    CTL_DAYS,
+    HeartRateProfile,
+    get_activities_load,
+    get_daily_load,
+    get_training_load,
+)
+
+START, END = datetime(2015, 1, 1), datetime(2024, 12, 31)
+N_ACTIVITIES = 3000
+
+
+def get_training_load_loop(days: np.ndarray, load: np.ndarray) -> list:
+    """Reference: daily load in a dict, fitness and fatigue day by day"""
+    daily_load = {}
+    for day, value in zip(days.tolist(), load.tolist()):
+        daily_load[day] = daily_load.get(day, 0.0) + value
+    ctl, atl, training_load = 0.0, 0.0, []
+    for day in pd.date_range(START, END, freq="D").date:
+        value = daily_load.get(day, 0.0)
+        ctl += (value - ctl) / CTL_DAYS
+        atl += (value - atl) / ATL_DAYS
+        training_load.append((day, value, ctl, atl, ctl - atl))
+    return training_load
+
+
+def get_activities_columns(raw_activities: list) -> dict:
+    batch = BatchedResultsIterator(
+        entity=model.Activity,
+        bind_client=Client(),
+        result_fetcher=lambda page, per_page: raw_activities[
+            (page - 1) * per_page : page * per_page
+        ],
+    )
+    return get_strava_activities_columns(batch)[0]
+
+
+def main():
+    raw_activities = make_activities(N_ACTIVITIES, start=START, end=END)
+    activities = get_activities_columns(raw_activities[1:])
+    # Activity of the last day, saved after the history
+    new_activity = get_activities_columns(raw_activities[:1])
+
+    days = pd.to_datetime(activities["start_date_local"]).to_numpy("datetime64[D]")
+    load = get_activities_load(
+        moving_time=np.array(activities["moving_time"], dtype=np.float64),
+        average_heartrate=np.array(activities["average_heartrate"], dtype=np.float64),
+        profile=HeartRateProfile.from_env(),
+    )
+    print(f"{N_ACTIVITIES} activities from {START:%Y} to {END:%Y}")
+    loop_ms = best_time_ms(lambda: get_training_load_loop(days, load))
+    vector_ms = best_time_ms(
+        lambda: get_training_load(
+            get_daily_load(days=days, load=load, start_day=START, end_day=END)
+        )
+    )
+    print(f"  {'training load, loop over the days':<40} {loop_ms:8.1f} ms")
+    print(f"  {'get_daily_load + get_training_load':<40} {vector_ms:8.1f} ms")
+
+    store = ActivityStore(
+        athlete_id=1,
+        columns=get_strava_activity_column(),
+        data_dir=tempfile.mkdtemp(),
+    )
+    save_ms = best_time_ms(lambda: store.save_activities(activities), repeat=1)
+    incremental_ms = best_time_ms(lambda: store.save_activities(new_activity))
+
+    def update_all():
+        with closing(store.connect()) as conn, conn:
+            store.update_training_load(conn=conn, start_dates_local=[f"{START:%Y}"])
+
+    full_ms = best_time_ms(update_all)
+    read_ms = best_time_ms(
+        lambda: store.get_training_load(start_day="2024-01-01", end_day="2024-12-31")
+    )
+    print(f"  {'store: save the history':<40} {save_ms:8.1f} ms")
+    print(f"  {'store: save 1 activity (incremental)':<40} {incremental_ms:8.1f} ms")
+    print(f"  {'store: training load computed again':<40} {full_ms:8.1f} ms")
+    print(f"  {'store: read one year':<40} {read_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
@@ -0,0 +1,84 @@
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+def make_stream(n_samples: int, seed: int = 0) -> Dict:
+    """
+        Stream of a run at 1 Hz in the JSON of STRAVA API (key_by_type=true): a loop
+        around a park at ~3.1 m/s with a noisy GPS and a heart rate drifting around
+        150 bpm
+    :param n_samples: number of samples (seconds)
+    :param seed: seed of the noise
+    :return: Dict stream with time, distance, heartrate and latlng
+    """
+    rng = np.random.default_rng(seed)
+    time_ = np.arange(n_samples)
+    angle = time_ / n_samples * 2 * np.pi
+    latitude = 48.85 + 0.02 * np.sin(angle) + rng.normal(0, 2e-5, n_samples)
+    longitude = 2.35 + 0.03 * np.cos(angle) + rng.normal(0, 2e-5, n_samples)
+    distance = np.cumsum(rng.uniform(2.6, 3.6, n_samples))
+    heartrate = 150 + 10 * np.sin(time_ / 300) + rng.normal(0, 3, n_samples)
+    return {
+        "time": {"data": time_.tolist()},
+        "distance": {"data": distance.round(1).tolist()},
+        "heartrate": {"data": heartrate.astype(int).tolist()},
+        "latlng": {"data": np.c_[latitude.round(6), longitude.round(6)].tolist()},
+    }
+
+
+def make_activities(
+    n_activities: int, start: datetime, end: datetime, seed: int = 0
+) -> List[Dict]:
+    """
+        Activities in the JSON of STRAVA API (summary activities), spread at random
+        between both dates: 80% of runs
+    :param n_activities: number of activities
+    :param start: first start date
+    :param end: last start date
+    :param seed: seed of the random values
+    :return: list of activities, the newest first (order of STRAVA API)
+    """
+    rng = np.random.default_rng(seed)
+    offsets = np.sort(rng.uniform(0, (end - start).total_seconds(), n_activities))
+    activities = []
+    for i, offset in enumerate(offsets[::-1]):
+        start_date = start + timedelta(seconds=float(offset))
+        distance = float(rng.uniform(4000, 25000))
+        moving_time = int(distance / rng.uniform(2.6, 3.6))
+        activities.append(
+            {
+                "id": i + 1,
+                "name": f"Activity {i + 1}",
+                "start_date": start_date.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "start_date_local": start_date.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "type": "Run" if rng.random() < 0.8 else "Ride",
+                "distance": distance,
+                "moving_time": moving_time,
+                "elapsed_time": moving_time + 60,
+                "total_elevation_gain": float(rng.uniform(0, 300)),
+                "elev_high": 120.0,
+                "elev_low": 30.0,
+                "average_speed": distance / moving_time,
+                "max_speed": distance / moving_time * 1.4,
+                "average_heartrate": float(rng.uniform(130, 170)),
+                "max_heartrate": 185.0,
+                "average_cadence": 85.0,
+                "start_latlng": [48.85, 2.35],
+            }
+        )
+    return activities
+
+
+def best_time_ms(func: Callable, repeat: int = 5) -> float:
+    """
+    :return: best time of the function over repeat runs, in milliseconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1e3
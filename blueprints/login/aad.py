@@ -1,18 +1,38 @@
 from flask import Flask, url_for
+from flask.globals import request_ctx
 from flask.sessions import SessionMixin
-from typing import Callable, List
+from typing import Iterable, List
 
 no_logged_message = "You are not logged in. Redirecting in 3 seconds."
 
 
-def authorisation(app: Flask, session: SessionMixin, excluded: List[str]):
-    """Creat the authorisation for all the view"""
-    for view_func in app.view_functions:
-        if view_func not in excluded:
-            print(view_func)
-            app.view_functions[view_func] = _authorize_view(
-                app.view_functions[view_func], session
-            )
+def authorisation(
+    app: Flask, excluded: List[str], public_path_prefixes: Iterable[str] = ()
+):
+    """
+    Creat the authorisation for all the views: a single check before each request,
+    also applied to the views registered later (ex: routes added by Dash).
+    The excluded endpoints and the paths starting with a public prefix (Dash
+    JavaScript / CSS files) are served without checking the session.
+    """
+    excluded_endpoints = frozenset(excluded)
+    public_prefixes = tuple(public_path_prefixes)
+
+    @app.before_request
+    def check_authorization():
+        # Context of the request read once: each access to flask.request or
+        # flask.session goes through a context lookup
+        ctx = request_ctx._get_current_object()
+        if ctx.request.endpoint in excluded_endpoints or ctx.request.path.startswith(
+            public_prefixes
+        ):
+            return None
+
+        if is_user_authenticate(session=ctx.session):
+            return None
+
+        response = no_logged_message, {"Refresh": f"3; url={url_for('login.landing')}"}
+        return response
 
     return app
 
@@ -21,16 +41,3 @@ def is_user_authenticate(session: SessionMixin) -> bool:
     """Check if the user is connected by looking the session"""
     # Check if the user is in the session
     return "user" in session
-
-
-def _authorize_view(func: Callable, session: SessionMixin):
-    """Require Special Access for the given view function on top of the login."""
-
-    def check_authorization(*args, **kwargs):
-        if is_user_authenticate(session=session):
-            return func(*args, **kwargs)
-
-        response = no_logged_message, {"Refresh": f"3; url={url_for('login.landing')}"}
-        return response
-
-    return check_authorization
@@ -52,6 +52,10 @@ def strava_callback():
     # Get the code parameter from the URL
     code = request.args.get("code")
 
+    # New login: forget the state of the previous athlete of the session, and
+    # issue a new session id (an id set before the login can not be reused)
+    session.regenerate()
+
     # add in to the Flask Session
     session["strava_code"] = code
     session["user"] = {}
@@ -0,0 +1,263 @@
+import logging
+import os
+import secrets
+import sqlite3
+import time
+from contextlib import closing
+from os import environ as env
+from typing import Dict, Iterable
+
+from flask import Flask
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface
+from flask_session.sessions import ServerSideSession
+from itsdangerous import BadSignature, Signer
+
+from dash_apps.run_together.activity_store import get_data_dir
+
+_missing = object()
+
+
+class ServerSession(ServerSideSession):
+    """
+    Session saved on the server, only its id is in the cookie.
+    The keys set or deleted during the request are tracked: only these keys are
+    saved at the end of the request, the keys written meanwhile by a concurrent
+    callback are not overwritten.
+    A value modified in place (ex: session["user"]["name"] = ...) must be assigned
+    again to be saved.
+    """
+
+    def __init__(self, initial=None, sid=None, new=False):
+        super().__init__(initial, sid)
+        self.new = new
+        self.updated_keys = set()
+        self.deleted_keys = set()
+        self.previous_sid = None
+
+    def _track(self, key, deleted=False) -> None:
+        (self.deleted_keys if deleted else self.updated_keys).add(key)
+        (self.updated_keys if deleted else self.deleted_keys).discard(key)
+
+    def __setitem__(self, key, value):
+        self._track(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._track(key, deleted=True)
+        super().__delitem__(key)
+
+    def pop(self, key, default=_missing):
+        if key in self:
+            self._track(key, deleted=True)
+        if default is _missing:
+            return super().pop(key)
+        return super().pop(key, default)
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._track(key, deleted=True)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._track(key)
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        values = dict(*args, **kwargs)
+        for key in values:
+            self._track(key)
+        super().update(values)
+
+    def clear(self):
+        for key in list(self):
+            self._track(key, deleted=True)
+        super().clear()
+
+    def regenerate(self) -> None:
+        """
+        Empty the session and give it a new id (ex: at login, against the session
+        fixation): the old session is deleted and a new cookie is sent at the end
+        of the request
+        """
+        if not self.new:
+            self.previous_sid = self.sid
+        super().clear()
+        self.updated_keys.clear()
+        self.deleted_keys.clear()
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+
+
+class SQLiteSessionBackend:
+    """
+    Sessions saved in a local SQLite file shared by all the gunicorn workers:
+    one row per key of a session, a key is written in its own row.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        :param path: SQLite file, by default {dataDir}/sessions.sqlite
+        """
+        self.path = path or os.path.join(get_data_dir(), "sessions.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (sid TEXT, key TEXT, "
+                "value TEXT, expires_at REAL, PRIMARY KEY (sid, key))"
+            )
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load(self, sid: str) -> Dict[str, str]:
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                "SELECT key, value FROM sessions WHERE sid = ? AND expires_at > ?",
+                (sid, time.time()),
+            ).fetchall()
+        return dict(rows)
+
+    def save(
+        self, sid: str, updated: Dict[str, str], deleted: Iterable[str], ttl: int
+    ) -> None:
+        expires_at = time.time() + ttl
+        with closing(self.connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                [(sid, key, value, expires_at) for key, value in updated.items()],
+            )
+            conn.executemany(
+                "DELETE FROM sessions WHERE sid = ? AND key = ?",
+                [(sid, key) for key in deleted],
+            )
+            # Time to live of the whole session from its last modification
+            conn.execute(
+                "UPDATE sessions SET expires_at = ? WHERE sid = ?", (expires_at, sid)
+            )
+
+    def delete(self, sid: str) -> None:
+        with closing(self.connect()) as conn, conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def delete_expired(self) -> None:
+        with closing(self.connect()) as conn, conn:
+            conn.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+
+
+class RedisSessionBackend:
+    """
+    Sessions saved in a Redis server shared by all the gunicorn workers: one hash
+    per session, a key is written with HSET / HDEL.
+    """
+
+    def __init__(self, url: str = None):
+        # Optional dependency, only needed with a redis session backend
+        import redis
+
+        self.redis = redis.Redis.from_url(
+            url or env.get("redisUrl") or "redis://localhost:6379/0"
+        )
+
+    def load(self, sid: str) -> Dict[str, str]:
+        return {
+            key.decode(): value.decode()
+            for key, value in self.redis.hgetall(f"session:{sid}").items()
+        }
+
+    def save(
+        self, sid: str, updated: Dict[str, str], deleted: Iterable[str], ttl: int
+    ) -> None:
+        pipeline = self.redis.pipeline()
+        if updated:
+            pipeline.hset(f"session:{sid}", mapping=updated)
+        deleted = list(deleted)
+        if deleted:
+            pipeline.hdel(f"session:{sid}", *deleted)
+        pipeline.expire(f"session:{sid}", ttl)
+        pipeline.execute()
+
+    def delete(self, sid: str) -> None:
+        self.redis.delete(f"session:{sid}")
+
+    def delete_expired(self) -> None:
+        """The keys expire in Redis"""
+
+
+class ServerSessionInterface(SessionInterface):
+    """
+    Flask session interface saving the sessions on the server (see ServerSession).
+    The cookie only contains the signed id of the session: the size of the
+    requests of the Dash callbacks does not depend on the content of the session.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def get_signer(app: Flask) -> Signer:
+        return Signer(app.secret_key, salt="server-session", key_derivation="hmac")
+
+    def open_session(self, app: Flask, request) -> ServerSession:
+        signed_sid = request.cookies.get(self.get_cookie_name(app))
+        if signed_sid:
+            try:
+                sid = self.get_signer(app).unsign(signed_sid).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                values = self.backend.load(sid)
+                if values:
+                    return ServerSession(
+                        {key: self.serializer.loads(v) for key, v in values.items()},
+                        sid=sid,
+                    )
+
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app: Flask, session: ServerSession, response) -> None:
+        if session.previous_sid is not None:
+            # Session regenerated: the old id can not be used anymore
+            self.backend.delete(session.previous_sid)
+            session.previous_sid = None
+        if not (session.updated_keys or session.deleted_keys):
+            return
+
+        ttl = int(app.permanent_session_lifetime.total_seconds())
+        self.backend.save(
+            sid=session.sid,
+            updated={
+                key: self.serializer.dumps(session[key])
+                for key in list(session.updated_keys)
+            },
+            deleted=list(session.deleted_keys),
+            ttl=ttl,
+        )
+
+        if session.new:
+            # Opportunity to remove the expired sessions of the SQLite backend
+            self.backend.delete_expired()
+            response.set_cookie(
+                self.get_cookie_name(app),
+                self.get_signer(app).sign(session.sid).decode(),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=self.get_cookie_domain(app),
+                path=self.get_cookie_path(app),
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+
+def init_server_session(app: Flask) -> None:
+    """
+    Save the Flask sessions of the app on the server, backend chosen with the
+    environment variable sessionBackend: sqlite (default) or redis
+    """
+    backends = {"sqlite": SQLiteSessionBackend, "redis": RedisSessionBackend}
+    backend_name = env.get("sessionBackend") or "sqlite"
+    logging.info(f"Session: {backend_name} backend")
+    app.session_interface = ServerSessionInterface(backend=backends[backend_name]())
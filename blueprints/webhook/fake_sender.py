@@ -0,0 +1,79 @@
+"""
+Local fake of the Strava webhook sender, to test the push ingestion without a
+public URL:
+
+    python -m blueprints.webhook.fake_sender --url http://localhost:8502 \
+        --athlete-id 123 --activity-id 456 --aspect-type create
+
+It validates the subscription like Strava (handshake), then posts the event.
+"""
+import argparse
+import secrets
+import time
+from os import environ as env
+
+import requests
+from dotenv import load_dotenv
+
+from blueprints.webhook.webhook import WEBHOOK_PATH
+
+
+def validate_subscription(url: str, verify_token: str) -> None:
+    """Send the subscription handshake and check the challenge sent back"""
+    challenge = secrets.token_hex(8)
+    response = requests.get(
+        f"{url}{WEBHOOK_PATH}",
+        params={
+            "hub.mode": "subscribe",
+            "hub.challenge": challenge,
+            "hub.verify_token": verify_token,
+        },
+        timeout=10,
+    )
+    response.raise_for_status()
+    if response.json().get("hub.challenge") != challenge:
+        raise ValueError(f"Invalid challenge: {response.text}")
+
+
+def send_event(
+    url: str,
+    athlete_id: int,
+    activity_id: int,
+    aspect_type: str,
+    subscription_id: int = 1,
+) -> requests.Response:
+    """Post an activity event like Strava"""
+    event = {
+        "object_type": "activity",
+        "object_id": activity_id,
+        "aspect_type": aspect_type,
+        "owner_id": athlete_id,
+        "subscription_id": subscription_id,
+        "event_time": int(time.time()),
+        "updates": {},
+    }
+    response = requests.post(f"{url}{WEBHOOK_PATH}", json=event, timeout=10)
+    response.raise_for_status()
+    return response
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Fake Strava webhook sender")
+    parser.add_argument("--url", default="http://localhost:8502")
+    parser.add_argument("--athlete-id", type=int, required=True)
+    parser.add_argument("--activity-id", type=int, required=True)
+    parser.add_argument(
+        "--aspect-type", choices=["create", "update", "delete"], default="create"
+    )
+    args = parser.parse_args()
+
+    validate_subscription(url=args.url, verify_token=env["stravaWebhookVerifyToken"])
+    send_event(
+        url=args.url,
+        athlete_id=args.athlete_id,
+        activity_id=args.activity_id,
+        aspect_type=args.aspect_type,
+        subscription_id=int(env.get("stravaWebhookSubscriptionId") or 1),
+    )
+    print(f"Event {args.aspect_type} sent for activity={args.activity_id}")
@@ -0,0 +1,64 @@
+import logging
+from os import environ as env
+
+from flask import Blueprint, request
+
+from dash_apps.run_together.activity_events import (
+    enqueue_activity_event,
+    is_webhook_enabled,
+)
+
+# Create the Blueprint Webhook: events pushed by Strava
+# https://developers.strava.com/docs/webhooks/
+webhook_blueprint = Blueprint("webhook", __name__)
+
+WEBHOOK_PATH = "/run-together/webhook"
+
+
+@webhook_blueprint.route(WEBHOOK_PATH, methods=["GET"])
+def validate_subscription():
+    """
+    Handshake of the creation of the push subscription: Strava sends
+    ?hub.mode=subscribe&hub.challenge=...&hub.verify_token=...
+    and expects the challenge back in JSON.
+    """
+    if (
+        # The subscription id is not known yet: only the verify token is checked
+        not env.get("stravaWebhookVerifyToken")
+        or request.args.get("hub.mode") != "subscribe"
+        or request.args.get("hub.verify_token") != env["stravaWebhookVerifyToken"]
+    ):
+        logging.info("Webhook: invalid subscription validation")
+        return {"error": "invalid verify token"}, 403
+
+    logging.info("Webhook: subscription validated")
+    return {"hub.challenge": request.args.get("hub.challenge")}
+
+
+@webhook_blueprint.route(WEBHOOK_PATH, methods=["POST"])
+def receive_event():
+    """
+    Event pushed by Strava, it must be acknowledged within 2 seconds: the activity
+    events are only added to the job queue, the job worker gets the activity.
+    """
+    event = request.get_json(silent=True)
+    if not is_webhook_enabled() or not isinstance(event, dict):
+        return {"error": "invalid event"}, 400
+
+    # Fail closed: is_webhook_enabled requires the subscription id
+    if str(event.get("subscription_id")) != env["stravaWebhookSubscriptionId"]:
+        logging.info(f"Webhook: event of another subscription {event}")
+        return {"error": "unknown subscription"}, 403
+
+    if (
+        event.get("object_type") == "activity"
+        and event.get("aspect_type") in ["create", "update", "delete"]
+        and "object_id" in event
+        and "owner_id" in event
+    ):
+        enqueue_activity_event(event)
+    else:
+        # Ex: athlete deauthorizing the application
+        logging.info(f"Webhook: event ignored {event}")
+
+    return {"status": "ok"}
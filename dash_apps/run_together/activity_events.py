@@ -0,0 +1,78 @@
+import logging
+from os import environ as env
+from typing import Dict
+
+from dash_apps.run_together.job_queue import get_job_queue
+from dash_apps.run_together.job_worker import register_job_handler
+from dash_apps.run_together.strava_manager import (
+    StravaManager,
+    get_strava_activities_json_columns,
+)
+
+
+def is_webhook_enabled() -> bool:
+    """
+    The Strava webhook pushes the new activities when the push subscription is set:
+    stravaWebhookVerifyToken (chosen when creating the subscription) and
+    stravaWebhookSubscriptionId (id returned by Strava). Without the subscription
+    id the events can not be authenticated and are rejected.
+    """
+    return bool(
+        env.get("stravaWebhookVerifyToken") and env.get("stravaWebhookSubscriptionId")
+    )
+
+
+def enqueue_activity_event(event: Dict) -> None:
+    """
+        Add to the job queue an event of the Strava webhook about an activity:
+        {"object_type": "activity", "object_id": ..., "aspect_type": "create",
+        "owner_id": ..., "subscription_id": ..., "event_time": ..., "updates": {}}
+        The pending events of the same activity are replaced by the last one.
+    :param event: event of the Strava webhook
+    """
+    get_job_queue().enqueue(
+        kind="activity_event",
+        payload={
+            "athlete_id": event["owner_id"],
+            "activity_id": event["object_id"],
+            "aspect_type": event["aspect_type"],
+        },
+        key=f"activity_event:{event['owner_id']}:{event['object_id']}",
+    )
+
+
+@register_job_handler("activity_event")
+def handle_activity_event(payload: Dict) -> None:
+    """
+        Apply an activity event to the local activity store of the athlete:
+            - create / update: get only this activity (and its stream, saved in
+              the activity store) from STRAVA API
+            - delete: remove the activity from the store, only if STRAVA API
+              confirms it does not exist anymore (the event is not signed)
+    :param payload: {athlete_id, activity_id, aspect_type}
+    """
+    athlete_id, activity_id = payload["athlete_id"], payload["activity_id"]
+    logging.info(
+        f"Activity event: {payload['aspect_type']} activity={activity_id} "
+        f"athlete={athlete_id}"
+    )
+    strava_manager = StravaManager.for_athlete(athlete_id=athlete_id)
+    # Athlete never synced: the first sync retrieves the whole history
+    activity_store = strava_manager.get_synced_activity_store()
+
+    if payload["aspect_type"] == "delete":
+        if strava_manager.is_activity_deleted(activity_id=activity_id):
+            activity_store.delete_activities(activity_ids=[activity_id])
+        else:
+            logging.warning(
+                f"Activity event: delete of activity={activity_id} ignored, "
+                f"the activity still exists"
+            )
+        return
+
+    activity_bundle = strava_manager.get_activity_bundle(
+        activity_id=activity_id, resources=("activity", "stream")
+    )
+    activity_store.save_activities(
+        get_strava_activities_json_columns([activity_bundle["activity"]])
+    )
@@ -0,0 +1,306 @@
+import json
+import logging
+import os
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime, time, timezone
+from os import environ as env
+from typing import Dict, List, Optional
+
+from dash_apps.run_together.activity_stream import ActivityStreamStoreMixin
+from dash_apps.run_together.best_efforts import BestEffortsStoreMixin
+from dash_apps.run_together.race_goal import RaceGoalStoreMixin
+from dash_apps.run_together.rollups import RollupsStoreMixin, get_rollup_bucket
+from dash_apps.run_together.training_load import TrainingLoadStoreMixin
+from dash_apps.run_together.zones import ZonesStoreMixin
+
+# Columns stored as JSON text in SQLite (list values)
+JSON_COLUMNS = ["start_latlng"]
+
+
+def get_data_dir() -> str:
+    """Return the folder where the local data of the application are stored"""
+    return env.get("dataDir") or "data"
+
+
+def to_sqlite_value(value):
+    """
+        Convert a value coming from Strava into a value which can be stored in SQLite.
+        - aware datetime are converted to UTC: 2024-01-31T08:00:00Z
+        - naive datetime (local time) are kept as it is: 2024-01-31T09:00:00
+        - list are dumped in JSON
+    :param value: value from the Strava activity
+    :return: value for SQLite
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return value.strftime("%Y-%m-%dT%H:%M:%S")
+    if isinstance(value, (list, tuple)):
+        return json.dumps(list(value))
+    return value
+
+
+class ActivityStore(
+    RollupsStoreMixin,
+    ActivityStreamStoreMixin,
+    TrainingLoadStoreMixin,
+    ZonesStoreMixin,
+    BestEffortsStoreMixin,
+    RaceGoalStoreMixin,
+):
+    """
+    Local copy of the Strava activities of one athlete, saved in SQLite on disk.
+        - Store / update the activities retrieved from Strava
+        - Keep the sync watermark (start_date of the last activity retrieved)
+        - Query the activities between two dates without calling Strava
+    The other data of the athlete are kept in the same SQLite file by the store
+    mixins of their modules (the data computed from the activities are updated in
+    the transaction saving them):
+        - aggregates per day / ISO week / month / year (see RollupsStoreMixin)
+        - streams of the activities retrieved (see ActivityStreamStoreMixin)
+        - training load per day (fitness / fatigue / form), updated from the first
+          day of the activities saved (see TrainingLoadStoreMixin)
+        - time in the heart rate / pace zones of the activities whose stream has
+          been retrieved (see ZonesStoreMixin)
+        - best efforts of the runs whose stream has been retrieved, and the best of
+          each season (mean-max curve), merged with the efforts of each new
+          activity (see BestEffortsStoreMixin)
+        - race goal of the athlete (see RaceGoalStoreMixin)
+    """
+
+    def __init__(self, athlete_id: int, columns: List[str], data_dir: str = None):
+        """Init the SQLite file of the athlete"""
+        self.athlete_id = athlete_id
+        self.columns = columns
+        folder = os.path.join(data_dir or get_data_dir(), "activities")
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, f"{athlete_id}.sqlite")
+        self.create_tables()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.create_function("rollup_bucket", 2, get_rollup_bucket, deterministic=True)
+        return conn
+
+    def create_tables(self) -> None:
+        """Create the tables if needed and add the columns missing in the activities table"""
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS activities (id INTEGER PRIMARY KEY)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            existing_columns = [
+                row[1] for row in conn.execute("PRAGMA table_info(activities)")
+            ]
+            for column in self.columns:
+                if column not in existing_columns:
+                    conn.execute(f"ALTER TABLE activities ADD COLUMN {column}")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS activities_start_date_local "
+                "ON activities (start_date_local)"
+            )
+            self.create_rollups_table(conn=conn)
+            self.create_activity_streams_table(conn=conn)
+            self.create_training_load_tables(conn=conn)
+            self.create_activity_zones_table(conn=conn)
+            self.create_best_efforts_tables(conn=conn)
+            self.create_race_goal_table(conn=conn)
+
+    @staticmethod
+    def get_start_dates_local(
+        conn: sqlite3.Connection, activity_ids: List[int]
+    ) -> List[str]:
+        """Return the start_date_local of the activities already saved"""
+        start_dates_local = []
+        # Split the ids to stay under the maximum number of SQLite parameters
+        for i in range(0, len(activity_ids), 500):
+            ids = activity_ids[i : i + 500]
+            start_dates_local += [
+                row[0]
+                for row in conn.execute(
+                    f"SELECT start_date_local FROM activities "
+                    f"WHERE id IN ({', '.join('?' * len(ids))})",
+                    ids,
+                )
+            ]
+        return start_dates_local
+
+    def get_watermark(self) -> Optional[str]:
+        """
+        :return: start_date (UTC) of the most recent activity synced, None if never synced
+        """
+        return self.get_state("watermark")
+
+    def get_last_sync(self) -> Optional[str]:
+        """
+        :return: UTC time of the last sync with Strava, None if never synced
+        """
+        return self.get_state("last_sync")
+
+    def get_data_version(self) -> str:
+        """
+        :return: version of the activities, changed each time activities are saved
+        """
+        return self.get_state("data_version") or "0"
+
+    def get_state(self, key: str) -> Optional[str]:
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT value FROM sync_state WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def increment_data_version(conn: sqlite3.Connection) -> None:
+        """Change the version of the data, each time activities are modified"""
+        conn.execute(
+            "INSERT INTO sync_state VALUES ('data_version', '1') "
+            "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def set_states(self, states: Dict[str, str]) -> None:
+        """Save values of the sync state (ex: checkpoint of the backfill)"""
+        with closing(self.connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?)", states.items()
+            )
+
+    def save_activities(self, activities: Dict[str, List]) -> None:
+        """
+            Insert or replace the activities, and move the watermark forward.
+        :param activities: one list per column, see get_strava_activities_columns
+        """
+        columns = ["id"] + self.columns
+        rows = [
+            [to_sqlite_value(value) for value in activity]
+            for activity in zip(*[activities[column] for column in columns])
+        ]
+        watermark = self.get_watermark()
+        if "start_date" in columns:
+            index = columns.index("start_date")
+            watermark = max(
+                [row[index] for row in rows if row[index]]
+                + ([watermark] if watermark else []),
+                default=None,
+            )
+
+        start_date_local_index = columns.index("start_date_local")
+        with closing(self.connect()) as conn, conn:
+            # An activity already saved may move to another bucket (date modified)
+            start_dates_local = self.get_start_dates_local(
+                conn=conn, activity_ids=[row[0] for row in rows]
+            ) + [row[start_date_local_index] for row in rows]
+
+            conn.executemany(
+                f"INSERT OR REPLACE INTO activities ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                rows,
+            )
+            start_dates_local = [x for x in start_dates_local if x is not None]
+            self.update_rollups(conn=conn, start_dates_local=start_dates_local)
+            self.update_training_load(conn=conn, start_dates_local=start_dates_local)
+            self.update_best_efforts(
+                conn=conn,
+                activity_ids=[row[0] for row in rows],
+                seasons=[x[:4] for x in start_dates_local],
+            )
+            if rows:
+                self.increment_data_version(conn=conn)
+            if watermark:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sync_state VALUES ('watermark', ?)",
+                    (watermark,),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES ('last_sync', ?)",
+                (to_sqlite_value(datetime.now(timezone.utc)),),
+            )
+        logging.info(
+            f"Activity Store: save {len(rows)} activities for athlete={self.athlete_id}, "
+            f"watermark={watermark}"
+        )
+
+    def delete_activities(self, activity_ids: List[int]) -> None:
+        """
+            Delete the activities (ex: deleted on Strava) and update the rollups of
+            their buckets
+        :param activity_ids:
+        """
+        with closing(self.connect()) as conn, conn:
+            start_dates_local = self.get_start_dates_local(
+                conn=conn, activity_ids=activity_ids
+            )
+            conn.executemany(
+                "DELETE FROM activities WHERE id = ?", [(x,) for x in activity_ids]
+            )
+            start_dates_local = [x for x in start_dates_local if x is not None]
+            self.update_rollups(conn=conn, start_dates_local=start_dates_local)
+            self.update_training_load(conn=conn, start_dates_local=start_dates_local)
+            self.update_best_efforts(
+                conn=conn,
+                activity_ids=activity_ids,
+                seasons=[x[:4] for x in start_dates_local],
+            )
+            self.delete_activity_efforts(conn=conn, activity_ids=activity_ids)
+            self.delete_activity_streams(conn=conn, activity_ids=activity_ids)
+            if start_dates_local:
+                self.increment_data_version(conn=conn)
+        logging.info(
+            f"Activity Store: delete {len(start_dates_local)} activities for "
+            f"athlete={self.athlete_id}"
+        )
+
+    def get_activity(self, activity_id: int) -> Optional[Dict]:
+        """
+        :return: {column: value} of the activity saved, None if it is not saved
+        """
+        columns = ["id"] + self.columns
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(columns)} FROM activities WHERE id = ?",
+                (activity_id,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        activity = dict(zip(columns, row))
+        for column in JSON_COLUMNS:
+            if activity.get(column) is not None:
+                activity[column] = json.loads(activity[column])
+        return activity
+
+    def get_activities_between(self, start_date: date, end_date: date) -> List:
+        """
+            Return the activities with a start_date_local between both dates.
+            If end_date is a date (not a datetime), the whole day is included.
+        :param start_date:
+        :param end_date:
+        :return: list of activity [id] + columns
+        """
+        if not isinstance(start_date, datetime):
+            start_date = datetime.combine(start_date, time.min)
+        if not isinstance(end_date, datetime):
+            end_date = datetime.combine(end_date, time.max)
+
+        columns = ["id"] + self.columns
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(columns)} FROM activities "
+                f"WHERE start_date_local BETWEEN ? AND ? "
+                f"ORDER BY start_date_local DESC",
+                (to_sqlite_value(start_date), to_sqlite_value(end_date)),
+            ).fetchall()
+
+        json_indexes = [columns.index(x) for x in JSON_COLUMNS if x in columns]
+        activities = []
+        for row in rows:
+            activity = list(row)
+            for index in json_indexes:
+                if activity[index] is not None:
+                    activity[index] = json.loads(activity[index])
+            activities.append(activity)
+
+        return activities
@@ -0,0 +1,174 @@
+import json
+import sqlite3
+import zlib
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# A gap between two samples longer than this is a pause (seconds)
+MAX_SAMPLE_GAP = 30
+
+
+@dataclass
+class ActivityStream:
+    """
+    Stream of one activity stored in typed NumPy arrays (one value per sample):
+        - time: seconds since the start of the activity (float32)
+        - distance: meters since the start of the activity (float32)
+        - heartrate: beats per minute (int16)
+        - latlng: latitude and longitude (float32, N x 2)
+    A stream missing in the Strava response (ex: no heart rate monitor) is empty.
+    """
+
+    time: np.ndarray
+    distance: np.ndarray
+    heartrate: np.ndarray
+    latlng: np.ndarray
+
+    @classmethod
+    def from_strava(cls, activity_stream: dict) -> "ActivityStream":
+        """
+            Create the ActivityStream from the JSON of STRAVA API (key_by_type=true):
+            {"time": {"data": [...]}, "latlng": {"data": [[lat, lng], ...]}, ...}
+        :param activity_stream: Dict stream From Strava API V3
+        :return: ActivityStream
+        """
+
+        def get_data(key: str, dtype: type, shape: tuple = (0,)) -> np.ndarray:
+            if key not in activity_stream:
+                return np.empty(shape, dtype=dtype)
+            return np.asarray(activity_stream[key]["data"], dtype=dtype).reshape(
+                (-1,) + shape[1:]
+            )
+
+        return cls(
+            time=get_data("time", np.float32),
+            distance=get_data("distance", np.float32),
+            heartrate=get_data("heartrate", np.int16),
+            latlng=get_data("latlng", np.float32, shape=(0, 2)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __getitem__(self, index) -> "ActivityStream":
+        """Return the samples selected by a slice, an index array or a boolean mask"""
+
+        def select(values: np.ndarray) -> np.ndarray:
+            return values[index] if len(values) else values
+
+        return ActivityStream(
+            time=select(self.time),
+            distance=select(self.distance),
+            heartrate=select(self.heartrate),
+            latlng=select(self.latlng),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the arrays of the stream"""
+        return (
+            self.time.nbytes
+            + self.distance.nbytes
+            + self.heartrate.nbytes
+            + self.latlng.nbytes
+        )
+
+    @property
+    def sample_time(self) -> np.ndarray:
+        """
+        Seconds represented by each sample: the time since the previous sample,
+        0 for the first sample and after a pause (see MAX_SAMPLE_GAP)
+        """
+        sample_time = np.diff(self.time.astype(np.float64), prepend=self.time[:1])
+        sample_time[(sample_time < 0) | (sample_time > MAX_SAMPLE_GAP)] = 0
+        return sample_time
+
+    @property
+    def speed(self) -> np.ndarray:
+        """Speed of each sample in m/s (from the previous sample), 0 if unknown"""
+        if len(self.distance) != len(self.time):
+            return np.zeros(len(self.time))
+        distance = np.diff(self.distance.astype(np.float64), prepend=self.distance[:1])
+        time = np.diff(self.time.astype(np.float64), prepend=self.time[:1])
+        return np.divide(distance, time, out=np.zeros(len(time)), where=time > 0)
+
+    @property
+    def distance_km(self) -> np.ndarray:
+        """Distance in kilometers (rounded to the meter)"""
+        return np.round(self.distance.astype(np.float64) / 1000, 3)
+
+    @property
+    def bounds(self) -> Optional[List[List[float]]]:
+        """
+        :return: [[min_latitude, min_longitude], [max_latitude, max_longitude]]
+            (South West, North East), None if the activity has no GPS data
+        """
+        if len(self.latlng) == 0:
+            return None
+        return [
+            self.latlng.min(axis=0).astype(np.float64).round(6).tolist(),
+            self.latlng.max(axis=0).astype(np.float64).round(6).tolist(),
+        ]
+
+    def get_latlng_list(self) -> List[List[float]]:
+        """Positions [[lat, lng], ...] rounded to 6 decimals (~10 cm) for the JSON"""
+        return self.latlng.astype(np.float64).round(6).tolist()
+
+
+class ActivityStreamStoreMixin:
+    """Streams of the activities of the ActivityStore retrieved from Strava"""
+
+    @staticmethod
+    def create_activity_streams_table(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS activity_streams "
+            "(id INTEGER PRIMARY KEY, stream BLOB)"
+        )
+
+    @staticmethod
+    def delete_activity_streams(
+        conn: sqlite3.Connection, activity_ids: List[int]
+    ) -> None:
+        """Delete the streams of the activities deleted"""
+        conn.executemany(
+            "DELETE FROM activity_streams WHERE id = ?", [(x,) for x in activity_ids]
+        )
+
+    def save_activity_stream(self, activity_id: int, activity_stream: Dict) -> None:
+        """
+            Save the stream of an activity (JSON compressed with zlib): unlike the
+            stream cache, it is kept as long as the activity and shared by all the
+            processes (ex: streams retrieved by the backfill in the job worker)
+        :param activity_id:
+        :param activity_stream: Dict stream From Strava API V3
+        """
+        value = zlib.compress(
+            json.dumps(activity_stream, separators=(",", ":")).encode()
+        )
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO activity_streams VALUES (?, ?)",
+                (activity_id, value),
+            )
+
+    def get_activity_stream(self, activity_id: int) -> Optional[Dict]:
+        """
+        :return: Dict stream From Strava API V3 saved, None if it is not saved
+        """
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT stream FROM activity_streams WHERE id = ?", (activity_id,)
+            ).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def has_activity_stream(self, activity_id: int) -> bool:
+        with closing(self.connect()) as conn:
+            return (
+                conn.execute(
+                    "SELECT 1 FROM activity_streams WHERE id = ?", (activity_id,)
+                ).fetchone()
+                is not None
+            )
@@ -0,0 +1,160 @@
+import logging
+from os import environ as env
+from typing import Dict
+
+from dash_apps.run_together.activity_store import to_sqlite_value
+from dash_apps.run_together.job_queue import get_job_queue
+from dash_apps.run_together.job_worker import register_job_handler
+from dash_apps.run_together.rate_budget import RateLimitBudgetExceeded
+from dash_apps.run_together.rate_limiter import TokenBucket
+from dash_apps.run_together.strava_manager import (
+    StravaManager,
+    get_strava_activities_columns,
+)
+
+_backfill_bucket = None
+
+
+def get_backfill_bucket() -> TokenBucket:
+    """
+    Token bucket of the calls to Strava done by the backfill of all the athletes:
+    backfillRateLimit calls per 15 minutes (default 40, Strava allows 100 per
+    application), bursts of backfillBurst calls
+    """
+    global _backfill_bucket
+    if _backfill_bucket is None:
+        _backfill_bucket = TokenBucket(
+            name="backfill",
+            rate=float(env.get("backfillRateLimit") or 40) / 900,
+            capacity=float(env.get("backfillBurst") or 5),
+        )
+    return _backfill_bucket
+
+
+def is_backfill_streams_enabled() -> bool:
+    """The streams of the runs are saved in the activity store (backfillStreams)"""
+    return env.get("backfillStreams", "true").lower() != "false"
+
+
+def get_backfill_progress(strava_manager: StravaManager) -> Dict:
+    """
+    :return: {status: None / running / done, count: activities retrieved,
+        before: start_date (UTC) of the oldest activity retrieved}
+    """
+    activity_store = strava_manager.activity_store
+    return {
+        "status": activity_store.get_state("backfill_status"),
+        "count": int(activity_store.get_state("backfill_count") or 0),
+        "before": activity_store.get_state("backfill_before"),
+    }
+
+
+def fetch_backfill_page(strava_manager: StravaManager) -> bool:
+    """
+        Retrieve the page of activities older than the checkpoint of the athlete,
+        from the newest to the oldest, and move the checkpoint to the oldest
+        activity of the page. A backfill stopped (restart, error) resumes from the
+        checkpoint.
+    :param strava_manager: StravaManager of the athlete
+    :return: True if there are older activities to retrieve
+    """
+    page_size = int(env.get("backfillPageSize") or 100)
+    activity_store = strava_manager.activity_store
+    progress = get_backfill_progress(strava_manager)
+
+    activities = strava_manager.strava_client.get_activities(
+        before=progress["before"], limit=page_size
+    )
+    activities_columns, count = get_strava_activities_columns(activities)
+    activity_store.save_activities(activities_columns)
+
+    if is_backfill_streams_enabled():
+        for activity_id, activity_type in zip(
+            activities_columns["id"], activities_columns["type"]
+        ):
+            if activity_type == "Run":
+                get_job_queue().enqueue(
+                    kind="backfill_stream",
+                    payload={
+                        "athlete_id": strava_manager.athlete_id,
+                        "activity_id": activity_id,
+                    },
+                    key=f"backfill_stream:{strava_manager.athlete_id}:{activity_id}",
+                )
+
+    has_more = count == page_size
+    start_dates = [x for x in activities_columns["start_date"] if x is not None]
+    activity_store.set_states(
+        {
+            "backfill_status": "running" if has_more else "done",
+            "backfill_count": str(progress["count"] + count),
+            "backfill_before": (
+                to_sqlite_value(min(start_dates)) if start_dates else progress["before"]
+            ),
+        }
+    )
+    logging.info(
+        f"Backfill: {count} activities for athlete={strava_manager.athlete_id} "
+        f"before={progress['before']}"
+    )
+    return has_more
+
+
+def enqueue_backfill_page(athlete_id: int, delay: float = 0) -> None:
+    get_job_queue().enqueue(
+        kind="backfill_page",
+        payload={"athlete_id": athlete_id},
+        key=f"backfill_page:{athlete_id}",
+        delay=delay,
+    )
+
+
+def start_backfill(strava_manager: StravaManager) -> None:
+    """
+        First sync of an athlete: the newest page of activities is retrieved now
+        (the current calendar is displayed), the older pages by the job worker.
+        Near the rate limit the calendar is empty, the first page is retrieved by
+        the job worker once the budget is reset.
+    :param strava_manager: StravaManager of the athlete
+    """
+    try:
+        has_more = fetch_backfill_page(strava_manager)
+    except RateLimitBudgetExceeded as error:
+        logging.info(f"Backfill: first page postponed: {error}")
+        enqueue_backfill_page(athlete_id=strava_manager.athlete_id, delay=error.wait)
+        return
+    if has_more:
+        enqueue_backfill_page(athlete_id=strava_manager.athlete_id)
+
+
+@register_job_handler("backfill_page")
+def handle_backfill_page(payload: Dict) -> None:
+    """Retrieve the next page of the history, throttled by the backfill bucket"""
+    wait = get_backfill_bucket().acquire()
+    if wait:
+        enqueue_backfill_page(athlete_id=payload["athlete_id"], delay=wait)
+        return
+
+    strava_manager = StravaManager.for_athlete(athlete_id=payload["athlete_id"])
+    if fetch_backfill_page(strava_manager):
+        enqueue_backfill_page(athlete_id=payload["athlete_id"])
+
+
+@register_job_handler("backfill_stream")
+def handle_backfill_stream(payload: Dict) -> None:
+    """Save the stream of one activity in the activity store"""
+    strava_manager = StravaManager.for_athlete(athlete_id=payload["athlete_id"])
+    if strava_manager.activity_store.has_activity_stream(payload["activity_id"]):
+        return
+
+    wait = get_backfill_bucket().acquire()
+    if wait:
+        get_job_queue().enqueue(
+            kind="backfill_stream",
+            payload=payload,
+            key=f"backfill_stream:{payload['athlete_id']}:{payload['activity_id']}",
+            delay=wait,
+        )
+        return
+
+    strava_manager.get_activity_stream(activity_id=payload["activity_id"])
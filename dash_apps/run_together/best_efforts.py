@@ -0,0 +1,278 @@
+import sqlite3
+from contextlib import closing
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from dash_apps.run_together.activity_stream import ActivityStream
+
+# Distances of the best efforts in meters
+BEST_EFFORT_DISTANCES = {
+    "400 m": 400,
+    "1 km": 1000,
+    "5 km": 5000,
+    "10 km": 10000,
+    "Half Marathon": 21097.5,
+    "Marathon": 42195,
+}
+
+# Durations of the mean-max curve in seconds (best average pace for each duration)
+MEAN_MAX_DURATIONS = [
+    10,
+    20,
+    30,
+    60,
+    120,
+    180,
+    300,
+    600,
+    900,
+    1200,
+    1800,
+    2700,
+    3600,
+    5400,
+    7200,
+    10800,
+    14400,
+]
+
+# Kinds of effort: best time for a distance, best distance for a duration
+DISTANCE = "distance"
+DURATION = "duration"
+
+
+def get_window_ends(
+    position: np.ndarray, other: np.ndarray, lengths: np.ndarray
+) -> np.ndarray:
+    """
+        For each sample i and each length L, the value of other where position
+        reaches position[i] + L (linear interpolation between two samples).
+        The end of every window is found at once by a binary search of the
+        position[i] + L targets with np.searchsorted: O(n log n) per length.
+    :param position: non decreasing values (distance or time of the samples)
+    :param other: the other stream (time or distance of the samples)
+    :param lengths: lengths of the windows, in the unit of position
+    :return: shape (number of lengths, number of samples), NaN if the window goes
+        beyond the end of the activity
+    """
+    targets = position[np.newaxis, :] + lengths[:, np.newaxis]
+    ends = np.searchsorted(position, targets, side="left")
+    valid = ends < len(position)
+    ends = np.clip(ends, 1, len(position) - 1)
+    starts = ends - 1
+
+    step = position[ends] - position[starts]
+    ratio = np.divide(
+        targets - position[starts], step, out=np.ones_like(targets), where=step > 0
+    )
+    values = other[starts] + ratio * (other[ends] - other[starts])
+    return np.where(valid, values, np.nan)
+
+
+def get_best_times(
+    time: np.ndarray, distance: np.ndarray, distances: List[float]
+) -> np.ndarray:
+    """
+    :param time: elapsed seconds of the samples
+    :param distance: meters of the samples
+    :param distances: distances of the efforts in meters
+    :return: fastest time in seconds to cover each distance, NaN if the activity
+        is shorter
+    """
+    if len(time) < 2:
+        return np.full(len(distances), np.nan)
+    distance = np.maximum.accumulate(distance)
+    end_times = get_window_ends(distance, time, np.asarray(distances, dtype=float))
+    with np.errstate(all="ignore"):
+        best_times = np.nanmin(end_times - time[np.newaxis, :], axis=1, initial=np.inf)
+    return np.where(np.isinf(best_times), np.nan, best_times)
+
+
+def get_best_distances(
+    time: np.ndarray, distance: np.ndarray, durations: List[float]
+) -> np.ndarray:
+    """
+    :param time: elapsed seconds of the samples
+    :param distance: meters of the samples
+    :param durations: durations in seconds
+    :return: longest distance in meters covered during each duration, NaN if the
+        activity is shorter
+    """
+    if len(time) < 2:
+        return np.full(len(durations), np.nan)
+    distance = np.maximum.accumulate(distance)
+    end_distances = get_window_ends(time, distance, np.asarray(durations, dtype=float))
+    with np.errstate(all="ignore"):
+        best_distances = np.nanmax(
+            end_distances - distance[np.newaxis, :], axis=1, initial=-np.inf
+        )
+    return np.where(np.isinf(best_distances), np.nan, best_distances)
+
+
+def get_activity_efforts(
+    activity_stream: ActivityStream,
+) -> List[Tuple[str, float, float]]:
+    """
+        Best efforts of one activity from its time and distance streams
+    :param activity_stream: stream of the activity
+    :return: list of (DISTANCE, meters, best seconds) and
+        (DURATION, seconds, best meters), only the efforts covered by the activity
+    """
+    if len(activity_stream.distance) != len(activity_stream.time):
+        return []
+    time = activity_stream.time.astype(np.float64)
+    distance = activity_stream.distance.astype(np.float64)
+    distances = list(BEST_EFFORT_DISTANCES.values())
+
+    efforts = [
+        (DISTANCE, value, float(result))
+        for value, result in zip(distances, get_best_times(time, distance, distances))
+    ] + [
+        (DURATION, value, float(result))
+        for value, result in zip(
+            MEAN_MAX_DURATIONS, get_best_distances(time, distance, MEAN_MAX_DURATIONS)
+        )
+    ]
+    return [effort for effort in efforts if not np.isnan(effort[2])]
+
+
+class BestEffortsStoreMixin:
+    """
+    Best efforts of the runs of the ActivityStore: the efforts of each activity
+    and the best of each season
+    """
+
+    @staticmethod
+    def create_best_efforts_tables(conn: sqlite3.Connection) -> None:
+        """Create the tables of the efforts per activity and of the best efforts"""
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS activity_efforts (id INTEGER, kind TEXT, "
+            "value REAL, result REAL, PRIMARY KEY (id, kind, value))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS best_efforts (kind TEXT, value REAL, "
+            "season TEXT, result REAL, id INTEGER, "
+            "PRIMARY KEY (kind, value, season))"
+        )
+
+    @staticmethod
+    def update_best_efforts(
+        conn: sqlite3.Connection, activity_ids: List[int], seasons: List[str]
+    ) -> None:
+        """
+            Compute again the best efforts of the seasons from the efforts saved per
+            activity (no stream needed), if some of the activities modified have
+            efforts: an activity deleted, or moved to another season or type, may
+            hold a best effort.
+        :param conn: connection with the transaction saving the activities
+        :param activity_ids: activities added / modified / deleted
+        :param seasons: years of the start dates of the activities (old and new)
+        """
+        seasons = sorted(set(seasons))
+        # Split the ids to stay under the maximum number of SQLite parameters
+        if not seasons or not any(
+            conn.execute(
+                f"SELECT 1 FROM activity_efforts "
+                f"WHERE id IN ({', '.join('?' * len(ids))}) LIMIT 1",
+                ids,
+            ).fetchone()
+            for ids in [
+                activity_ids[i : i + 500] for i in range(0, len(activity_ids), 500)
+            ]
+        ):
+            return
+
+        seasons_placeholders = ", ".join("?" * len(seasons))
+        conn.execute(
+            f"DELETE FROM best_efforts WHERE season IN ({seasons_placeholders})",
+            seasons,
+        )
+        conn.execute(
+            f"INSERT INTO best_efforts "
+            f"SELECT kind, value, season, result, id FROM ("
+            f"SELECT kind, value, substr(start_date_local, 1, 4) AS season, result, "
+            f"id, ROW_NUMBER() OVER (PARTITION BY kind, value, "
+            f"substr(start_date_local, 1, 4) ORDER BY CASE kind "
+            f"WHEN 'distance' THEN result ELSE -result END) AS rank "
+            f"FROM activity_efforts JOIN activities USING (id) "
+            f"WHERE type = 'Run' "
+            f"AND substr(start_date_local, 1, 4) IN ({seasons_placeholders})"
+            f") WHERE rank = 1",
+            seasons,
+        )
+
+    @staticmethod
+    def delete_activity_efforts(
+        conn: sqlite3.Connection, activity_ids: List[int]
+    ) -> None:
+        """Delete the efforts of the activities deleted"""
+        conn.executemany(
+            "DELETE FROM activity_efforts WHERE id = ?",
+            [(x,) for x in activity_ids],
+        )
+
+    def save_activity_efforts(
+        self, activity_id: int, efforts: List[Tuple[str, float, float]]
+    ) -> None:
+        """
+            Save the best efforts of one activity (see get_activity_efforts) and
+            merge them into the best efforts of its season: only the efforts better
+            than the saved ones are written, the history is not read again.
+            If the activity already had efforts, its season is computed again from
+            the efforts saved per activity.
+        :param activity_id:
+        :param efforts: list of (kind, value, result)
+        """
+        with closing(self.connect()) as conn, conn:
+            had_efforts = conn.execute(
+                "SELECT 1 FROM activity_efforts WHERE id = ? LIMIT 1", (activity_id,)
+            ).fetchone()
+            conn.execute("DELETE FROM activity_efforts WHERE id = ?", (activity_id,))
+            conn.executemany(
+                "INSERT INTO activity_efforts VALUES (?, ?, ?, ?)",
+                [(activity_id,) + tuple(effort) for effort in efforts],
+            )
+            if had_efforts:
+                self.update_best_efforts(
+                    conn=conn,
+                    activity_ids=[activity_id],
+                    seasons=[
+                        x[:4]
+                        for x in self.get_start_dates_local(
+                            conn=conn, activity_ids=[activity_id]
+                        )
+                        if x
+                    ],
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO best_efforts "
+                    "SELECT kind, value, substr(start_date_local, 1, 4), result, id "
+                    "FROM activity_efforts JOIN activities USING (id) "
+                    "WHERE id = ? AND type = 'Run' "
+                    "ON CONFLICT (kind, value, season) DO UPDATE "
+                    "SET result = excluded.result, id = excluded.id "
+                    "WHERE (kind = 'distance' AND excluded.result < result) "
+                    "OR (kind = 'duration' AND excluded.result > result)",
+                    (activity_id,),
+                )
+
+    def get_best_efforts(self, kind: str, season: str = None) -> List[Dict]:
+        """
+            Return the best efforts of one season, or of all the seasons
+        :param kind: distance (best time in seconds for each distance in meters) or
+            duration (best distance in meters for each duration in seconds)
+        :param season: year (2024), None for all the seasons
+        :return: list of {value, result, id, season} sorted by value
+        """
+        # Bare columns of SQLite: id and season are the ones of the row with the
+        # MIN / MAX result
+        aggregate = "MIN" if kind == "distance" else "MAX"
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                f"SELECT value, {aggregate}(result), id, season FROM best_efforts "
+                f"WHERE kind = ? AND season LIKE ? GROUP BY value ORDER BY value",
+                (kind, season or "%"),
+            ).fetchall()
+        return [dict(zip(["value", "result", "id", "season"], row)) for row in rows]
@@ -0,0 +1,117 @@
+import functools
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import environ as env
+from typing import Callable, Dict, List, Tuple
+
+from flask import copy_current_request_context
+
+from dash_apps.run_together.fragment_cache import is_fragment_cache_shared
+from dash_apps.run_together.rate_budget import BACKGROUND, strava_priority
+from dash_apps.run_together.components.calendar_training import (
+    get_month_list,
+    get_monthly_calendar,
+    get_yearly_calendar,
+)
+
+# Threads of the process rendering in advance the calendars next to the displayed one
+_prefetch_executor = ThreadPoolExecutor(
+    max_workers=int(env.get("calendarPrefetchWorkers") or 2),
+    thread_name_prefix="calendar-prefetch",
+)
+
+# Prefetches of each athlete not started yet, cancelled when the athlete navigates.
+# The entry of an athlete is removed once its prefetches are done. Reentrant lock:
+# the cancellation of a future runs its done callback in the same thread.
+_athlete_futures: Dict[int, List[Future]] = {}
+_athlete_futures_lock = threading.RLock()
+
+
+def forget_prefetches(athlete_id: int, futures: List[Future], _: Future) -> None:
+    """Done callback: remove the prefetches of the athlete once all are done"""
+    with _athlete_futures_lock:
+        if _athlete_futures.get(athlete_id) is futures and all(
+            future.done() for future in futures
+        ):
+            del _athlete_futures[athlete_id]
+
+
+def get_adjacent_months(year: int, month: str) -> List[Tuple[int, str]]:
+    """
+    :param year: displayed year
+    :param month: displayed month (JAN, FEB, ...)
+    :return: [(year, month) before, (year, month) after]
+    """
+    months = get_month_list()
+    index = year * 12 + months.index(month)
+    return [(i // 12, months[i % 12]) for i in (index - 1, index + 1)]
+
+
+def get_adjacent_years(year: int) -> List[int]:
+    """
+    :param year: displayed year
+    :return: [year before, year after]
+    """
+    return [year - 1, year + 1]
+
+
+def schedule_prefetch(athlete_id: int, calls: List[Callable]) -> None:
+    """
+        Run the calls in the prefetch thread pool, in a copy of the context of the
+        current request (session of the athlete). The prefetches of the athlete
+        still waiting in the pool are cancelled first: only the periods next to the
+        last displayed one are rendered.
+        Nothing is prefetched when the fragment cache is in the memory of each of
+        several gunicorn workers: the next click would rarely reach this worker.
+    :param athlete_id: athlete navigating in the calendar
+    :param calls: functions without argument rendering a calendar
+    """
+    if athlete_id is None or not is_fragment_cache_shared():
+        return
+
+    def run(call: Callable) -> None:
+        try:
+            with strava_priority(BACKGROUND):
+                call()
+        except Exception:
+            logging.exception("Calendar prefetch failed")
+
+    with _athlete_futures_lock:
+        for future in _athlete_futures.get(athlete_id, []):
+            future.cancel()
+        futures = [
+            _prefetch_executor.submit(copy_current_request_context(run), call)
+            for call in calls
+        ]
+        _athlete_futures[athlete_id] = futures
+    for future in futures:
+        future.add_done_callback(
+            functools.partial(forget_prefetches, athlete_id, futures)
+        )
+
+
+def prefetch_monthly_calendars(athlete_id: int, year: int, month: str) -> None:
+    """
+    Render in the background the months before and after the displayed month:
+    the calendars are stored in the fragment cache (see cache_fragment), a click
+    on prev-month / next-month gets them without waiting.
+    """
+    schedule_prefetch(
+        athlete_id=athlete_id,
+        calls=[
+            lambda year=year, month=month: get_monthly_calendar(year=year, month=month)
+            for year, month in get_adjacent_months(year=year, month=month)
+        ],
+    )
+
+
+def prefetch_yearly_calendars(athlete_id: int, year: int) -> None:
+    """Render in the background the years before and after the displayed year"""
+    schedule_prefetch(
+        athlete_id=athlete_id,
+        calls=[
+            lambda year=year: get_yearly_calendar(year=year)
+            for year in get_adjacent_years(year=year)
+        ],
+    )
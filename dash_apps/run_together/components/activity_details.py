@@ -1,16 +1,101 @@
-from typing import Union, Dict
+from typing import Optional, Union
 from dash.html import Span, Div
 from dash import html
 import plotly.graph_objects as go
 from dash import dcc
 import logging
 import dash_leaflet as dl
+import numpy as np
 from flask import session
 
+from dash_apps.run_together.activity_stream import ActivityStream
+from dash_apps.run_together.downsampling import lttb_indexes
+from dash_apps.run_together.polyline_simplification import (
+    get_fit_zoom,
+    simplify_for_zoom,
+)
+from dash_apps.run_together.components.zones import get_graph_zones
 from dash_apps.run_together.strava_manager import StravaManager
 
+# Size of the activity map in pixels
+MAP_SIZE = 500
 
-def get_activity_map(activity_id: int, activity_stream: dict) -> dl.Map:
+# Maximum number of points drawn on the heart rate graph (LTTB downsampling)
+GRAPH_MAX_POINTS = 2000
+
+# Above this number of points the graph is drawn with WebGL instead of SVG
+SCATTERGL_THRESHOLD = 1000
+
+
+def get_graph_stream(activity_stream: ActivityStream) -> ActivityStream:
+    """
+        Return the samples of the stream drawn on the heart rate graph: the stream is
+        downsampled with LTTB to GRAPH_MAX_POINTS points. The point i of the graph is
+        the sample indexes[i] of the activity stream, its position is kept to display
+        it on the map on hover.
+        Without heart rate (ex: no heart rate monitor) the shape of the speed is kept
+        instead, without distance the samples are taken at a regular interval: the
+        graph never has more than GRAPH_MAX_POINTS points.
+
+    :param activity_stream:
+    :return: ActivityStream with only the samples of the graph
+    """
+    n_samples = len(activity_stream)
+    if len(activity_stream.distance) != n_samples:
+        indexes = np.unique(
+            np.linspace(0, n_samples - 1, min(n_samples, GRAPH_MAX_POINTS)).astype(
+                np.int64
+            )
+        )
+        return activity_stream[indexes]
+
+    has_heartrate = len(activity_stream.heartrate) == n_samples
+    indexes = lttb_indexes(
+        x=activity_stream.distance,
+        y=activity_stream.heartrate if has_heartrate else activity_stream.speed,
+        n_out=GRAPH_MAX_POINTS,
+    )
+    return activity_stream[indexes]
+
+
+def get_polyline_positions(activity_stream: ActivityStream, zoom: float) -> list:
+    """
+        Return the positions of the activity polyline simplified for the zoom level
+        of the map: the points which would be drawn on the same pixel are not sent
+        to the browser.
+
+    :param activity_stream:
+    :param zoom: zoom level of the map
+    :return: list of [lat, lng]
+    """
+    indexes = simplify_for_zoom(latlng=activity_stream.latlng, zoom=zoom)
+    logging.info(
+        f"Activity polyline: {len(indexes)}/{len(activity_stream.latlng)} points "
+        f"for zoom={zoom}"
+    )
+    return activity_stream.latlng[indexes].astype(float).round(6).tolist()
+
+
+def get_activity_polyline_positions(activity_id: int, zoom: float) -> Optional[list]:
+    """
+        Return the positions of the activity polyline for a new zoom level of the map.
+        The stream is read from the stream cache or the activity store (saved when the
+        activity was displayed): a zoom never calls STRAVA API.
+
+    :param activity_id:
+    :param zoom: zoom level of the map
+    :return: list of [lat, lng], None if the stream is not saved
+    """
+    strava_manager = StravaManager()
+    activity_stream = strava_manager.get_saved_activity_stream(activity_id=activity_id)
+    if activity_stream is None:
+        return None
+    return get_polyline_positions(
+        activity_stream=ActivityStream.from_strava(activity_stream), zoom=zoom
+    )
+
+
+def get_activity_map(activity_id: int, activity_stream: ActivityStream) -> dl.Map:
     """
         Return the Activity Map
 
@@ -19,25 +104,24 @@ def get_activity_map(activity_id: int, activity_stream: dict) -> dl.Map:
     :return: dl.Map ot the activity
     """
 
-    # Manage the size of the map
-    min_latitude = min([x[0] for x in activity_stream["latlng"]["data"]])
-    max_latitude = max([x[0] for x in activity_stream["latlng"]["data"]])
-    min_longitude = min([x[1] for x in activity_stream["latlng"]["data"]])
-    max_longitude = max([x[1] for x in activity_stream["latlng"]["data"]])
-
-    bounds_points = [
-        [min_latitude, min_longitude],  # South West
-        [max_latitude, max_longitude],  # North East
-    ]
+    # Manage the size of the map: South West & North East points
+    bounds_points = activity_stream.bounds
     session["bounds_activity_map"] = bounds_points
 
+    # Level of detail of the polyline for the zoom used to display the whole activity
+    zoom = (
+        get_fit_zoom(bounds=bounds_points, width=MAP_SIZE, height=MAP_SIZE)
+        if bounds_points
+        else 0
+    )
+
     # https://leaflet-extras.github.io/leaflet-providers/preview/
     url = "https://tiles.stadiamaps.com/tiles/outdoors/{z}/{x}/{y}{r}.png"
     # url = "https://tiles.stadiamaps.com/tiles/alidade_smooth/{z}/{x}/{y}{r}.png"
     logging.info(url)
 
     activity_map = dl.Map(
-        style={"width": "500px", "height": "500px"},
+        style={"width": f"{MAP_SIZE}px", "height": f"{MAP_SIZE}px"},
         id={"type": "activity-map", "index": activity_id},
         bounds=bounds_points,
         children=[
@@ -45,7 +129,10 @@ def get_activity_map(activity_id: int, activity_stream: dict) -> dl.Map:
                 url=url,
             ),
             dl.Polyline(
-                positions=activity_stream["latlng"]["data"],
+                id={"type": "activity-polyline", "index": activity_id},
+                positions=get_polyline_positions(
+                    activity_stream=activity_stream, zoom=zoom
+                ),
             ),
             dl.LayerGroup(id="marker-map", children=[]),
         ],
@@ -58,32 +145,33 @@ def get_activity_map(activity_id: int, activity_stream: dict) -> dl.Map:
     return activity_map
 
 
-def get_graph_heart_rate(activity_stream: Dict) -> dcc.Graph:
+def get_graph_heart_rate(activity_stream: ActivityStream) -> dcc.Graph:
     """
     Generate a heart rate graph.
 
     This function creates a heart rate graph based on the provided activity
-    stream data,displaying heart rate values over distance.
+    stream data (see get_graph_stream),displaying heart rate values over distance.
     The graph is customized with specificstyling and hover interactions.
 
-    :param activity_stream: Dictionary containing activity stream data.
+    :param activity_stream: ActivityStream containing activity stream data.
     :return: dcc.Graph component representing the heart rate graph.
     """
     # Create a new Plotly figure
     fig = go.Figure()
 
-    # Add heart rate data as a scatter plot
-    fig.add_trace(
-        go.Scatter(
-            x=[
-                x / 1000 for x in activity_stream["distance"]["data"]
-            ],  # Convert distance to km
-            y=activity_stream["heartrate"]["data"],
-            mode="lines",
-            line=dict(color="#F39C12"),
-            hovertemplate="Heart Rate: %{y} bpm<extra></extra>",  # Hover tooltip template
+    # Add heart rate data as a scatter plot, drawn with WebGL for the long activities
+    # (no trace for an activity without heart rate)
+    scatter = go.Scattergl if len(activity_stream) > SCATTERGL_THRESHOLD else go.Scatter
+    if len(activity_stream.heartrate):
+        fig.add_trace(
+            scatter(
+                x=activity_stream.distance_km,  # Convert distance to km
+                y=activity_stream.heartrate,
+                mode="lines",
+                line=dict(color="#F39C12"),
+                hovertemplate="Heart Rate: %{y} bpm<extra></extra>",  # Hover tooltip template
+            )
         )
-    )
 
     # Customize layout of the graph
     fig.update_layout(
@@ -120,23 +208,48 @@ def get_activity_details(activity_id: int) -> list[Union[Span, Div]]:
     Retrieve activity details.
 
     This function retrieves activity details for a given activity ID,
-    including the activity stream, activity map, heart rate graph,
-    and grid layout for displaying map and graph components.
+    including the activity and the activity stream (fetched in parallel),
+    activity map, heart rate graph, and grid layout for displaying map and graph
+    components.
 
     :param activity_id: ID of the activity.
     :return: List containing HTML components for activity details.
     """
-    # Retrieve activity stream data
+    # Retrieve in parallel the activity details and the activity stream data
     strava_manager = StravaManager()
-    activity_stream = strava_manager.get_activity_stream(activity_id=activity_id)
+    activity_bundle = strava_manager.get_activity_bundle(
+        activity_id=activity_id, resources=("activity", "stream")
+    )
+    activity = activity_bundle["activity"]
+    title = html.Div(children=f"{activity['name']} (Activity id: {activity_id})")
+
+    # Near the Strava rate limit the stream is not retrieved: only the summary
+    if activity_bundle["stream"] is None:
+        return [
+            html.Br(),
+            title,
+            html.Div(
+                children="The map and the graphs of the activity are not available "
+                "(Strava rate limit reached), try again in a few minutes."
+            ),
+        ]
+    activity_stream = ActivityStream.from_strava(activity_bundle["stream"])
 
     # Get activity map component
     activity_map = get_activity_map(
         activity_id=activity_id, activity_stream=activity_stream
     )
 
-    # Get heart rate graph component
-    heart_rate_graph = get_graph_heart_rate(activity_stream=activity_stream)
+    # Get heart rate graph component, with the downsampled stream
+    graph_stream = get_graph_stream(activity_stream=activity_stream)
+    heart_rate_graph = get_graph_heart_rate(activity_stream=graph_stream)
+
+    # Time in the heart rate / pace zones, saved in the activity store
+    zones_graph = get_graph_zones(
+        zones=strava_manager.get_activity_zones(
+            activity_id=activity_id, activity_stream=activity_stream
+        )
+    )
 
     # Create grid layout for displaying map and graph components
     grid = html.Div(
@@ -146,8 +259,12 @@ def get_activity_details(activity_id: int) -> list[Union[Span, Div]]:
                 className="activities-graph-container",
                 children=heart_rate_graph,
             ),
-            # store the activity stream in a dash component to be used in the callbacl
-            dcc.Store(id="activity-stream", data=activity_stream),
+            # store only the position of each point of the graph, used by the
+            # clientside callback displaying the hovered position on the map
+            dcc.Store(
+                id="activity-stream",
+                data={"latlng": graph_stream.get_latlng_list()},
+            ),
         ],
         className="grid-activity-map-plot",  # CSS class for styling
     )
@@ -155,7 +272,8 @@ def get_activity_details(activity_id: int) -> list[Union[Span, Div]]:
     # Return list of HTML components for activity details
     return [
         html.Br(),
-        html.Div(children=f"Activity id: {activity_id}"),
+        title,
         grid,
+        zones_graph,
         html.Div(id="hover", children="test"),
     ]
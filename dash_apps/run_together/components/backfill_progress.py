@@ -0,0 +1,44 @@
+from dash import dcc, html
+from typing import Dict, List, Tuple
+
+from dash_apps.run_together.backfill import get_backfill_progress
+from dash_apps.run_together.strava_manager import StravaManager
+
+# Refresh period of the progress of the backfill in milliseconds
+BACKFILL_PROGRESS_INTERVAL = 5000
+
+
+def get_backfill_progress_text(progress: Dict) -> str:
+    """
+    :param progress: see get_backfill_progress
+    :return: text displayed while the history of the athlete is retrieved
+    """
+    if progress["status"] != "running":
+        return ""
+    since = f" (back to {progress['before'][:7]})" if progress["before"] else ""
+    return f"Importing your Strava history: {progress['count']} activities{since}"
+
+
+def get_backfill_progress_update() -> Tuple[str, bool]:
+    """
+    :return: text of the progress of the backfill of the athlete of the session,
+        True once the backfill is done (no more refresh)
+    """
+    progress = get_backfill_progress(StravaManager())
+    return get_backfill_progress_text(progress), progress["status"] != "running"
+
+
+def get_backfill_progress_component() -> List:
+    """
+    Return the progress of the backfill, refreshed every BACKFILL_PROGRESS_INTERVAL
+    until the whole history is retrieved (see update_backfill_progress)
+    """
+    text, done = get_backfill_progress_update()
+    return [
+        html.Div(id="backfill-progress", children=text),
+        dcc.Interval(
+            id="backfill-progress-interval",
+            interval=BACKFILL_PROGRESS_INTERVAL,
+            disabled=done,
+        ),
+    ]
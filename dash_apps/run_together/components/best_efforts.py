@@ -0,0 +1,133 @@
+from datetime import date
+
+import plotly.graph_objects as go
+from dash import dcc, html
+
+from dash_apps.run_together.best_efforts import (
+    BEST_EFFORT_DISTANCES,
+    DISTANCE,
+    DURATION,
+)
+from dash_apps.run_together.strava_manager import StravaManager, seconds_to_hms
+
+
+def format_pace(seconds_per_km: float) -> str:
+    """Format a pace in seconds per km: 4:05 /km"""
+    minutes, seconds = divmod(int(round(seconds_per_km)), 60)
+    return f"{minutes}:{seconds:02d} /km"
+
+
+def get_best_efforts_table(season: int) -> html.Table:
+    """
+    Return the table of the best time for each distance: all time and season
+
+    :param season: current year
+    :return: html.Table
+    """
+    strava_manager = StravaManager()
+    best_times = {
+        column: strava_manager.get_best_efforts(kind=DISTANCE, season=year)
+        .set_index("value")["result"]
+        .to_dict()
+        for column, year in [("all", None), ("season", season)]
+    }
+
+    rows = [
+        html.Tr(
+            children=[
+                html.Td(children=name),
+                *[
+                    html.Td(
+                        children=seconds_to_hms(best_times[column][distance])
+                        if distance in best_times[column]
+                        else "-"
+                    )
+                    for column in ["all", "season"]
+                ],
+            ]
+        )
+        for name, distance in BEST_EFFORT_DISTANCES.items()
+    ]
+    return html.Table(
+        className="best-efforts-table",
+        children=[
+            html.Thead(
+                children=html.Tr(
+                    children=[
+                        html.Th(children=""),
+                        html.Th(children="All Time"),
+                        html.Th(children=str(season)),
+                    ]
+                )
+            ),
+            html.Tbody(children=rows),
+        ],
+    )
+
+
+def get_graph_mean_max_pace(season: int) -> dcc.Graph:
+    """
+    Generate the mean-max pace curve: best average pace for each duration, all time
+    and season.
+
+    :param season: current year
+    :return: dcc.Graph component representing the mean-max pace curve.
+    """
+    strava_manager = StravaManager()
+    fig = go.Figure()
+    for year, name, color in [
+        (None, "All Time", "#2E86C1"),
+        (season, str(season), "#F39C12"),
+    ]:
+        best_efforts_df = strava_manager.get_best_efforts(kind=DURATION, season=year)
+        fig.add_trace(
+            go.Scatter(
+                x=best_efforts_df["value"] / 60,
+                y=best_efforts_df["pace"] / 60,
+                name=name,
+                mode="lines+markers",
+                line=dict(color=color),
+                customdata=[format_pace(x) for x in best_efforts_df["pace"]],
+                hovertemplate="%{x} min: %{customdata}<extra></extra>",
+            )
+        )
+
+    fig.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",  # Set plot background color
+        margin=dict(l=20, r=20, t=20, b=20),
+        legend=dict(orientation="h"),
+    )
+    fig.update_xaxes(type="log", title="min")
+    # The fastest pace at the top
+    fig.update_yaxes(autorange="reversed", title="min/km")
+
+    return dcc.Graph(
+        figure=fig,
+        config={
+            "displayLogo": False,
+            "displayModeBar": False,
+        },  # Disable display of logo and mode bar
+        responsive=True,
+        id="mean-max-pace-graph",
+    )
+
+
+def get_best_efforts_component() -> html.Div:
+    """Return the best efforts and the mean-max pace curve of the runs"""
+    season = date.today().year
+    return html.Div(
+        className="training-load-container",
+        children=[
+            html.Div(
+                style={"font-size": "24px", "font-weight": "bold"},
+                children="Best Efforts",
+            ),
+            html.Div(
+                className="grid-best-efforts",
+                children=[
+                    get_best_efforts_table(season=season),
+                    get_graph_mean_max_pace(season=season),
+                ],
+            ),
+        ],
+    )
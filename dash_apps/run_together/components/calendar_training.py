@@ -2,8 +2,11 @@ from dash import html
 import pandas as pd
 import calendar
 from datetime import datetime, date
-from typing import List
+from typing import Dict, List
 
+from dash_apps.run_together.rollups import get_rollup_bucket
+from dash_apps.run_together.components.zones import get_zone_bar
+from dash_apps.run_together.fragment_cache import cache_fragment
 from dash_apps.run_together.strava_manager import StravaManager
 
 
@@ -46,6 +49,28 @@ def get_sunday_of_week(year, week_number) -> date:
     return date.fromisocalendar(year=year, week=week_number, day=7)
 
 
+def get_activities_by_day(
+    activities_df: pd.DataFrame,
+) -> Dict[pd.Timestamp, List[Dict]]:
+    """
+    Bucket the activities by day: the start date is floored to the day and a single
+    groupby gives the list of activities (type, distance_km) of each day.
+
+    :param activities_df: activities from get_strava_activities_pandas
+    :return: {day: [activity, ...]} with the activities sorted by start date
+    """
+    activities_df = activities_df.sort_values("start_date_local")
+    activity_days = activities_df["start_date_local"].dt.floor("D")
+
+    return {
+        day: day_activities.to_dict("records")
+        for day, day_activities in activities_df[["type", "distance_km"]].groupby(
+            activity_days
+        )
+    }
+
+
+@cache_fragment
 def get_monthly_calendar(year: int, month: str) -> List[html.Div]:
     """
     Return the monthly calendar for the specified year and month.
@@ -81,11 +106,10 @@ def get_monthly_calendar(year: int, month: str) -> List[html.Div]:
         day=7,
     )
 
-    # Get all day between both day & add it to a DataFrame
+    # Get all day between both day: complete weeks from Monday to Sunday
     all_days_selected_month = pd.date_range(
         start=first_monday_before_first_day, end=first_sunday_after_last_day, freq="d"
     )
-    month_df = pd.DataFrame({"date": all_days_selected_month})
 
     # Get the activities from STRAVA between these both days
     strava_manager = StravaManager()
@@ -93,27 +117,15 @@ def get_monthly_calendar(year: int, month: str) -> List[html.Div]:
         start_date=first_monday_before_first_day, end_date=first_sunday_after_last_day
     )
 
-    # Merge the DataFrame with activities and the one with all days to get a complete calendar
-    month_df["date_str"] = month_df["date"].dt.strftime("%Y-%m-%d")
-    activities_df["start_date_local_str"] = activities_df[
-        "start_date_local"
-    ].dt.strftime("%Y-%m-%d")
-
-    full_calendar = pd.merge(
-        left=month_df,
-        right=activities_df,
-        left_on="date_str",
-        right_on="start_date_local_str",
-        how="left",
-    )
+    # Bucket the activities by day in one pass
+    activities_by_day = get_activities_by_day(activities_df=activities_df)
 
-    # Calculate week_number & day associate to each date
-    full_calendar["week_number"] = (
-        full_calendar["date"].dt.to_period("W").apply(lambda x: x.week)
-    )
-    full_calendar["day"] = (
-        full_calendar["date"].dt.to_period("D").apply(lambda x: x.day)
-    )
+    # Time in the heart rate zones of the runs of each week
+    weekly_zones = strava_manager.get_zones_per_bucket(
+        period="week",
+        start_date=first_monday_before_first_day,
+        end_date=first_sunday_after_last_day,
+    )["heartrate"]
 
     # Header of the table with each weekday
     calendar_day_head = []
@@ -145,38 +157,33 @@ def get_monthly_calendar(year: int, month: str) -> List[html.Div]:
         )
 
     # Body of the table
-    # Iterate over each week of the specific month with a week_data pd subset for the week number
+    # Iterate over each week of the specific month (7 consecutive days from Monday)
     month_table_children = []
 
-    for week_number, week_data in full_calendar.groupby("week_number"):
+    for week_start in range(0, len(all_days_selected_month), 7):
         week_rows = []
 
         # Iterate over each day in the week
-        for day in week_data.day.unique():
-            # Extract activities for the current day
-            day_activities = week_data[
-                (week_data.day == day) & (~week_data.id.isna())
-            ].copy()
+        for day in all_days_selected_month[week_start : week_start + 7]:
             activity_div = []
 
-            if len(day_activities) > 0:
-                # Append the Activity List
-                for index, activity in day_activities.iterrows():
-                    activity_div.append(
-                        html.Div(
-                            className="event bg-[#F39C12] text-white rounded p-1 text-sm mb-1",
-                            children=[
-                                html.Span(
-                                    className="event-name",
-                                    children=f"{activity.type.upper()}: ",
-                                ),
-                                html.Span(
-                                    className="event-time",
-                                    children=f"{int(activity.distance_km)} km",
-                                ),
-                            ],
-                        )
+            # Append the Activity List of the current day
+            for activity in activities_by_day.get(day, []):
+                activity_div.append(
+                    html.Div(
+                        className="event bg-[#F39C12] text-white rounded p-1 text-sm mb-1",
+                        children=[
+                            html.Span(
+                                className="event-name",
+                                children=f"{activity['type'].upper()}: ",
+                            ),
+                            html.Span(
+                                className="event-time",
+                                children=f"{int(activity['distance_km'])} km",
+                            ),
+                        ],
                     )
+                )
 
             # Create a table cell for the day and add it to the week's row list
             week_rows.append(
@@ -193,7 +200,7 @@ def get_monthly_calendar(year: int, month: str) -> List[html.Div]:
                                     className="top h-5 w-full",
                                     children=[
                                         html.Span(
-                                            className="text-gray-500", children=day
+                                            className="text-gray-500", children=day.day
                                         )
                                     ],
                                 ),
@@ -214,6 +221,23 @@ def get_monthly_calendar(year: int, month: str) -> List[html.Div]:
         # Add the list of cells into the html element (tr: represents a table row)
         month_table_children.append(week_row)
 
+        # Add a row with the time in the heart rate zones of the week
+        week_bucket = get_rollup_bucket(
+            "week", all_days_selected_month[week_start].date().isoformat()
+        )
+        if week_bucket in weekly_zones.index:
+            month_table_children.append(
+                html.Tr(
+                    children=html.Td(
+                        colSpan=7,
+                        className="p-1",
+                        children=get_zone_bar(
+                            seconds=weekly_zones.loc[week_bucket].tolist()
+                        ),
+                    )
+                )
+            )
+
     # Create the overall HTML structure for the month's calendar
     month_calendar = html.Div(
         className="wrapper bg-white rounded shadow w-full",
@@ -252,6 +276,7 @@ def get_monthly_calendar(year: int, month: str) -> List[html.Div]:
     return calendar_container
 
 
+@cache_fragment
 def get_yearly_calendar(year: int) -> html.Div:
     """
     Generate the yearly calendar for the specified selected year.
@@ -259,18 +284,17 @@ def get_yearly_calendar(year: int) -> html.Div:
     :param year: int - Currently selected year by the user
     :return: HTML Div - Children of "calendar-training-container" in the body
     """
-    # Get the data for the selected year
+    # Get the monthly totals of the runs for the selected year (precomputed rollups)
     strava_manager = StravaManager()
-    activities_df = strava_manager.get_activities_for_year(year)
-
-    # Group the DataFrame by 'year' and 'month_of_year', then sum the 'distance_km' for each group
-    monthly_totals = (
-        activities_df[activities_df.year == year]
-        .groupby(["year", "month_of_year"])[["distance_km", "moving_time"]]
-        .sum()
-        .reset_index()
+    monthly_totals = strava_manager.get_rollups(
+        period="month", start_bucket=f"{year}-01", end_bucket=f"{year}-12"
     )
 
+    # Time in the heart rate zones of the runs of each month
+    monthly_zones = strava_manager.get_zones_per_bucket(
+        period="month", start_date=date(year, 1, 1), end_date=date(year, 12, 31)
+    )["heartrate"]
+
     # Set up an empty dict which is going to be use if there are no activity for this year
     activities_dict = {}
     max_value = 0
@@ -280,15 +304,14 @@ def get_yearly_calendar(year: int) -> html.Div:
         max_value = int(monthly_totals["distance_km"].max())
         # Create a dictionary with month abbreviations as keys and aggregated distances as values
         activities_dict = {
-            pd.to_datetime(f"{year}-{month}-01")
+            pd.to_datetime(f"{month}-01")
             .strftime("%b")
             .upper(): {
                 "distance": int(distance),
                 "moving_time": int(divmod(moving_time, 3600)[0]),
             }
-            for year, month, distance, moving_time in zip(
-                monthly_totals["year"],
-                monthly_totals["month_of_year"],
+            for month, distance, moving_time in zip(
+                monthly_totals["bucket"],
                 monthly_totals["distance_km"],
                 monthly_totals["moving_time"],
             )
@@ -322,6 +345,14 @@ def get_yearly_calendar(year: int) -> html.Div:
                 circle_size = 10
                 time_run = 0
 
+            # Time in the heart rate zones of the month
+            month_bucket = f"{year}-{j + 1:02d}"
+            zone_bar = get_zone_bar(
+                seconds=monthly_zones.loc[month_bucket].tolist()
+                if month_bucket in monthly_zones.index
+                else []
+            )
+
             # Create a calendar square with a button
             square = html.Button(
                 className="yearly-calendar-square",
@@ -339,6 +370,7 @@ def get_yearly_calendar(year: int) -> html.Div:
                             "width": f"{circle_size}px",
                         },
                     ),
+                    zone_bar,
                 ],
             )
             row_children.append(square)
@@ -0,0 +1,214 @@
+from datetime import date
+from typing import List, Optional
+
+from dash import dcc, html
+
+from dash_apps.run_together.groups import (
+    get_group_calendar,
+    get_group_rollups,
+    get_group_store,
+    get_leaderboard,
+    get_member_names,
+    sync_group_activities,
+)
+from dash_apps.run_together.strava_manager import StravaManager
+
+
+def get_session_athlete_id() -> int:
+    """Return the id of the athlete of the session"""
+    strava_manager = StravaManager()
+    if strava_manager.athlete_id is None:
+        strava_manager.get_athlete()
+    return strava_manager.athlete_id
+
+
+def get_group_options(athlete_id: int) -> List[dict]:
+    """Return the options of the dropdown of the groups of the athlete"""
+    return [
+        {"label": f"{group['name']} (code {group['code']})", "value": group["id"]}
+        for group in get_group_store().get_groups(athlete_id=athlete_id)
+    ]
+
+
+def get_leaderboard_table(leaderboard) -> html.Table:
+    """
+    Return the table of the members sorted by distance
+
+    :param leaderboard: see get_leaderboard
+    :return: html.Table
+    """
+    return html.Table(
+        className="best-efforts-table",
+        children=[
+            html.Thead(
+                children=html.Tr(
+                    children=[
+                        html.Th(children=""),
+                        html.Th(children="Athlete"),
+                        html.Th(children="Distance"),
+                        html.Th(children="Time"),
+                        html.Th(children="Runs"),
+                    ]
+                )
+            ),
+            html.Tbody(
+                children=[
+                    html.Tr(
+                        children=[
+                            html.Td(children=str(rank)),
+                            html.Td(children=row.name),
+                            html.Td(children=f"{row.distance_km:.1f} km"),
+                            html.Td(children=f"{row.hours:.1f} h"),
+                            html.Td(children=str(row.count)),
+                        ]
+                    )
+                    for rank, row in enumerate(
+                        leaderboard.itertuples(index=False), start=1
+                    )
+                ]
+            ),
+        ],
+    )
+
+
+def get_group_calendar_table(calendar, names: List[str]) -> html.Table:
+    """
+    Return the shared calendar: distance of each member in each month
+
+    :param calendar: see get_group_calendar
+    :param names: names of the members, in the order of the columns
+    :return: html.Table
+    """
+    return html.Table(
+        className="best-efforts-table",
+        children=[
+            html.Thead(
+                children=html.Tr(
+                    children=[
+                        html.Th(children=""),
+                        *[html.Th(children=name) for name in names],
+                    ]
+                )
+            ),
+            html.Tbody(
+                children=[
+                    html.Tr(
+                        children=[
+                            html.Td(
+                                children=date.fromisoformat(f"{bucket}-01").strftime(
+                                    "%b"
+                                )
+                            ),
+                            *[
+                                html.Td(children=f"{km:.0f} km" if km else "-")
+                                for km in distances
+                            ],
+                        ]
+                    )
+                    for bucket, distances in zip(
+                        calendar.index, calendar.to_numpy().tolist()
+                    )
+                ]
+            ),
+        ],
+    )
+
+
+def get_group_content(group_id: Optional[int], athlete_id: int, year: int) -> List:
+    """
+    Return the leaderboards (current month and year) and the shared calendar of the
+    group. The new activities of the members are retrieved in parallel, then the
+    view is built from the rollups saved for each member.
+
+    :param group_id: selected group, None if the athlete has no group
+    :param athlete_id: athlete of the session, only a member can see the group
+    :param year: year of the calendar
+    :return: children of the group content
+    """
+    if group_id is None:
+        return [html.Div(children="Create a group or join one with its code.")]
+
+    athlete_ids = get_group_store().get_members(group_id=group_id)
+    if athlete_id not in athlete_ids:
+        raise PermissionError(
+            f"athlete={athlete_id} is not a member of group={group_id}"
+        )
+    sync_group_activities(athlete_ids=athlete_ids)
+    group_rollups = get_group_rollups(
+        athlete_ids=athlete_ids,
+        period="month",
+        start_bucket=f"{year}-01",
+        end_bucket=f"{year}-12",
+    )
+    current_month = date.today().strftime("%Y-%m")
+    calendar = get_group_calendar(
+        group_rollups=group_rollups,
+        athlete_ids=athlete_ids,
+        buckets=[f"{year}-{month:02d}" for month in range(1, 13)],
+    )
+
+    return [
+        html.Div(
+            className="grid-best-efforts",
+            children=[
+                html.Div(
+                    children=[
+                        html.Div(className="race-goal-title", children=title),
+                        get_leaderboard_table(
+                            get_leaderboard(
+                                group_rollups=rollups, athlete_ids=athlete_ids
+                            )
+                        ),
+                    ]
+                )
+                for title, rollups in [
+                    (
+                        "This Month",
+                        group_rollups[group_rollups["bucket"] == current_month],
+                    ),
+                    (str(year), group_rollups),
+                ]
+            ],
+        ),
+        html.Div(className="race-goal-title", children="Shared Calendar"),
+        get_group_calendar_table(
+            calendar=calendar, names=get_member_names(athlete_ids)
+        ),
+    ]
+
+
+def get_group_component() -> html.Div:
+    """Return the forms to create or join a group and the view of the group"""
+    athlete_id = get_session_athlete_id()
+    options = get_group_options(athlete_id=athlete_id)
+    group_id = options[0]["value"] if options else None
+    return html.Div(
+        className="training-load-container",
+        children=[
+            html.Div(
+                style={"font-size": "24px", "font-weight": "bold"},
+                children="Run Together",
+            ),
+            html.Div(
+                className="group-form",
+                children=[
+                    dcc.Dropdown(
+                        id="group-select",
+                        options=options,
+                        value=group_id,
+                        clearable=False,
+                    ),
+                    dcc.Input(id="group-name", type="text", placeholder="New group"),
+                    html.Button("Create", id="group-create-btn"),
+                    dcc.Input(id="group-code", type="text", placeholder="Code"),
+                    html.Button("Join", id="group-join-btn"),
+                ],
+            ),
+            html.Div(
+                id="group-content",
+                children=get_group_content(
+                    group_id=group_id, athlete_id=athlete_id, year=date.today().year
+                ),
+            ),
+        ],
+    )
@@ -0,0 +1,149 @@
+from datetime import date
+from typing import List
+
+import plotly.graph_objects as go
+from dash import dcc, html
+
+from dash_apps.run_together.components.best_efforts import format_pace
+from dash_apps.run_together.race_goal import RACE_DISTANCES
+from dash_apps.run_together.strava_manager import StravaManager, seconds_to_hms
+
+
+def get_graph_weekly_progress(weekly) -> dcc.Graph:
+    """
+    Generate the graph of the weekly volume (bars) and of the long run of each week.
+
+    :param weekly: see get_weekly_progress
+    :return: dcc.Graph component representing the weekly progress.
+    """
+    fig = go.Figure()
+    fig.add_trace(
+        go.Bar(
+            x=weekly.index,
+            y=weekly["distance_km"].round(1),
+            name="Weekly Volume",
+            marker=dict(color="#F39C12"),
+            hovertemplate="%{x}: %{y} km<extra></extra>",
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=weekly.index,
+            y=weekly["long_run_km"].round(1),
+            name="Long Run",
+            mode="lines+markers",
+            line=dict(color="#2E86C1"),
+            hovertemplate="Long run %{x}: %{y} km<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",  # Set plot background color
+        margin=dict(l=20, r=20, t=20, b=20),
+        legend=dict(orientation="h"),
+        yaxis_title="km",
+    )
+
+    return dcc.Graph(
+        figure=fig,
+        config={
+            "displayLogo": False,
+            "displayModeBar": False,
+        },  # Disable display of logo and mode bar
+        responsive=True,
+        id="race-goal-graph",
+    )
+
+
+def get_race_goal_content() -> List:
+    """
+    Return the progress toward the race goal of the athlete of the session: time to
+    go, finish time predictions and weekly progress
+    """
+    progress = StravaManager().get_race_progress(today=date.today())
+    if progress is None:
+        return [html.Div(children="Set your next race to follow your progress.")]
+
+    goal = progress["goal"]
+    race_name = {v: k for k, v in RACE_DISTANCES.items()}.get(
+        goal["distance"], f"{goal['distance'] / 1e3:g} km"
+    )
+    weeks, days = divmod(max(progress["days_to_go"], 0), 7)
+    children = [
+        html.Div(
+            className="race-goal-title",
+            children=f"{goal['name']} - {race_name} on {goal['date']}: "
+            f"{weeks} weeks and {days} days to go",
+        )
+    ]
+
+    predictions = progress["predictions"]
+    if predictions is None:
+        children.append(
+            html.Div(children="No best effort yet to predict your finish time.")
+        )
+    else:
+        for name, seconds in [
+            (
+                f"Riegel (from your best {predictions['reference'] / 1e3:g} km)",
+                predictions["riegel"],
+            ),
+            (f"VDOT {predictions['vdot']:.1f}", predictions["vdot_time"]),
+        ]:
+            children.append(
+                html.Div(
+                    children=f"{name}: {seconds_to_hms(seconds)} "
+                    f"({format_pace(seconds / goal['distance'] * 1e3)})"
+                )
+            )
+
+    if progress["ramp"] is not None:
+        children.append(
+            html.Div(
+                children=f"Weekly volume of the last 4 weeks: "
+                f"{progress['ramp']:+.0%} compared to the 4 weeks before"
+            )
+        )
+    children.append(get_graph_weekly_progress(weekly=progress["weekly"]))
+    return children
+
+
+def get_race_goal_component() -> html.Div:
+    """Return the form of the race goal and the progress toward the race"""
+    goal = StravaManager().get_race_goal() or {}
+    return html.Div(
+        className="training-load-container",
+        children=[
+            html.Div(
+                style={"font-size": "24px", "font-weight": "bold"},
+                children="Race Goal",
+            ),
+            html.Div(
+                className="race-goal-form",
+                children=[
+                    dcc.Input(
+                        id="race-goal-name",
+                        type="text",
+                        placeholder="Race",
+                        value=goal.get("name"),
+                    ),
+                    dcc.DatePickerSingle(
+                        id="race-goal-date",
+                        min_date_allowed=date.today(),
+                        date=goal.get("date"),
+                        display_format="YYYY-MM-DD",
+                    ),
+                    dcc.Dropdown(
+                        id="race-goal-distance",
+                        options=[
+                            {"label": name, "value": distance}
+                            for name, distance in RACE_DISTANCES.items()
+                        ],
+                        value=goal.get("distance"),
+                        clearable=False,
+                    ),
+                    html.Button("Save", id="race-goal-save-btn"),
+                ],
+            ),
+            html.Div(id="race-goal-content", children=get_race_goal_content()),
+        ],
+    )
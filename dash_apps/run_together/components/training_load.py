@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+
+import plotly.graph_objects as go
+from dash import dcc, html
+
+from dash_apps.run_together.strava_manager import StravaManager
+
+# Number of days displayed on the training load graph
+TRAINING_LOAD_DAYS = 182
+
+
+def get_graph_training_load(end_date: date) -> dcc.Graph:
+    """
+    Generate the training load graph of the athlete of the session: fitness (CTL),
+    fatigue (ATL) and form (TSB) of each day until end_date.
+
+    :param end_date: last day of the graph
+    :return: dcc.Graph component representing the training load graph.
+    """
+    training_load_df = StravaManager().get_training_load(
+        start_date=end_date - timedelta(days=TRAINING_LOAD_DAYS), end_date=end_date
+    )
+
+    fig = go.Figure()
+    for column, name, color in [
+        ("ctl", "Fitness", "#2E86C1"),
+        ("atl", "Fatigue", "#E74C3C"),
+        ("tsb", "Form", "#F39C12"),
+    ]:
+        fig.add_trace(
+            go.Scatter(
+                x=training_load_df.index,
+                y=training_load_df[column].round(1),
+                name=name,
+                mode="lines",
+                line=dict(color=color),
+                hovertemplate=f"{name}: %{{y}}<extra></extra>",
+            )
+        )
+
+    fig.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",  # Set plot background color
+        hovermode="x unified",
+        margin=dict(l=20, r=20, t=20, b=20),
+        legend=dict(orientation="h"),
+    )
+
+    return dcc.Graph(
+        figure=fig,
+        config={
+            "displayLogo": False,
+            "displayModeBar": False,
+        },  # Disable display of logo and mode bar
+        responsive=True,
+        id="training-load-graph",
+    )
+
+
+def get_training_load_component() -> html.Div:
+    """Return the training load of the last TRAINING_LOAD_DAYS days"""
+    return html.Div(
+        className="training-load-container",
+        children=[
+            html.Div(
+                style={"font-size": "24px", "font-weight": "bold"},
+                children="Training Load",
+            ),
+            get_graph_training_load(end_date=date.today()),
+        ],
+    )
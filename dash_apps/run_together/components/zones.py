@@ -0,0 +1,71 @@
+from typing import Dict, List
+
+import plotly.graph_objects as go
+from dash import dcc, html
+
+from dash_apps.run_together.zones import ZONE_NAMES
+
+# Color of each zone, from the easiest to the hardest
+ZONE_COLORS = ["#AED6F1", "#82E0AA", "#F7DC6F", "#F39C12", "#E74C3C"]
+
+
+def get_graph_zones(zones: Dict[str, List[float]]) -> dcc.Graph:
+    """
+    Generate the time in zones graph of an activity: minutes in each heart rate zone
+    and pace zone.
+
+    :param zones: {"heartrate": [seconds per zone], "pace": [seconds per zone]}
+    :return: dcc.Graph component representing the time in zones.
+    """
+    fig = go.Figure()
+    for kind, name, pattern in [("heartrate", "Heart Rate", ""), ("pace", "Pace", "/")]:
+        fig.add_trace(
+            go.Bar(
+                x=ZONE_NAMES,
+                y=[round(seconds / 60, 1) for seconds in zones[kind]],
+                name=name,
+                marker=dict(color=ZONE_COLORS, pattern_shape=pattern),
+                hovertemplate=f"{name} %{{x}}: %{{y}} min<extra></extra>",
+            )
+        )
+
+    fig.update_layout(
+        title=dict(text="Time in Zones"),
+        barmode="group",
+        plot_bgcolor="rgba(0,0,0,0)",  # Set plot background color
+        yaxis_title="min",
+    )
+
+    return dcc.Graph(
+        figure=fig,
+        config={
+            "displayLogo": False,
+            "displayModeBar": False,
+        },  # Disable display of logo and mode bar
+        responsive=True,
+        id="activity-zones-graph",
+    )
+
+
+def get_zone_bar(seconds: List[float]) -> html.Div:
+    """
+    Return a bar split by the share of the time spent in each zone (calendars)
+
+    :param seconds: seconds per zone
+    :return: html.Div, empty if no time in the zones
+    """
+    total = sum(seconds)
+    if not total:
+        return html.Div()
+    return html.Div(
+        className="zone-bar",
+        children=[
+            html.Div(
+                className="zone-bar-segment",
+                title=f"{name}: {int(round(value / 60))} min",
+                style={"width": f"{value / total:.1%}", "background-color": color},
+            )
+            for name, value, color in zip(ZONE_NAMES, seconds, ZONE_COLORS)
+            if value
+        ],
+    )
@@ -0,0 +1,51 @@
+import numpy as np
+
+
+def lttb_indexes(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+        Largest-Triangle-Three-Buckets downsampling: split the points in n_out - 2
+        buckets and keep in each bucket the point making the largest triangle with
+        the point kept in the previous bucket and the average of the next bucket.
+        The shape of the line (peaks, drops) is kept with a few points.
+        https://skemman.is/bitstream/1946/15343/3/SS_MSthesis.pdf
+
+    :param x: values of the x axis (sorted)
+    :param y: values of the y axis
+    :param n_out: number of points to keep
+    :return: sorted indexes of the points kept in the original arrays
+    """
+    n_points = len(x)
+    if n_out >= n_points or n_out < 3:
+        return np.arange(n_points)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket limits: the first and the last points are always kept
+    bucket_limits = np.linspace(1, n_points - 1, n_out - 1).astype(np.int64)
+
+    indexes = np.empty(n_out, dtype=np.int64)
+    indexes[0] = 0
+    indexes[-1] = n_points - 1
+
+    # Average point of each bucket, the next bucket of the last one is the last point
+    bucket_sizes = np.diff(bucket_limits)
+    next_x = np.append(
+        np.add.reduceat(x[1:-1], bucket_limits[:-1] - 1) / bucket_sizes, x[-1]
+    )
+    next_y = np.append(
+        np.add.reduceat(y[1:-1], bucket_limits[:-1] - 1) / bucket_sizes, y[-1]
+    )
+
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = bucket_limits[bucket], bucket_limits[bucket + 1]
+        # Double of the area of the triangles (previous point, point, next average)
+        areas = np.abs(
+            (x[previous] - next_x[bucket + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y[bucket + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        indexes[bucket + 1] = previous
+
+    return indexes
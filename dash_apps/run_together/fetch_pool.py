@@ -0,0 +1,74 @@
+import contextvars
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from os import environ as env
+from typing import Any, Callable, Dict
+
+# Threads of the process used to call Strava in parallel
+_fetch_executor = ThreadPoolExecutor(
+    max_workers=int(env.get("stravaFetchWorkers") or 16),
+    thread_name_prefix="strava-fetch",
+)
+
+# Maximum number of calls to Strava running at the same time for one athlete. The
+# semaphore of an athlete is forgotten once no call uses it: the dictionary does not
+# grow with all the athletes seen by the process.
+_athlete_semaphores = weakref.WeakValueDictionary()
+_athlete_semaphores_lock = threading.Lock()
+
+
+def get_athlete_semaphore(athlete_id: int) -> threading.BoundedSemaphore:
+    with _athlete_semaphores_lock:
+        semaphore = _athlete_semaphores.get(athlete_id)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(
+                int(env.get("stravaAthleteConcurrency") or 3)
+            )
+            _athlete_semaphores[athlete_id] = semaphore
+        return semaphore
+
+
+def fetch_concurrently(athlete_id: int, calls: Dict[str, Callable]) -> Dict[str, Any]:
+    """
+        Run the calls to Strava in parallel in the fetch thread pool, with at most
+        stravaAthleteConcurrency calls running at the same time for the athlete.
+        The total time is the time of the slowest call instead of the sum.
+    :param athlete_id: athlete doing the calls
+    :param calls: {name: function without argument}
+    :return: {name: result of the function}, an exception of a call is raised
+    """
+    semaphore = get_athlete_semaphore(athlete_id)
+
+    def run(call: Callable) -> Any:
+        with semaphore:
+            return call()
+
+    # The calls keep the context of the caller (priority of the calls to Strava)
+    futures = {
+        name: _fetch_executor.submit(contextvars.copy_context().run, run, call)
+        for name, call in calls.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
+
+
+def fetch_athletes_concurrently(calls: Dict[int, Callable]) -> Dict[int, Any]:
+    """
+        Run one call per athlete in parallel in the fetch thread pool (ex: the sync
+        of the members of a group), each call holding the semaphore of its athlete.
+        The calls to Strava still go through the rate limit budget (see rate_budget).
+    :param calls: {athlete_id: function without argument}
+    :return: {athlete_id: result of the function}, an exception of a call is raised
+    """
+
+    def run(athlete_id: int, call: Callable) -> Any:
+        with get_athlete_semaphore(athlete_id):
+            return call()
+
+    futures = {
+        athlete_id: _fetch_executor.submit(
+            contextvars.copy_context().run, run, athlete_id, call
+        )
+        for athlete_id, call in calls.items()
+    }
+    return {athlete_id: future.result() for athlete_id, future in futures.items()}
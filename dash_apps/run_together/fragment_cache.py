@@ -0,0 +1,97 @@
+import functools
+import inspect
+import json
+import logging
+from typing import Callable
+
+import plotly
+
+from dash_apps.run_together.strava_manager import StravaManager
+from dash_apps.run_together.stream_cache import (
+    MemoryCacheBackend,
+    create_cache_backend,
+    get_web_worker_count,
+)
+
+_fragment_cache_backend = None
+
+
+def get_fragment_cache_backend():
+    """
+    Return the backend of the fragment cache of the process (see create_cache_backend),
+    by default: memory backend (sqlite with several gunicorn workers: a fragment
+    rendered by one worker is used by all of them), 16 MB, time to live of 1 day
+    """
+    global _fragment_cache_backend
+    if _fragment_cache_backend is None:
+        _fragment_cache_backend = create_cache_backend(
+            name="fragment",
+            default_max_bytes=16 * 1024 * 1024,
+            default_ttl=24 * 3600,
+            shared=True,
+        )
+    return _fragment_cache_backend
+
+
+def is_fragment_cache_shared() -> bool:
+    """The fragments cached by a worker are used by all the workers"""
+    return (
+        not isinstance(get_fragment_cache_backend(), MemoryCacheBackend)
+        or get_web_worker_count() == 1
+    )
+
+
+def get_fragment_key(func: Callable, strava_manager: StravaManager, arguments) -> str:
+    """
+    Key of a rendered fragment: function, athlete, arguments and version of the
+    activities of the athlete. A sync retrieving activities changes the version:
+    the fragments rendered with the previous activities are not used anymore.
+    """
+    arguments = ",".join(f"{name}={value}" for name, value in arguments.items())
+    return (
+        f"{func.__name__}:{strava_manager.athlete_id}:{arguments}:"
+        f"{strava_manager.get_data_version()}"
+    )
+
+
+def cache_fragment(func: Callable) -> Callable:
+    """
+    Cache the Dash components rendered by a calendar function, serialized in JSON.
+    The function must only depend on its arguments and on the activities of the
+    athlete of the session (ex: get_monthly_calendar(year, month)).
+    On a hit, the JSON of the components is returned to Dash without building again
+    the component tree.
+
+    :param func: function returning Dash components
+    :return: function with the cache
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        strava_manager = StravaManager()
+        # Athlete unknown: the fragment can not be shared safely
+        if strava_manager.athlete_id is None:
+            return func(*args, **kwargs)
+
+        bound_arguments = signature.bind(*args, **kwargs)
+        bound_arguments.apply_defaults()
+        key = get_fragment_key(
+            func=func,
+            strava_manager=strava_manager,
+            arguments=bound_arguments.arguments,
+        )
+
+        backend = get_fragment_cache_backend()
+        fragment = backend.get(key)
+        if fragment is not None:
+            logging.info(f"Fragment cache hit: {key}")
+            return json.loads(fragment)
+
+        components = func(*args, **kwargs)
+        backend.set(
+            key, json.dumps(components, cls=plotly.utils.PlotlyJSONEncoder).encode()
+        )
+        return components
+
+    return wrapper
@@ -0,0 +1,269 @@
+import logging
+import os
+import secrets
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+from os import environ as env
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from dash_apps.run_together.activity_events import is_webhook_enabled
+from dash_apps.run_together.activity_store import ActivityStore, get_data_dir
+from dash_apps.run_together.fetch_pool import fetch_athletes_concurrently
+from dash_apps.run_together.rate_budget import BACKGROUND, strava_priority
+from dash_apps.run_together.strava_manager import (
+    StravaManager,
+    get_strava_activity_column,
+)
+from dash_apps.run_together.token_manager import get_token_manager
+
+
+class GroupStore:
+    """
+    Groups of athletes running together, saved in a SQLite file shared by all the
+    gunicorn workers. An athlete who has authorized the application creates a group
+    and the others join it with its invitation code.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        :param path: SQLite file, by default {dataDir}/groups.sqlite
+        """
+        self.path = path or os.path.join(get_data_dir(), "groups.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS groups (id INTEGER PRIMARY KEY, "
+                "name TEXT, code TEXT UNIQUE)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS group_members (group_id INTEGER, "
+                "athlete_id INTEGER, PRIMARY KEY (group_id, athlete_id))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS group_members_athlete "
+                "ON group_members (athlete_id)"
+            )
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def create_group(self, name: str, athlete_id: int) -> Dict:
+        """
+        :return: {id, name, code} of the group created, the athlete is its first
+            member
+        """
+        code = secrets.token_urlsafe(6)
+        with closing(self.connect()) as conn, conn:
+            group_id = conn.execute(
+                "INSERT INTO groups (name, code) VALUES (?, ?)", (name, code)
+            ).lastrowid
+            conn.execute(
+                "INSERT INTO group_members VALUES (?, ?)", (group_id, athlete_id)
+            )
+        logging.info(f"Group: athlete={athlete_id} created group={group_id}")
+        return {"id": group_id, "name": name, "code": code}
+
+    def join_group(self, code: str, athlete_id: int) -> Optional[Dict]:
+        """
+        :return: {id, name, code} of the group joined, None if the code is unknown
+        """
+        with closing(self.connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT id, name, code FROM groups WHERE code = ?", (code,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "INSERT OR IGNORE INTO group_members VALUES (?, ?)",
+                (row[0], athlete_id),
+            )
+        logging.info(f"Group: athlete={athlete_id} joined group={row[0]}")
+        return dict(zip(["id", "name", "code"], row))
+
+    def get_groups(self, athlete_id: int) -> List[Dict]:
+        """
+        :return: list of {id, name, code} of the groups of the athlete
+        """
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, name, code FROM groups "
+                "JOIN group_members ON group_members.group_id = groups.id "
+                "WHERE athlete_id = ? ORDER BY name",
+                (athlete_id,),
+            ).fetchall()
+        return [dict(zip(["id", "name", "code"], row)) for row in rows]
+
+    def get_members(self, group_id: int) -> List[int]:
+        """
+        :return: athlete_id of the members of the group
+        """
+        with closing(self.connect()) as conn:
+            return [
+                row[0]
+                for row in conn.execute(
+                    "SELECT athlete_id FROM group_members WHERE group_id = ?",
+                    (group_id,),
+                )
+            ]
+
+
+_group_store = None
+
+
+def get_group_store() -> GroupStore:
+    """Return the group store of the process"""
+    global _group_store
+    if _group_store is None:
+        _group_store = GroupStore()
+    return _group_store
+
+
+def sync_member_activities(athlete_id: int) -> int:
+    """
+        Retrieve the new activities of a member of a group, if they have not been
+        retrieved for stravaGroupSyncInterval seconds (default 15 minutes)
+    :param athlete_id: member of the group
+    :return: number of activities retrieved
+    """
+    activity_store = ActivityStore(
+        athlete_id=athlete_id, columns=get_strava_activity_column()
+    )
+    last_sync = activity_store.get_last_sync()
+    sync_interval = float(env.get("stravaGroupSyncInterval") or 900)
+    if last_sync is not None:
+        last_sync_time = datetime.strptime(last_sync, "%Y-%m-%dT%H:%M:%SZ")
+        elapsed = datetime.now(timezone.utc) - last_sync_time.replace(
+            tzinfo=timezone.utc
+        )
+        if elapsed.total_seconds() < sync_interval:
+            return 0
+    return StravaManager.for_athlete(athlete_id=athlete_id).sync_activities()
+
+
+def sync_group_activities(athlete_ids: List[int]) -> None:
+    """
+        Retrieve the new activities of the members of a group in parallel, with the
+        background priority of the rate limit budget: a member which can not be
+        synced (no token, budget used) is displayed with the activities already
+        saved. Not needed when the activities are pushed by the Strava webhook.
+    :param athlete_ids: members of the group
+    """
+    if is_webhook_enabled():
+        return
+
+    def sync(athlete_id: int) -> Optional[int]:
+        try:
+            return sync_member_activities(athlete_id)
+        except Exception as error:
+            logging.warning(f"Group: sync of athlete={athlete_id} failed: {error}")
+            return None
+
+    with strava_priority(BACKGROUND):
+        fetch_athletes_concurrently(
+            {athlete_id: lambda x=athlete_id: sync(x) for athlete_id in athlete_ids}
+        )
+
+
+def get_group_rollups(
+    athlete_ids: List[int],
+    period: str,
+    start_bucket: str,
+    end_bucket: str,
+    activity_type: str = "Run",
+) -> pd.DataFrame:
+    """
+        Combine the rollups precomputed in the activity store of each member: one
+        indexed query per member, no call to STRAVA API
+    :param athlete_ids: members of the group
+    :param period: day, week, month or year
+    :param start_bucket: first bucket of the period
+    :param end_bucket: last bucket of the period (included)
+    :param activity_type: type of the activities
+    :return: pandas with one row per member and bucket: athlete_id, bucket,
+        distance, moving_time, count
+    """
+    columns = get_strava_activity_column()
+    rollups = [
+        dict(rollup, athlete_id=athlete_id)
+        for athlete_id in athlete_ids
+        for rollup in ActivityStore(athlete_id=athlete_id, columns=columns).get_rollups(
+            period=period,
+            start_bucket=start_bucket,
+            end_bucket=end_bucket,
+            activity_type=activity_type,
+        )
+    ]
+    # Numeric dtypes even without rollup: the groupby of an empty frame of objects
+    # drops the columns
+    return pd.DataFrame(
+        rollups, columns=["athlete_id", "bucket", "distance", "moving_time", "count"]
+    ).astype(
+        {
+            "athlete_id": "int64",
+            "distance": "float64",
+            "moving_time": "float64",
+            "count": "int64",
+        }
+    )
+
+
+def get_leaderboard(
+    group_rollups: pd.DataFrame, athlete_ids: List[int]
+) -> pd.DataFrame:
+    """
+        Totals of each member over the buckets, with one groupby over the combined
+        rollups
+    :param group_rollups: see get_group_rollups
+    :param athlete_ids: members of the group (the members without run are last)
+    :return: pandas sorted by distance: athlete_id, name, distance_km, hours, count
+    """
+    totals = (
+        group_rollups.groupby("athlete_id")[["distance", "moving_time", "count"]]
+        .sum()
+        .reindex(athlete_ids, fill_value=0)
+        .sort_values("distance", ascending=False)
+        .reset_index()
+    )
+    totals["distance_km"] = totals["distance"] / 1e3
+    totals["hours"] = totals["moving_time"] / 3600
+    totals["name"] = get_member_names(totals["athlete_id"].tolist())
+    return totals[["athlete_id", "name", "distance_km", "hours", "count"]]
+
+
+def get_member_names(athlete_ids: List[int]) -> List[str]:
+    """
+    :return: first name and initial of the last name of each athlete (from the
+        profiles of the token manager)
+    """
+    profiles = get_token_manager().get_profiles(athlete_ids)
+    names = []
+    for athlete_id in athlete_ids:
+        profile = profiles.get(athlete_id)
+        if profile:
+            names.append(
+                f"{profile.get('firstname') or ''} {(profile.get('lastname') or '')[:1]}".strip()
+            )
+        else:
+            names.append(f"Athlete {athlete_id}")
+    return names
+
+
+def get_group_calendar(
+    group_rollups: pd.DataFrame, athlete_ids: List[int], buckets: List[str]
+) -> pd.DataFrame:
+    """
+        Distance of each member in each bucket (shared calendar), with one pivot of
+        the combined rollups
+    :param group_rollups: see get_group_rollups
+    :param athlete_ids: members of the group
+    :param buckets: buckets of the calendar
+    :return: pandas of the distance in km, one row per bucket and one column per
+        member
+    """
+    calendar = group_rollups.pivot_table(
+        index="bucket", columns="athlete_id", values="distance", aggfunc="sum"
+    )
+    return calendar.reindex(index=buckets, columns=athlete_ids).fillna(0) / 1e3
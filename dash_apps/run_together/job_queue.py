@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from os import environ as env
+from typing import Dict, Optional
+
+from dash_apps.run_together.activity_store import get_data_dir
+
+
+@dataclass
+class Job:
+    """Job claimed in the queue: its kind gives the handler called with the payload"""
+
+    id: int
+    kind: str
+    payload: Dict
+    attempts: int  # including the current one
+
+
+class JobQueue:
+    """
+    Persistent queue of jobs saved in a SQLite file shared by all the gunicorn
+    workers (a job is claimed by one worker only).
+        - A job with a key replaces the pending job with the same key: the last
+          event of an activity is the one processed
+        - A failed job is retried later (exponential backoff) up to max_attempts
+        - A job claimed by a worker which died is claimed again after
+          visibility_timeout seconds
+    """
+
+    def __init__(self, path: str = None):
+        """
+        :param path: SQLite file, by default {dataDir}/jobs.sqlite
+        """
+        self.max_attempts = int(env.get("jobMaxAttempts") or 5)
+        self.visibility_timeout = int(env.get("jobVisibilityTimeout") or 300)
+        self.path = path or os.path.join(get_data_dir(), "jobs.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with closing(self.connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY, "
+                "kind TEXT, key TEXT, payload TEXT, status TEXT, attempts INTEGER, "
+                "available_at REAL, claimed_at REAL, error TEXT)"
+            )
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS jobs_pending_key ON jobs (key) "
+                "WHERE status = 'pending'"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at)"
+            )
+
+    def connect(self) -> sqlite3.Connection:
+        # isolation_level=None: the transactions are opened explicitly
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def enqueue(
+        self, kind: str, payload: Dict, key: str = None, delay: float = 0
+    ) -> None:
+        """
+            Add a job to the queue
+        :param kind: kind of job (see register_job_handler)
+        :param payload: arguments of the job, saved in JSON
+        :param key: a pending job with the same key is replaced by this one
+        :param delay: seconds before the job can be claimed (ex: throttled job)
+        """
+        with closing(self.connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (kind, key, payload, status, attempts, available_at) "
+                "VALUES (?, ?, ?, 'pending', 0, ?) "
+                "ON CONFLICT (key) WHERE status = 'pending' DO UPDATE SET "
+                "kind = excluded.kind, payload = excluded.payload, "
+                "available_at = excluded.available_at",
+                (kind, key, json.dumps(payload), time.time() + delay),
+            )
+        logging.info(f"Job Queue: enqueue {kind} key={key}")
+
+    def claim(self) -> Optional[Job]:
+        """
+        :return: the oldest job available, marked as running, None if there is none
+        """
+        now = time.time()
+        with closing(self.connect()) as conn:
+            # Write lock: two workers can not claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs "
+                "WHERE (status = 'pending' AND available_at <= ?) "
+                "OR (status = 'running' AND claimed_at < ?) "
+                "ORDER BY available_at LIMIT 1",
+                (now, now - self.visibility_timeout),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', key = NULL, claimed_at = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (now, row[0]),
+                )
+            conn.execute("COMMIT")
+
+        if row is None:
+            return None
+        return Job(
+            id=row[0], kind=row[1], payload=json.loads(row[2]), attempts=row[3] + 1
+        )
+
+    def complete(self, job: Job) -> None:
+        with closing(self.connect()) as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
+
+    def fail(self, job: Job, error: str) -> None:
+        """Retry the job later, or keep it as failed after max_attempts"""
+        status = "failed" if job.attempts >= self.max_attempts else "pending"
+        with closing(self.connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, error = ? WHERE id = ?",
+                (status, time.time() + 2**job.attempts * 10, error, job.id),
+            )
+        logging.warning(
+            f"Job Queue: {job.kind} id={job.id} failed "
+            f"(attempt {job.attempts}/{self.max_attempts}): {error}"
+        )
+
+    def postpone(self, job: Job, delay: float) -> None:
+        """Run the job again after delay seconds, the attempt is not counted"""
+        with closing(self.connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', available_at = ?, "
+                "attempts = attempts - 1 WHERE id = ?",
+                (time.time() + delay, job.id),
+            )
+        logging.info(f"Job Queue: {job.kind} id={job.id} postponed by {delay:.0f}s")
+
+    def get_counts(self) -> Dict[str, int]:
+        """
+        :return: number of jobs per status (pending, running, failed)
+        """
+        with closing(self.connect()) as conn:
+            return dict(
+                conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+            )
+
+
+_job_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    """Return the job queue of the process"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
@@ -0,0 +1,113 @@
+import logging
+import threading
+from os import environ as env
+from typing import Callable, Dict
+
+from dash_apps.run_together.job_queue import Job, JobQueue, get_job_queue
+from dash_apps.run_together.rate_budget import (
+    BACKGROUND,
+    RateLimitBudgetExceeded,
+    strava_priority,
+)
+
+# Handler of each kind of job: function called with the payload of the job
+_job_handlers: Dict[str, Callable[[Dict], None]] = {}
+
+
+def register_job_handler(kind: str) -> Callable:
+    """Decorator registering the function processing the jobs of this kind"""
+
+    def decorator(func: Callable[[Dict], None]) -> Callable[[Dict], None]:
+        _job_handlers[kind] = func
+        return func
+
+    return decorator
+
+
+def run_job(job_queue: JobQueue, job: Job) -> None:
+    """
+    Call the handler of the job, the job is retried later if it fails.
+    The calls to Strava of the jobs have the background priority: the job is
+    postponed when their rate limit budget is used.
+    """
+    try:
+        with strava_priority(BACKGROUND):
+            _job_handlers[job.kind](job.payload)
+    except RateLimitBudgetExceeded as error:
+        job_queue.postpone(job=job, delay=error.wait)
+    except Exception as error:
+        logging.exception(f"Job Worker: {job.kind} id={job.id}")
+        job_queue.fail(job=job, error=repr(error))
+    else:
+        job_queue.complete(job=job)
+
+
+def run_pending_jobs(job_queue: JobQueue = None) -> int:
+    """
+        Run the jobs available in the queue until it is empty (ex: script, tests
+        with the fake webhook sender)
+    :return: number of jobs run
+    """
+    job_queue = job_queue or get_job_queue()
+    count = 0
+    while (job := job_queue.claim()) is not None:
+        run_job(job_queue=job_queue, job=job)
+        count += 1
+    return count
+
+
+class JobWorker(threading.Thread):
+    """
+    Thread running the jobs of the queue, waiting jobWorkerPollInterval seconds when
+    the queue is empty. Each gunicorn worker can run one: a job is claimed by only
+    one of them.
+    """
+
+    def __init__(self, job_queue: JobQueue = None):
+        super().__init__(name="job-worker", daemon=True)
+        self.job_queue = job_queue or get_job_queue()
+        self.poll_interval = float(env.get("jobWorkerPollInterval") or 2)
+        self.stop_event = threading.Event()
+
+    def run(self) -> None:
+        logging.info("Job Worker: start")
+        while not self.stop_event.is_set():
+            try:
+                job = self.job_queue.claim()
+            except Exception:
+                logging.exception("Job Worker: claim failed")
+                job = None
+
+            if job is None:
+                self.stop_event.wait(self.poll_interval)
+            else:
+                run_job(job_queue=self.job_queue, job=job)
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+
+def load_job_handlers() -> None:
+    """Import the modules registering the handlers of the jobs"""
+    import dash_apps.run_together.activity_events  # noqa: F401
+    import dash_apps.run_together.backfill  # noqa: F401
+
+
+_job_worker = None
+
+
+def start_job_worker() -> None:
+    """Start the job worker thread of the process (disabled with jobWorker=false)"""
+    global _job_worker
+    if env.get("jobWorker", "true").lower() == "false" or _job_worker is not None:
+        return
+
+    load_job_handlers()
+    _job_worker = JobWorker()
+    _job_worker.start()
+
+
+if __name__ == "__main__":
+    # python -m dash_apps.run_together.job_worker: run the jobs in a separate process
+    load_job_handlers()
+    JobWorker().run()
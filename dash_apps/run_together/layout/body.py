@@ -2,8 +2,17 @@ import dash_ag_grid as dag
 from dash import html
 import pandas as pd
 
+from dash_apps.run_together.components.backfill_progress import (
+    get_backfill_progress_component,
+)
+from dash_apps.run_together.components.best_efforts import get_best_efforts_component
 from dash_apps.run_together.components.calendar_training import get_yearly_calendar
+from dash_apps.run_together.components.group import get_group_component
 from dash_apps.run_together.components.last_activities import get_last_activities
+from dash_apps.run_together.components.race_goal import get_race_goal_component
+from dash_apps.run_together.components.training_load import (
+    get_training_load_component,
+)
 from dash_apps.run_together.strava_manager import StravaManager
 
 
@@ -57,6 +66,7 @@ def get_body(year: int):
                         style={"font-size": "24px", "font-weight": "bold"},
                         children="Training Calendar",
                     ),
+                    *get_backfill_progress_component(),
                     html.Div(
                         children=get_yearly_calendar(year=year),
                         id="calendar-training-container",
@@ -70,6 +80,14 @@ def get_body(year: int):
     return html.Div(
         children=[
             grid,
+            html.Br(),
+            get_group_component(),
+            html.Br(),
+            get_race_goal_component(),
+            html.Br(),
+            get_training_load_component(),
+            html.Br(),
+            get_best_efforts_component(),
             # generate_central_column_bis(
             #     activities_df=activities_df
             # ),
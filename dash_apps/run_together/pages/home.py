@@ -1,5 +1,4 @@
 from datetime import datetime
-import time
 
 from dash import html
 
@@ -9,30 +8,41 @@ from dash_apps.run_together.layout.body import get_body
 from dash_apps.run_together.layout.modal import get_modal_box
 
 from flask import session
+from dash_apps.run_together.activity_events import is_webhook_enabled
+from dash_apps.run_together.backfill import start_backfill
+from dash_apps.run_together.calendar_prefetch import prefetch_yearly_calendars
 from dash_apps.run_together.strava_manager import StravaManager
 
 
 def get_home_layout() -> html:
     strava_manager = StravaManager(session=False)
 
-    # no token yet associate to the session
-    if "expires_at" not in session:
-        strava_manager.generate_token_response(strava_code=session["strava_code"])
-    # token expired
-    elif time.time() > session["expires_at"]:
-        strava_manager.generate_token_response(strava_code=session["strava_code"])
+    # Authorization code of the login not used yet: exchange it (only once)
+    if "strava_code" in session:
+        strava_manager.generate_token_response(strava_code=session.pop("strava_code"))
+    # Token of the athlete, refreshed by the token manager if it is about to expire
     else:
         strava_manager.set_token_from_session()
 
     current_year = datetime.now().year
     session["selected_year"] = current_year
 
-    # Add in the session the current athlete
-    athlete = strava_manager.get_athlete()
-    session["user_profile_picture"] = athlete.profile
+    # Add in the session the current athlete (profile cached by the token manager)
+    athlete = strava_manager.get_athlete_profile()
+    session["user_profile_picture"] = athlete["profile"]
+    session["athlete_id"] = athlete["id"]
+
+    # First visit: the newest activities now, the history by the backfill job
+    if strava_manager.activity_store.get_last_sync() is None:
+        start_backfill(strava_manager)
+    # Retrieve only the new activities since the last visit in the local activity store
+    # (not needed when the activities are pushed by the Strava webhook)
+    elif not is_webhook_enabled():
+        strava_manager.sync_activities()
 
     header = get_header()
     body = get_body(year=session["selected_year"])
+    prefetch_yearly_calendars(athlete_id=athlete["id"], year=session["selected_year"])
     modal_box = get_modal_box()
 
     footer = get_footer()
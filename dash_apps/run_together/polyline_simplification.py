@@ -0,0 +1,130 @@
+import math
+
+import numpy as np
+import polyline
+
+EARTH_RADIUS = 6378137  # meters (Web Mercator)
+
+# Size of the tile of the map in pixels
+TILE_SIZE = 256
+
+# Maximum distance in pixels between the simplified and the original polyline
+PIXEL_TOLERANCE = 1.0
+
+
+def project_to_meters(latlng: np.ndarray) -> np.ndarray:
+    """
+        Project the positions on a local plane (equirectangular projection around the
+        mean latitude), good enough for the distances within one activity.
+    :param latlng: N x 2 array of [latitude, longitude] in degrees
+    :return: N x 2 array of [x, y] in meters
+    """
+    latlng = np.radians(latlng.astype(np.float64))
+    cos_latitude = math.cos(latlng[:, 0].mean()) if len(latlng) else 1.0
+    return np.column_stack(
+        (latlng[:, 1] * cos_latitude * EARTH_RADIUS, latlng[:, 0] * EARTH_RADIUS)
+    )
+
+
+def simplify_rdp(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+        Ramer-Douglas-Peucker simplification: keep only the points which are further
+        than the tolerance from the segment between the points already kept.
+        The distances of all the points of one segment are computed at once with NumPy.
+    :param points: N x 2 array of [x, y]
+    :param tolerance: maximum distance between the simplified and the original line
+    :return: sorted indexes of the points kept
+    """
+    n_points = len(points)
+    if n_points < 3:
+        return np.arange(n_points)
+
+    keep = np.zeros(n_points, dtype=bool)
+    keep[[0, -1]] = True
+    segments = [(0, n_points - 1)]
+
+    while segments:
+        start, end = segments.pop()
+        if end - start < 2:
+            continue
+
+        vector = points[end] - points[start]
+        relative_points = points[start + 1 : end] - points[start]
+        length = math.hypot(vector[0], vector[1])
+        if length == 0:
+            distances = np.hypot(relative_points[:, 0], relative_points[:, 1])
+        else:
+            # Distance to the line: |cross product| / length of the segment
+            distances = (
+                np.abs(
+                    vector[0] * relative_points[:, 1]
+                    - vector[1] * relative_points[:, 0]
+                )
+                / length
+            )
+
+        index_max = int(np.argmax(distances))
+        if distances[index_max] > tolerance:
+            index = start + 1 + index_max
+            keep[index] = True
+            segments.append((start, index))
+            segments.append((index, end))
+
+    return np.flatnonzero(keep)
+
+
+def get_meters_per_pixel(zoom: float, latitude: float) -> float:
+    """Size of one pixel of the Web Mercator map at this zoom level and latitude"""
+    earth_circumference = 2 * math.pi * EARTH_RADIUS * math.cos(math.radians(latitude))
+    return earth_circumference / (TILE_SIZE * 2**zoom)
+
+
+def get_fit_zoom(bounds: list, width: int, height: int, max_zoom: int = 18) -> int:
+    """
+        Zoom level used by the map to display the bounds in width x height pixels.
+    :param bounds: [[min_latitude, min_longitude], [max_latitude, max_longitude]]
+    :return: zoom level
+    """
+    (min_latitude, min_longitude), (max_latitude, max_longitude) = bounds
+
+    def mercator_y(latitude: float) -> float:
+        return math.log(math.tan(math.pi / 4 + math.radians(latitude) / 2))
+
+    # Part of the whole world map covered by the bounds
+    width_ratio = max(max_longitude - min_longitude, 1e-9) / 360
+    mercator_height = mercator_y(max_latitude) - mercator_y(min_latitude)
+    height_ratio = max(mercator_height, 1e-9) / (2 * math.pi)
+    zoom = min(
+        math.log2(width / TILE_SIZE / width_ratio),
+        math.log2(height / TILE_SIZE / height_ratio),
+    )
+    return int(max(0, min(max_zoom, math.floor(zoom))))
+
+
+def simplify_for_zoom(
+    latlng: np.ndarray, zoom: float, pixel_tolerance: float = PIXEL_TOLERANCE
+) -> np.ndarray:
+    """
+        Level of detail of the polyline for one zoom level: the points closer than
+        pixel_tolerance pixels from the simplified polyline are removed.
+    :param latlng: N x 2 array of [latitude, longitude]
+    :param zoom: zoom level of the map
+    :param pixel_tolerance: tolerance in pixels
+    :return: sorted indexes of the points kept
+    """
+    if len(latlng) < 3:
+        return np.arange(len(latlng))
+    tolerance = pixel_tolerance * get_meters_per_pixel(
+        zoom=zoom, latitude=float(latlng[:, 0].mean())
+    )
+    return simplify_rdp(points=project_to_meters(latlng), tolerance=tolerance)
+
+
+def encode_positions(latlng: np.ndarray) -> str:
+    """
+        Encode the positions with the Google encoded polyline algorithm (~5 characters
+        per point instead of ~22 in JSON).
+    :param latlng: N x 2 array of [latitude, longitude]
+    :return: encoded polyline
+    """
+    return polyline.encode(latlng.astype(np.float64).tolist(), precision=5)
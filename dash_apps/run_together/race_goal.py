@@ -0,0 +1,180 @@
+import sqlite3
+from contextlib import closing
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from dash_apps.run_together.rollups import get_rollup_bucket
+
+# Distances of the race goals in meters
+RACE_DISTANCES = {
+    "5 km": 5000,
+    "10 km": 10000,
+    "Half Marathon": 21097.5,
+    "Marathon": 42195,
+}
+
+# Riegel: time = reference_time * (distance / reference_distance) ** RIEGEL_EXPONENT
+RIEGEL_EXPONENT = 1.06
+
+# Shortest best effort used to predict a race (the 400 m overestimates the endurance)
+MIN_PREDICTION_DISTANCE = 1000
+
+# Number of weeks of the progress displayed, and of each half of the volume ramp
+PROGRESS_WEEKS = 12
+RAMP_WEEKS = 4
+
+
+def get_week_buckets(end_day: date, weeks: int) -> List[str]:
+    """
+    :param end_day: day of the last week
+    :param weeks: number of weeks
+    :return: ISO weeks (2024-W05) of the weeks until end_day, oldest first
+    """
+    return [
+        get_rollup_bucket("week", (end_day - timedelta(weeks=i)).isoformat())
+        for i in reversed(range(weeks))
+    ]
+
+
+def get_riegel_times(
+    times: np.ndarray, distances: np.ndarray, race_distance: float
+) -> np.ndarray:
+    """
+    :param times: seconds of the reference efforts
+    :param distances: meters of the reference efforts
+    :param race_distance: meters
+    :return: time in seconds predicted for the race from each effort
+    """
+    return times * (race_distance / distances) ** RIEGEL_EXPONENT
+
+
+def get_vdot(distances: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """
+        VDOT of Daniels and Gilbert: oxygen cost of the speed divided by the fraction
+        of the VO2max sustainable for the duration
+    :param distances: meters
+    :param times: seconds
+    :return: VDOT of each effort
+    """
+    minutes = times / 60
+    speed = distances / minutes  # meters per minute
+    oxygen_cost = -4.60 + 0.182258 * speed + 0.000104 * speed**2
+    vo2max_fraction = (
+        0.8
+        + 0.1894393 * np.exp(-0.012778 * minutes)
+        + 0.2989558 * np.exp(-0.1932605 * minutes)
+    )
+    return oxygen_cost / vo2max_fraction
+
+
+def get_vdot_time(vdot: float, race_distance: float) -> float:
+    """
+        Time of the race run at the VDOT: the VDOT decreases with the time for a
+        given distance, the time is interpolated on a grid of times
+    :param vdot: VDOT of the athlete
+    :param race_distance: meters
+    :return: seconds
+    """
+    times = np.linspace(race_distance / 7, race_distance / 1.2, 2000)
+    vdots = get_vdot(np.full_like(times, race_distance), times)
+    # np.interp needs increasing x: the grid is reversed
+    return float(np.interp(vdot, vdots[::-1], times[::-1]))
+
+
+def get_race_predictions(
+    best_efforts_df: pd.DataFrame, race_distance: float
+) -> Optional[Dict]:
+    """
+        Predict the finish time of the race from the best efforts
+    :param best_efforts_df: best time (result) for each distance (value)
+    :param race_distance: meters
+    :return: {riegel: seconds from the effort of the closest distance,
+        reference: meters of this effort, vdot: VDOT of the athlete (best effort),
+        vdot_time: seconds}, None without best effort
+    """
+    efforts = best_efforts_df[best_efforts_df["value"] >= MIN_PREDICTION_DISTANCE]
+    if efforts.empty:
+        return None
+    distances = efforts["value"].to_numpy(dtype=np.float64)
+    times = efforts["result"].to_numpy(dtype=np.float64)
+
+    closest = np.argmin(np.abs(np.log(distances / race_distance)))
+    vdot = float(np.max(get_vdot(distances, times)))
+    return {
+        "riegel": float(get_riegel_times(times, distances, race_distance)[closest]),
+        "reference": float(distances[closest]),
+        "vdot": vdot,
+        "vdot_time": get_vdot_time(vdot, race_distance),
+    }
+
+
+def get_weekly_progress(rollups_df: pd.DataFrame, end_day: date) -> pd.DataFrame:
+    """
+        Weekly volume and long run of the last PROGRESS_WEEKS weeks
+    :param rollups_df: weekly rollups of the runs (see StravaManager.get_rollups)
+    :param end_day: day of the last week
+    :return: pandas indexed by the ISO weeks: distance_km, long_run_km (0 for the
+        weeks without run)
+    """
+    weekly = rollups_df.set_index("bucket").reindex(
+        get_week_buckets(end_day=end_day, weeks=PROGRESS_WEEKS)
+    )
+    return pd.DataFrame(
+        {
+            "distance_km": weekly["distance"].fillna(0).to_numpy() / 1e3,
+            "long_run_km": weekly["max_distance"].fillna(0).to_numpy() / 1e3,
+        },
+        index=weekly.index,
+    )
+
+
+def get_volume_ramp(weekly_progress: pd.DataFrame) -> Optional[float]:
+    """
+    :param weekly_progress: see get_weekly_progress
+    :return: change of the weekly volume of the last RAMP_WEEKS weeks compared to the
+        RAMP_WEEKS weeks before (0.1 = +10%), None without run in the weeks before.
+        The current week (not complete) is not counted.
+    """
+    distance = weekly_progress["distance_km"].to_numpy()[:-1]
+    previous = distance[-2 * RAMP_WEEKS : -RAMP_WEEKS].mean()
+    if not previous:
+        return None
+    return float(distance[-RAMP_WEEKS:].mean() / previous - 1)
+
+
+class RaceGoalStoreMixin:
+    """Race goal of the athlete of the ActivityStore (a single row)"""
+
+    @staticmethod
+    def create_race_goal_table(conn: sqlite3.Connection) -> None:
+        """Create the table of the race goal"""
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS race_goal (id INTEGER PRIMARY KEY, "
+            "name TEXT, date TEXT, distance REAL)"
+        )
+
+    def save_race_goal(self, name: str, race_date: str, distance: float) -> None:
+        """
+            Save the race the athlete is training for
+        :param name: name of the race
+        :param race_date: 2024-10-27
+        :param distance: meters
+        """
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO race_goal VALUES (1, ?, ?, ?)",
+                (name, race_date, distance),
+            )
+
+    def get_race_goal(self) -> Optional[Dict]:
+        """
+        :return: {name, date, distance} of the race, None if there is no race goal
+        """
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT name, date, distance FROM race_goal WHERE id = 1"
+            ).fetchone()
+        return dict(zip(["name", "date", "distance"], row)) if row else None
@@ -0,0 +1,174 @@
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+from os import environ as env
+from typing import Dict, Optional, Tuple
+
+from dash_apps.run_together.activity_store import get_data_dir
+
+# Strava rate limits are reset at natural 15-minute intervals (0, 15, 30, 45)
+# and the daily limit at midnight UTC
+RATE_LIMIT_WINDOW = 15 * 60
+DAILY_WINDOW = 24 * 3600
+
+# Priority of the calls to Strava: a user waiting for the result (ex: modal open)
+# or a job in the background (ex: prefetch, backfill)
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+_strava_priority = ContextVar("strava_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def strava_priority(priority: str):
+    """Calls to Strava done in the block have this priority (thread / context)"""
+    token = _strava_priority.set(priority)
+    try:
+        yield
+    finally:
+        _strava_priority.reset(token)
+
+
+def get_strava_priority() -> str:
+    return _strava_priority.get()
+
+
+def parse_rate_limit_headers(headers) -> Optional[Tuple[int, int, int, int]]:
+    """
+        X-RateLimit-Limit: 100,1000 (15 minutes, daily)
+        X-RateLimit-Usage: 100,356
+    :param headers: headers of a response of Strava
+    :return: (short_limit, long_limit, short_usage, long_usage), None if missing
+    """
+    limit = headers.get("X-RateLimit-Limit")
+    usage = headers.get("X-RateLimit-Usage")
+    if not limit or not usage:
+        return None
+    short_limit, long_limit = [int(x) for x in limit.split(",")][:2]
+    short_usage, long_usage = [int(x) for x in usage.split(",")][:2]
+    return short_limit, long_limit, short_usage, long_usage
+
+
+class RateLimitBudgetExceeded(Exception):
+    """The call to Strava is not sent: the budget of its priority is used"""
+
+    def __init__(self, priority: str, wait: float):
+        super().__init__(
+            f"Strava rate limit budget of the {priority} calls used, "
+            f"reset in {wait:.0f}s"
+        )
+        self.priority = priority
+        self.wait = wait
+
+
+class StravaRateLimitBudget:
+    """
+    Usage of the Strava rate limits of the application, shared by all the gunicorn
+    workers and job workers (SQLite).
+        - The usage is read from the X-RateLimit headers of each response
+        - The background calls can use stravaRateLimitBackgroundShare of the limits
+          (default 60%), the interactive calls stravaRateLimitInteractiveShare
+          (default 95%, margin for the calls running at the same time): a user
+          flipping through the years does not block the others, the backfill
+          leaves room for the users
+    """
+
+    def __init__(self, path: str = None):
+        """
+        :param path: SQLite file, by default {dataDir}/rate_limits.sqlite
+        """
+        self.shares = {
+            INTERACTIVE: float(env.get("stravaRateLimitInteractiveShare") or 0.95),
+            BACKGROUND: float(env.get("stravaRateLimitBackgroundShare") or 0.6),
+        }
+        self.path = path or os.path.join(get_data_dir(), "rate_limits.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS strava_usage (id INTEGER PRIMARY KEY, "
+                "short_limit INTEGER, long_limit INTEGER, short_usage INTEGER, "
+                "long_usage INTEGER, updated_at REAL)"
+            )
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, headers) -> None:
+        """Save the usage sent by Strava in the headers of a response"""
+        rate_limit = parse_rate_limit_headers(headers)
+        if rate_limit is None:
+            return
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO strava_usage VALUES (1, ?, ?, ?, ?, ?)",
+                rate_limit + (time.time(),),
+            )
+
+    def get_usage(self) -> Optional[Dict]:
+        """
+        :return: limits and usage of the current windows (a usage saved during a
+            previous window is reset), None if Strava has not been called yet
+        """
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT short_limit, long_limit, short_usage, long_usage, updated_at "
+                "FROM strava_usage WHERE id = 1"
+            ).fetchone()
+        if row is None:
+            return None
+
+        short_limit, long_limit, short_usage, long_usage, updated_at = row
+        now = time.time()
+        if updated_at // RATE_LIMIT_WINDOW != now // RATE_LIMIT_WINDOW:
+            short_usage = 0
+        if updated_at // DAILY_WINDOW != now // DAILY_WINDOW:
+            long_usage = 0
+        return {
+            "short_limit": short_limit,
+            "long_limit": long_limit,
+            "short_usage": short_usage,
+            "long_usage": long_usage,
+        }
+
+    def get_wait(self, priority: str) -> float:
+        """
+        :param priority: INTERACTIVE or BACKGROUND
+        :return: 0 if a call of this priority can be sent, otherwise the number of
+            seconds until the limit reached is reset
+        """
+        usage = self.get_usage()
+        if usage is None:
+            return 0.0
+
+        share = self.shares[priority]
+        now = time.time()
+        if usage["long_usage"] >= share * usage["long_limit"]:
+            return DAILY_WINDOW - now % DAILY_WINDOW
+        if usage["short_usage"] >= share * usage["short_limit"]:
+            return RATE_LIMIT_WINDOW - now % RATE_LIMIT_WINDOW
+        return 0.0
+
+    def check(self) -> None:
+        """
+        Raise RateLimitBudgetExceeded if the budget of the priority of the current
+        call (see strava_priority) is used
+        """
+        priority = get_strava_priority()
+        wait = self.get_wait(priority)
+        if wait:
+            logging.info(f"Strava rate limit budget: {priority} call refused")
+            raise RateLimitBudgetExceeded(priority=priority, wait=wait)
+
+
+_rate_limit_budget = None
+
+
+def get_rate_limit_budget() -> StravaRateLimitBudget:
+    """Return the rate limit budget of the process"""
+    global _rate_limit_budget
+    if _rate_limit_budget is None:
+        _rate_limit_budget = StravaRateLimitBudget()
+    return _rate_limit_budget
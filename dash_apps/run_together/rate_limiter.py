@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from dash_apps.run_together.activity_store import get_data_dir
+
+
+class TokenBucket:
+    """
+    Token bucket saved in a SQLite file shared by all the gunicorn workers and job
+    workers: the throttling is global, for all the athletes.
+    The bucket is refilled with `rate` tokens per second up to `capacity` tokens,
+    a call to Strava takes one token.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float, path: str = None):
+        """
+        :param name: name of the bucket (ex: backfill)
+        :param rate: tokens added per second
+        :param capacity: maximum number of tokens (burst)
+        :param path: SQLite file, by default {dataDir}/rate_limits.sqlite
+        """
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.path = path or os.path.join(get_data_dir(), "rate_limits.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with closing(self.connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets (name TEXT PRIMARY KEY, "
+                "tokens REAL, updated_at REAL)"
+            )
+
+    def connect(self) -> sqlite3.Connection:
+        # isolation_level=None: the transactions are opened explicitly
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+            Take the tokens if the bucket has enough of them
+        :param tokens: number of calls to Strava
+        :return: 0 if the tokens are taken, otherwise the number of seconds to wait
+            before they are available
+        """
+        now = time.time()
+        with closing(self.connect()) as conn:
+            # Write lock: the refill and the withdrawal are atomic between workers
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM token_buckets WHERE name = ?",
+                (self.name,),
+            ).fetchone()
+            available = self.capacity
+            if row is not None:
+                available = min(self.capacity, row[0] + (now - row[1]) * self.rate)
+
+            wait = 0.0
+            if available >= tokens:
+                available -= tokens
+            else:
+                wait = (tokens - available) / self.rate
+            conn.execute(
+                "INSERT OR REPLACE INTO token_buckets VALUES (?, ?, ?)",
+                (self.name, available, now),
+            )
+            conn.execute("COMMIT")
+        return wait
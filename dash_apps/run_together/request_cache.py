@@ -0,0 +1,55 @@
+import functools
+import inspect
+import logging
+from typing import Callable
+
+import pandas as pd
+from flask import g, has_app_context
+
+
+def request_memoize(func: Callable) -> Callable:
+    """
+    Memoize a StravaManager method for the duration of one Flask request (flask `g`).
+
+    The same query done by several components during one Dash layout render or one
+    callback (ex: the activities of the year for the body and the yearly calendar)
+    is executed once and the result is shared.
+    The key is (method, athlete, arguments), the arguments being normalized so that
+    `get_activities_for_year(2024)` and `get_activities_for_year(year=2024)` match.
+    A copy of the DataFrame results is returned as the components modify them.
+
+    :param func: StravaManager method
+    :return: memoized method
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        # Outside a Flask request (script, thread) there is nothing to share
+        if not has_app_context():
+            return func(self, *args, **kwargs)
+
+        bound_arguments = signature.bind(self, *args, **kwargs)
+        bound_arguments.apply_defaults()
+        key = (func.__qualname__, self.athlete_id) + tuple(
+            list(bound_arguments.arguments.items())[1:]
+        )
+
+        request_cache = g.setdefault("strava_request_cache", {})
+        if key in request_cache:
+            logging.info(f"Request cache hit: {key}")
+        else:
+            request_cache[key] = func(self, *args, **kwargs)
+
+        result = request_cache[key]
+        if isinstance(result, pd.DataFrame):
+            return result.copy()
+        return result
+
+    return wrapper
+
+
+def clear_request_cache() -> None:
+    """Forget the results memoized for the current request (ex: after a new sync)"""
+    if has_app_context():
+        g.pop("strava_request_cache", None)
@@ -0,0 +1,131 @@
+import sqlite3
+from contextlib import closing
+from datetime import date
+from typing import Dict, List
+
+# Periods of the aggregate rollups, see get_rollup_bucket
+ROLLUP_PERIODS = ["day", "week", "month", "year"]
+
+
+def get_rollup_bucket(period: str, start_date_local: str) -> str:
+    """
+        Return the bucket of the period containing the date
+        day: 2024-01-31, week (ISO): 2024-W05, month: 2024-01, year: 2024
+    :param period: day, week, month or year
+    :param start_date_local: ISO string 2024-01-31T09:00:00
+    :return: bucket
+    """
+    if period == "week":
+        year, week, _ = date.fromisoformat(start_date_local[:10]).isocalendar()
+        return f"{year}-W{week:02d}"
+    return start_date_local[: {"day": 10, "month": 7, "year": 4}[period]]
+
+
+class RollupsStoreMixin:
+    """
+    Aggregates of the activities of the ActivityStore per day / ISO week / month /
+    year (rollups), updated for the buckets of the activities saved
+    """
+
+    def create_rollups_table(self, conn: sqlite3.Connection) -> None:
+        """Create the table, the activities already saved are aggregated"""
+        rollups_columns = [row[1] for row in conn.execute("PRAGMA table_info(rollups)")]
+        if not rollups_columns:
+            conn.execute(
+                "CREATE TABLE rollups (period TEXT, bucket TEXT, type TEXT, "
+                "distance REAL, moving_time REAL, total_elevation_gain REAL, "
+                "count INTEGER, heartrate_time REAL, heartrate_sum REAL, "
+                "max_distance REAL, PRIMARY KEY (period, bucket, type))"
+            )
+        elif "max_distance" not in rollups_columns:
+            conn.execute("ALTER TABLE rollups ADD COLUMN max_distance REAL")
+        if "max_distance" not in rollups_columns:
+            # Store created before the rollups (or before the longest distance of
+            # the rollups): aggregate all the activities
+            start_dates = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT start_date_local FROM activities "
+                    "WHERE start_date_local IS NOT NULL"
+                )
+            ]
+            self.update_rollups(conn=conn, start_dates_local=start_dates)
+
+    @staticmethod
+    def update_rollups(conn: sqlite3.Connection, start_dates_local: List[str]):
+        """
+            Compute again the rollups of the buckets containing the dates, from the
+            activities of these buckets only.
+            The heart rate is weighted by the moving time:
+            average_heartrate = heartrate_sum / heartrate_time
+        :param conn: connection with the transaction saving the activities
+        :param start_dates_local: start dates of the activities added / modified
+        """
+        if not start_dates_local:
+            return
+        # Only the activities of the years around the dates can be in the buckets
+        # (an ISO week can start in the previous year or end in the next one)
+        first_day = f"{int(min(start_dates_local)[:4]) - 1}"
+        last_day = f"{int(max(start_dates_local)[:4]) + 1}~"
+
+        for period in ROLLUP_PERIODS:
+            buckets = sorted(
+                {
+                    get_rollup_bucket(period, start_date)
+                    for start_date in start_dates_local
+                }
+            )
+            buckets_placeholders = ", ".join("?" * len(buckets))
+            conn.execute(
+                f"DELETE FROM rollups WHERE period = ? "
+                f"AND bucket IN ({buckets_placeholders})",
+                [period] + buckets,
+            )
+            conn.execute(
+                f"INSERT INTO rollups (period, bucket, type, distance, moving_time, "
+                f"total_elevation_gain, count, heartrate_time, heartrate_sum, "
+                f"max_distance) "
+                f"SELECT ?, rollup_bucket(?, start_date_local) AS bucket, type, "
+                f"SUM(distance), SUM(moving_time), SUM(total_elevation_gain), "
+                f"COUNT(*), SUM(CASE WHEN average_heartrate IS NOT NULL "
+                f"THEN moving_time END), SUM(average_heartrate * moving_time), "
+                f"MAX(distance) "
+                f"FROM activities "
+                f"WHERE start_date_local BETWEEN ? AND ? "
+                f"AND rollup_bucket(?, start_date_local) IN ({buckets_placeholders}) "
+                f"GROUP BY bucket, type",
+                [period, period, first_day, last_day, period] + buckets,
+            )
+
+    def get_rollups(
+        self, period: str, start_bucket: str, end_bucket: str, activity_type: str
+    ) -> List[Dict]:
+        """
+            Return the aggregates of the activities of one type for the buckets of the
+            period between start_bucket and end_bucket (included).
+        :param period: day, week, month or year
+        :param start_bucket: ex: 2024-01 for the month period
+        :param end_bucket: ex: 2024-12 for the month period
+        :param activity_type: ex: Run
+        :return: list of {bucket, distance, moving_time, total_elevation_gain, count,
+            average_heartrate, max_distance}
+        """
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                "SELECT bucket, distance, moving_time, total_elevation_gain, count, "
+                "heartrate_sum / heartrate_time, max_distance FROM rollups "
+                "WHERE period = ? AND type = ? AND bucket BETWEEN ? AND ? "
+                "ORDER BY bucket",
+                (period, activity_type, start_bucket, end_bucket),
+            ).fetchall()
+
+        keys = [
+            "bucket",
+            "distance",
+            "moving_time",
+            "total_elevation_gain",
+            "count",
+            "average_heartrate",
+            "max_distance",
+        ]
+        return [dict(zip(keys, row)) for row in rows]
@@ -1,15 +1,62 @@
 import dash
-from dash import Input, Output, ctx, ALL
+from dash import Input, Output, State, ctx, ALL, MATCH
+from dash.exceptions import PreventUpdate
 from dash_extensions.enrich import DashProxy
 from flask import session
 from datetime import datetime, date
 import logging
-import dash_leaflet as dl
 
+from dash_apps.run_together.components.backfill_progress import (
+    get_backfill_progress_update,
+)
+from dash_apps.run_together.calendar_prefetch import (
+    prefetch_monthly_calendars,
+    prefetch_yearly_calendars,
+)
 from dash_apps.run_together.components.calendar_training import get_monthly_calendar
+from dash_apps.run_together.components.race_goal import get_race_goal_content
+from dash_apps.run_together.components.group import (
+    get_group_content,
+    get_group_options,
+    get_session_athlete_id,
+)
+from dash_apps.run_together.groups import get_group_store
 from dash_apps.run_together.components.calendar_training import get_yearly_calendar
 from dash_apps.run_together.pages.home import get_home_layout
 from dash_apps.run_together.components.activity_details import get_activity_details
+from dash_apps.run_together.components.activity_details import (
+    get_activity_polyline_positions,
+)
+from dash_apps.run_together.strava_manager import StravaManager
+
+
+def display_monthly_calendar() -> list:
+    """
+    Return the monthly calendar of the selected month, and render in the background
+    the previous and the next months (the next click is served from the cache)
+    """
+    calendar_container = get_monthly_calendar(
+        year=session["selected_year"],
+        month=session["selected_month"],
+    )
+    prefetch_monthly_calendars(
+        athlete_id=session.get("athlete_id"),
+        year=session["selected_year"],
+        month=session["selected_month"],
+    )
+    return calendar_container
+
+
+def display_yearly_calendar() -> object:
+    """
+    Return the yearly calendar of the selected year, and render in the background
+    the previous and the next years
+    """
+    calendar_container = get_yearly_calendar(year=session["selected_year"])
+    prefetch_yearly_calendars(
+        athlete_id=session.get("athlete_id"), year=session["selected_year"]
+    )
+    return calendar_container
 
 
 def run_together_app(
@@ -18,17 +65,27 @@ def run_together_app(
 ) -> object:
     dash.register_page(__name__, layout=get_home_layout, path=app_path)
 
-    @dash_app.callback(
+    # Display on the map the position hovered on the heart rate graph.
+    # Clientside callback: the positions of the graph points are stored once in the
+    # browser (activity-stream), a hover does not send any request to the server.
+    dash_app.clientside_callback(
+        """
+        function(hoverData, activityStream) {
+            if (!hoverData || !activityStream) {
+                return window.dash_clientside.no_update;
+            }
+            const position = activityStream.latlng[hoverData.points[0].pointIndex];
+            if (!position) {
+                return window.dash_clientside.no_update;
+            }
+            return [{namespace: "dash_leaflet", type: "Marker", props: {position}}];
+        }
+        """,
         Output("marker-map", "children"),
         Input("activities-graph", "hoverData"),
-        Input("activity-stream", "data"),
+        State("activity-stream", "data"),
         prevent_initial_call=True,
     )
-    def display_hover_data(hover_data, activity_stream):
-        index = hover_data["points"][0]["pointIndex"]
-        position = activity_stream["latlng"]["data"][index]
-
-        return [dl.Marker(position=position)]
 
     @dash_app.callback(
         Output("modal", "hidden"),
@@ -54,6 +111,130 @@ def run_together_app(
 
         return False, activity_details_modal_content
 
+    @dash_app.callback(
+        Output({"type": "activity-polyline", "index": MATCH}, "positions"),
+        Input({"type": "activity-map", "index": MATCH}, "zoom"),
+        prevent_initial_call=True,
+    )
+    def update_activity_polyline(zoom):
+        """
+        Update the level of detail of the activity polyline when the user zoom
+        :param zoom: New zoom level of the map
+        :return: positions of the polyline simplified for the zoom (the polyline
+            is kept if the stream is not saved anymore)
+        """
+        if zoom is None:
+            raise PreventUpdate
+
+        logging.info(f"User Action: zoom activity-map. Get Polyline: zoom={zoom}")
+        positions = get_activity_polyline_positions(
+            activity_id=ctx.triggered_id["index"], zoom=zoom
+        )
+        if positions is None:
+            raise PreventUpdate
+        return positions
+
+    @dash_app.callback(
+        Output("backfill-progress", "children"),
+        Output("backfill-progress-interval", "disabled"),
+        Input("backfill-progress-interval", "n_intervals"),
+        prevent_initial_call=True,
+    )
+    def update_backfill_progress(n_intervals):
+        """
+        Display the progress of the retrieval of the history of the athlete
+        :param n_intervals: Refresh of the interval
+        :return: text of the progress, True to stop the refresh once it is done
+        """
+        return get_backfill_progress_update()
+
+    @dash_app.callback(
+        Output("race-goal-content", "children"),
+        Input("race-goal-save-btn", "n_clicks"),
+        State("race-goal-name", "value"),
+        State("race-goal-date", "date"),
+        State("race-goal-distance", "value"),
+        prevent_initial_call=True,
+    )
+    def save_race_goal(n_clicks, name, race_date, distance):
+        """
+        Save the race goal of the athlete and display the progress toward it
+        :param n_clicks: User Clicking on the save button
+        :param name: name of the race
+        :param race_date: date of the race 2024-10-27
+        :param distance: distance of the race in meters
+        :return: progress toward the race goal
+        """
+        if not race_date or not distance:
+            raise PreventUpdate
+
+        logging.info(
+            f"User Action: race-goal-save-btn. Save Race Goal: "
+            f"date={race_date} & distance={distance}"
+        )
+        StravaManager().save_race_goal(
+            name=name or "Race",
+            race_date=date.fromisoformat(race_date[:10]),
+            distance=distance,
+        )
+        return get_race_goal_content()
+
+    @dash_app.callback(
+        Output("group-select", "options"),
+        Output("group-select", "value"),
+        Input("group-create-btn", "n_clicks"),
+        Input("group-join-btn", "n_clicks"),
+        State("group-name", "value"),
+        State("group-code", "value"),
+        prevent_initial_call=True,
+    )
+    def create_or_join_group(create_clicks, join_clicks, name, code):
+        """
+        Create a group or join the group of the code, and select it
+        :param create_clicks: User Clicking on the create button
+        :param join_clicks: User Clicking on the join button
+        :param name: name of the new group
+        :param code: invitation code of the group to join
+        :return: groups of the athlete, group selected
+        """
+        athlete_id = get_session_athlete_id()
+        group_store = get_group_store()
+        if ctx.triggered_id == "group-create-btn":
+            if not name:
+                raise PreventUpdate
+            logging.info(f"User Action: group-create-btn. Create Group: name={name}")
+            group = group_store.create_group(name=name, athlete_id=athlete_id)
+        else:
+            if not code:
+                raise PreventUpdate
+            logging.info(f"User Action: group-join-btn. Join Group: code={code}")
+            group = group_store.join_group(code=code.strip(), athlete_id=athlete_id)
+            if group is None:
+                raise PreventUpdate
+        return get_group_options(athlete_id=athlete_id), group["id"]
+
+    @dash_app.callback(
+        Output("group-content", "children"),
+        Input("group-select", "value"),
+        prevent_initial_call=True,
+    )
+    def display_group(group_id):
+        """
+        Display the leaderboards and the shared calendar of the group selected
+        :param group_id: id of the group, rejected if the athlete is not a member
+        :return: view of the group
+        """
+        logging.info(f"User Action: group-select. Display Group: group={group_id}")
+        try:
+            return get_group_content(
+                group_id=group_id,
+                athlete_id=get_session_athlete_id(),
+                year=datetime.now().year,
+            )
+        except PermissionError as error:
+            logging.warning(f"Display Group rejected: {error}")
+            raise PreventUpdate
+
     @dash_app.callback(
         Output("modal", "hidden"),
         Input("close-modal-btn", "n_clicks"),
@@ -89,10 +270,7 @@ def run_together_app(
                 f"year={session['selected_year']} & month={session['selected_month']}"
             )
 
-            return get_monthly_calendar(
-                year=session["selected_year"],
-                month=session["selected_month"],
-            )
+            return display_monthly_calendar()
 
         # Case: the user click on the previous month on the monthly calendar
         if triggered_id.index == "prev-month":
@@ -113,10 +291,7 @@ def run_together_app(
                 f"User Action: prev-month. Get Monthly Calendar: "
                 f"year={session['selected_year']} & month={session['selected_month']}"
             )
-            return get_monthly_calendar(
-                year=session["selected_year"],
-                month=session["selected_month"],
-            )
+            return display_monthly_calendar()
 
         # Case: the user click on the next month on the monthly calendar
         if triggered_id.index == "next-month":
@@ -137,10 +312,7 @@ def run_together_app(
                 f"User Action: next-month. Get Monthly Calendar: "
                 f"year={session['selected_year']} & month={session['selected_month']}"
             )
-            return get_monthly_calendar(
-                year=session["selected_year"],
-                month=session["selected_month"],
-            )
+            return display_monthly_calendar()
 
         # Case: the user click on `back to yearly calendar` from the monthly calendar
         if triggered_id.index == "back-yearly-calendar":
@@ -148,7 +320,7 @@ def run_together_app(
                 f"User Action: back-yearly-calendar. Get yearly Calendar: "
                 f"year={session['selected_year']}"
             )
-            return get_yearly_calendar(year=session["selected_year"])
+            return display_yearly_calendar()
 
         # Case: the user click on the previous year on the yearly calendar
         if triggered_id.index == "prev-year":
@@ -157,7 +329,7 @@ def run_together_app(
             logging.info(
                 f"User Action: prev-year. Get yearly Calendar: year={session['selected_year']}"
             )
-            return get_yearly_calendar(year=session["selected_year"])
+            return display_yearly_calendar()
 
         # Case: the user click on the next year on the yearly calendar
         if triggered_id.index == "next-year":
@@ -166,4 +338,4 @@ def run_together_app(
             logging.info(
                 f"User Action: next-year. Get yearly Calendar: year={session['selected_year']}"
             )
-            return get_yearly_calendar(year=session["selected_year"])
+            return display_yearly_calendar()
@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+import time
+from os import environ as env
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from dash_apps.run_together.rate_budget import (
+    DAILY_WINDOW,
+    RATE_LIMIT_WINDOW,
+    RateLimitBudgetExceeded,
+    get_rate_limit_budget,
+    get_strava_priority,
+    parse_rate_limit_headers,
+)
+
+STRAVA_API_URL = "https://www.strava.com/api/v3"
+
+
+def get_rate_limit_wait(headers) -> Optional[float]:
+    """
+        Return the number of seconds until the Strava 15 minutes rate limit is reset,
+        if the usage of the 15 minutes window reached the limit.
+        X-RateLimit-Limit: 100,1000 (15 minutes, daily)
+        X-RateLimit-Usage: 100,356
+    :param headers: headers of the response
+    :return: seconds to wait, None if the limit is not reached
+    """
+    rate_limit = parse_rate_limit_headers(headers)
+    if rate_limit is None:
+        return None
+
+    short_limit, long_limit, short_usage, long_usage = rate_limit
+    if long_usage >= long_limit:
+        # Daily limit reached: reset at midnight UTC
+        return DAILY_WINDOW - time.time() % DAILY_WINDOW
+    if short_usage >= short_limit:
+        return RATE_LIMIT_WINDOW - time.time() % RATE_LIMIT_WINDOW
+    return None
+
+
+class StravaRetry(Retry):
+    """
+    Retry with exponential backoff on 429 / 5xx responses.
+    On 429, Strava sends no Retry-After header: the wait is computed from the
+    X-RateLimit headers, and the request is not retried if the rate limit is reset
+    later than max_rate_limit_wait seconds (the 429 response is returned).
+    """
+
+    max_rate_limit_wait = float(env.get("stravaMaxRateLimitWait") or 30)
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None and response.status == 429:
+            retry_after = get_rate_limit_wait(response.headers)
+        return retry_after
+
+    def increment(self, method=None, url=None, response=None, *args, **kwargs):
+        if response is not None and response.status == 429:
+            retry_after = self.get_retry_after(response)
+            if retry_after is not None and retry_after > self.max_rate_limit_wait:
+                logging.info(f"Strava rate limit reached, reset in {retry_after:.0f}s")
+                # Retries exhausted: urllib3 returns the 429 response to the caller
+                # (raise_on_status=False) instead of raising MaxRetryError
+                return super(StravaRetry, self.new(total=0)).increment(
+                    method, url, response, *args, **kwargs
+                )
+        return super().increment(method, url, response, *args, **kwargs)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with a default timeout for all the requests.
+    The calls to the Strava API go through the rate limit budget: a call is not sent
+    when the budget of its priority is used (RateLimitBudgetExceeded), and the usage
+    sent back by Strava is saved. A 429 left after the retries (see StravaRetry) is
+    raised as RateLimitBudgetExceeded too: the callers handle the rate limit in one
+    way (job postponed, activity read from the store).
+    """
+
+    def __init__(self, *args, timeout: float = None, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        is_strava_api = request.url.startswith(STRAVA_API_URL)
+        if is_strava_api:
+            get_rate_limit_budget().check()
+
+        response = super().send(request, timeout=timeout or self.timeout, **kwargs)
+
+        if is_strava_api:
+            get_rate_limit_budget().record(response.headers)
+            if response.status_code == 429:
+                wait = get_rate_limit_wait(response.headers)
+                raise RateLimitBudgetExceeded(
+                    priority=get_strava_priority(),
+                    wait=wait or RATE_LIMIT_WINDOW - time.time() % RATE_LIMIT_WINDOW,
+                )
+        return response
+
+
+_http_sessions = {}
+_http_sessions_lock = threading.Lock()
+
+
+def create_http_session() -> requests.Session:
+    """
+    Create a requests.Session with a pool of keep-alive connections, configured with
+    the environment variables:
+        - stravaHttpPoolSize: number of connections kept open (default 20)
+        - stravaHttpTimeout: timeout of the requests in seconds (default 10)
+        - stravaHttpRetries: number of retries on 429 / 5xx (default 3)
+    """
+    pool_size = int(env.get("stravaHttpPoolSize") or 20)
+    retry = StravaRetry(
+        total=int(env.get("stravaHttpRetries") or 3),
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        raise_on_status=False,
+    )
+    adapter = TimeoutHTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+        timeout=float(env.get("stravaHttpTimeout") or 10),
+    )
+
+    http_session = requests.Session()
+    http_session.mount("https://", adapter)
+    http_session.mount("http://", adapter)
+    return http_session
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return the HTTP session of the process, shared by all the calls to Strava
+    (StravaManager and the stravalib Client).
+    One session per process: the gunicorn workers do not share the sockets of the
+    master process.
+    """
+    pid = os.getpid()
+    if pid not in _http_sessions:
+        with _http_sessions_lock:
+            if pid not in _http_sessions:
+                _http_sessions[pid] = create_http_session()
+    return _http_sessions[pid]
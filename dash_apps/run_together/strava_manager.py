@@ -3,14 +3,42 @@ from dotenv import load_dotenv
 from datetime import datetime, timedelta, date
 from os import environ as env
 import logging
-from typing import List
+import functools
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from flask import session
 
-import requests
 from stravalib.client import Client
 from stravalib.client import BatchedResultsIterator
 from stravalib.model import Athlete, Activity
 
+from dash_apps.run_together.activity_store import ActivityStore
+from dash_apps.run_together.rollups import get_rollup_bucket
+from dash_apps.run_together.activity_stream import ActivityStream
+from dash_apps.run_together.best_efforts import get_activity_efforts
+from dash_apps.run_together.fetch_pool import fetch_concurrently
+from dash_apps.run_together.race_goal import (
+    PROGRESS_WEEKS,
+    get_race_predictions,
+    get_volume_ramp,
+    get_week_buckets,
+    get_weekly_progress,
+)
+from dash_apps.run_together.rate_budget import INTERACTIVE, RateLimitBudgetExceeded
+from dash_apps.run_together.request_cache import clear_request_cache, request_memoize
+from dash_apps.run_together.stream_cache import get_stream_cache
+from dash_apps.run_together.strava_http import STRAVA_API_URL, get_http_session
+from dash_apps.run_together.token_manager import TOKEN_KEYS, get_token_manager
+from dash_apps.run_together.training_load import (
+    HeartRateProfile,
+    extend_training_load,
+    get_stream_load,
+)
+from dash_apps.run_together.zones import (
+    ZONE_NAMES,
+    get_activities_zones,
+    get_zones_key,
+)
+
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
@@ -22,6 +50,7 @@ load_dotenv()
 def get_strava_activity_column():
     return [
         "name",
+        "start_date",
         "start_date_local",
         "type",
         "distance",
@@ -52,10 +81,32 @@ class StravaManager:
         self.strava_client_id = int(env["stravaClientId"])
         self.strava_client_secret = env["stravaClientSecret"]
         self.strava_activity_column = get_strava_activity_column()
-        self.strava_client = Client()
+        # All the calls to Strava share the pooled keep-alive HTTP session
+        self.http_session = get_http_session()
+        self.strava_client = Client(requests_session=self.http_session)
+        self.athlete_id = None
+        self._activity_store = None
         if session:
             self.set_token_from_session()
 
+    @classmethod
+    def for_athlete(cls, athlete_id: int) -> "StravaManager":
+        """
+            StravaManager of an athlete outside of a Flask request (ex: jobs), the
+            token is read from the token manager
+        :param athlete_id:
+        :return: StravaManager with the token of the athlete
+        """
+        strava_manager = cls(session=False)
+        strava_manager.athlete_id = athlete_id
+        token = get_token_manager().get_valid_token(
+            athlete_id=athlete_id, refresh=strava_manager.refresh_token_response
+        )
+        if token is None:
+            raise ValueError(f"No token for athlete={athlete_id}")
+        strava_manager.set_token_response(**token)
+        return strava_manager
+
     def set_token_response(
         self, access_token: str, refresh_token: str, expires_at: str
     ) -> None:
@@ -91,20 +142,46 @@ class StravaManager:
 
     def set_token_from_session(self):
         """
-        Fill the Strava Client with the information about the token.
-        Information save in Flask Session
-        This token need to be refreshed only if not valid.
+        Fill the Strava Client with the token of the athlete of the Flask Session.
+        The token is read from the token manager (shared by the workers) and
+        refreshed there before it expires, the session keeps a copy of it.
+        The token of the session is used if the athlete is not known yet.
         """
-        self.set_token_response(
-            access_token=session["access_token"],
-            refresh_token=session["refresh_token"],
-            expires_at=session["expires_at"],
+        self.athlete_id = session.get("athlete_id")
+        token = {key: session[key] for key in TOKEN_KEYS}
+
+        if self.athlete_id is not None:
+            token_manager = get_token_manager()
+            # Token in the session before the token manager: save it once
+            if token_manager.get_token(athlete_id=self.athlete_id) is None:
+                token_manager.save_token(athlete_id=self.athlete_id, token=token)
+            token = token_manager.get_valid_token(
+                athlete_id=self.athlete_id, refresh=self.refresh_token_response
+            )
+            if session.get("access_token") != token["access_token"]:
+                session.update(token)
+
+        self.set_token_response(**token)
+
+    def refresh_token_response(self, refresh_token: str) -> Dict:
+        """
+            Exchange the refresh token for a new access token (used by the token
+            manager before the access token expires)
+        :param refresh_token:
+        :return: {access_token, refresh_token, expires_at}
+        """
+        token_response = self.strava_client.refresh_access_token(
+            client_id=self.strava_client_id,
+            client_secret=self.strava_client_secret,
+            refresh_token=refresh_token,
         )
+        return {key: token_response[key] for key in TOKEN_KEYS}
 
     def generate_token_response(self, strava_code: str) -> None:
         """
         Fill the Strava Client with the information about the token.
-        This token need to be refreshed only if not valid.
+        The authorization code of the login can only be exchanged once: the token is
+        then saved in the token manager and refreshed with the refresh token.
         """
         token_response = self.strava_client.exchange_code_for_token(
             client_id=self.strava_client_id,
@@ -122,6 +199,13 @@ class StravaManager:
             expires_at=token_response["expires_at"],
         )
 
+        # The athlete of the token is needed to save it
+        self.get_athlete_profile(refresh=True)
+        get_token_manager().save_token(
+            athlete_id=self.athlete_id,
+            token={key: token_response[key] for key in TOKEN_KEYS},
+        )
+
     def get_athlete(self) -> Athlete:
         """
             Get Athlete from  STRAVA API:
@@ -134,8 +218,89 @@ class StravaManager:
         """
         athlete = self.strava_client.get_athlete()
         logging.info(f"Get athlete:{athlete}")
+        self.athlete_id = athlete.id
         return athlete
 
+    def get_athlete_profile(self, refresh: bool = False) -> Dict:
+        """
+            Return the profile of the athlete kept by the token manager, retrieved
+            from STRAVA API only when it is too old (see stravaProfileTtl)
+        :param refresh: True to retrieve the profile from STRAVA API anyway
+        :return: {id, firstname, lastname, profile}
+        """
+        token_manager = get_token_manager()
+        profile = None
+        if self.athlete_id is not None and not refresh:
+            profile = token_manager.get_profile(athlete_id=self.athlete_id)
+
+        if profile is None:
+            athlete = self.get_athlete()
+            profile = {
+                "id": athlete.id,
+                "firstname": athlete.firstname,
+                "lastname": athlete.lastname,
+                "profile": athlete.profile,
+            }
+            token_manager.save_profile(athlete_id=athlete.id, profile=profile)
+
+        return profile
+
+    @property
+    def activity_store(self) -> ActivityStore:
+        """Local store of the activities of the athlete (see ActivityStore)"""
+        if self._activity_store is None:
+            if self.athlete_id is None:
+                self.get_athlete()
+            self._activity_store = ActivityStore(
+                athlete_id=self.athlete_id, columns=self.strava_activity_column
+            )
+        return self._activity_store
+
+    def get_sync_watermark(self) -> str:
+        """
+        :return: start_date (UTC) of the most recent activity in the local store
+        """
+        return self.activity_store.get_watermark()
+
+    def get_data_version(self) -> str:
+        """
+        :return: version of the activities in the local store (changed by each sync
+            retrieving activities), used to invalidate the data computed from them
+        """
+        return self.activity_store.get_data_version()
+
+    def sync_activities(self) -> int:
+        """
+            Retrieve from STRAVA API only the activities newer than the sync watermark
+            and save them in the local activity store.
+            The first sync retrieves the whole history of the athlete.
+
+        :return: number of activities retrieved
+        """
+        watermark = self.get_sync_watermark()
+        logging.info(
+            f"Sync activities for athlete={self.athlete_id} after watermark={watermark}"
+        )
+        activities = self.strava_client.get_activities(after=watermark, limit=None)
+
+        try:
+            activities_columns, count = get_strava_activities_columns(activities)
+        except RateLimitBudgetExceeded as error:
+            # Near the rate limit: the activities already saved are displayed
+            logging.info(f"Sync activities skipped: {error}")
+            return 0
+        self.activity_store.save_activities(activities_columns)
+        clear_request_cache()
+
+        return count
+
+    def get_synced_activity_store(self) -> ActivityStore:
+        """Return the activity store, synced with Strava if it has never been"""
+        if self.activity_store.get_last_sync() is None:
+            self.sync_activities()
+        return self.activity_store
+
+    @request_memoize
     def get_activity(self, activity_id: int) -> Activity:
         """
             Get Activity from  STRAVA API:
@@ -147,11 +312,22 @@ class StravaManager:
             The Activity model object.
         """
 
-        url = f"https://www.strava.com/api/v3/activities/{activity_id}?include_all_efforts="
+        url = f"{STRAVA_API_URL}/activities/{activity_id}?include_all_efforts="
 
         headers = {"Authorization": f"Bearer {self.strava_client.access_token}"}
 
-        response = requests.get(url, headers=headers)
+        try:
+            response = self.http_session.get(url, headers=headers)
+        except RateLimitBudgetExceeded as error:
+            # Near the rate limit: the user sees the summary of the activity saved
+            # in the store (a background job is postponed instead)
+            activity = None
+            if error.priority == INTERACTIVE:
+                activity = self.activity_store.get_activity(activity_id=activity_id)
+            if activity is None:
+                raise
+            logging.info(f"Activity {activity_id} read from the activity store")
+            return activity
 
         if response.status_code == 200:
             activity = response.json()
@@ -161,6 +337,23 @@ class StravaManager:
 
         return activity
 
+    def is_activity_deleted(self, activity_id: int) -> bool:
+        """
+            Check with STRAVA API that an activity does not exist anymore (ex: before
+            deleting it from the store on an event of the webhook)
+        :param activity_id:
+        :return: True if STRAVA API answers 404, False if the activity exists
+        """
+        url = f"{STRAVA_API_URL}/activities/{activity_id}"
+        headers = {"Authorization": f"Bearer {self.strava_client.access_token}"}
+        response = self.http_session.get(url, headers=headers)
+        if response.status_code == 404:
+            return True
+        if response.status_code == 200:
+            return False
+        raise Exception(f"Error: {response.status_code} - {response.text}")
+
+    @request_memoize
     def get_activity_stream(self, activity_id: int) -> dict:
         """
             Get Activity Stream from STRAVA API:
@@ -169,25 +362,173 @@ class StravaManager:
         Returns
         -------
         Dict stream From Strava API V3 with the time, heart-rate latitude and longitude.
+        The stream of an activity does not change: it is saved in the activity store
+        and in the stream cache.
         """
+        activity_stream = self.get_saved_activity_stream(activity_id=activity_id)
+        if activity_stream is not None:
+            return activity_stream
 
         url = (
-            f"https://www.strava.com/api/v3/activities/{activity_id}/"
-            f"streams?keys=time,heartrate,latlng&key_by_type=true"
+            f"{STRAVA_API_URL}/activities/{activity_id}/"
+            f"streams?keys=time,distance,heartrate,latlng&key_by_type=true"
         )
 
         headers = {"Authorization": f"Bearer {self.strava_client.access_token}"}
 
-        response = requests.get(url, headers=headers)
+        response = self.http_session.get(url, headers=headers)
 
         if response.status_code == 200:
             activity_stream = response.json()
+            if self.athlete_id is not None:
+                get_stream_cache().set(self.athlete_id, activity_id, activity_stream)
+                self.activity_store.save_activity_stream(activity_id, activity_stream)
+                self.save_stream_metrics(activity_id, activity_stream)
             return activity_stream
 
         else:
             logging.info(f"Error: {response.status_code} - {response.text}")
             raise Exception(f"Error: {response.status_code} - {response.text}")
 
+    def get_saved_activity_stream(self, activity_id: int) -> Optional[dict]:
+        """
+            Get the stream of an activity already retrieved, without calling STRAVA
+            API: from the stream cache, else from the activity store (the stream
+            cache is then filled)
+        :param activity_id:
+        :return: Dict stream From Strava API V3, None if it was never retrieved
+        """
+        if self.athlete_id is None:
+            return None
+        stream_cache = get_stream_cache()
+        activity_stream = stream_cache.get(self.athlete_id, activity_id)
+        if activity_stream is not None:
+            logging.info(f"Stream cache hit: activity={activity_id}")
+            return activity_stream
+        activity_stream = self.activity_store.get_activity_stream(activity_id)
+        if activity_stream is not None:
+            logging.info(f"Stream read from the activity store: activity={activity_id}")
+            stream_cache.set(self.athlete_id, activity_id, activity_stream)
+        return activity_stream
+
+    def save_stream_metrics(self, activity_id: int, activity_stream: dict) -> None:
+        """
+            Save the metrics of the activity computed from its stream: the load of
+            its heart rate stream, more precise than the one of its average heart
+            rate (see training_load), the time in zones (see zones) and the best
+            efforts (see best_efforts)
+        :param activity_id:
+        :param activity_stream: Dict stream From Strava API V3
+        """
+        activity_stream = ActivityStream.from_strava(activity_stream)
+        load = get_stream_load(
+            activity_stream=activity_stream, profile=HeartRateProfile.from_env()
+        )
+        if load is not None:
+            self.activity_store.save_activity_loads({activity_id: load})
+        self.activity_store.save_activity_zones(
+            zones={activity_id: get_activities_zones([activity_stream])[0]},
+            zones_key=get_zones_key(),
+        )
+        self.activity_store.save_activity_efforts(
+            activity_id=activity_id, efforts=get_activity_efforts(activity_stream)
+        )
+
+    def get_activity_zones(
+        self, activity_id: int, activity_stream: ActivityStream
+    ) -> Dict[str, List[float]]:
+        """
+            Get the time in the heart rate / pace zones of the activity, saved in the
+            local activity store
+        :param activity_id:
+        :param activity_stream: stream of the activity, used if the zones are not saved
+        :return: {"heartrate": [seconds per zone], "pace": [seconds per zone]}
+        """
+        zones_key = get_zones_key()
+        zones = None
+        if self.athlete_id is not None:
+            zones = self.activity_store.get_activity_zones(
+                activity_id=activity_id, zones_key=zones_key
+            )
+        if zones is None:
+            zones = get_activities_zones([activity_stream])[0]
+            if self.athlete_id is not None:
+                self.activity_store.save_activity_zones(
+                    zones={activity_id: zones}, zones_key=zones_key
+                )
+        return zones
+
+    def get_activity_laps(self, activity_id: int) -> List[dict]:
+        """
+            Get Activity Laps from STRAVA API:
+            https://developers.strava.com/docs/reference/#api-Activities-getLapsByActivityId
+
+        Returns
+        -------
+        List of laps From Strava API V3.
+        """
+        url = f"{STRAVA_API_URL}/activities/{activity_id}/laps"
+
+        headers = {"Authorization": f"Bearer {self.strava_client.access_token}"}
+
+        response = self.http_session.get(url, headers=headers)
+
+        if response.status_code == 200:
+            return response.json()
+
+        else:
+            logging.info(f"Error: {response.status_code} - {response.text}")
+            raise Exception(f"Error: {response.status_code} - {response.text}")
+
+    @request_memoize
+    def get_activity_bundle(
+        self, activity_id: int, resources: Tuple[str] = ("activity", "stream", "laps")
+    ) -> Dict:
+        """
+            Get in parallel the resources of one activity from STRAVA API
+            (see fetch_concurrently), the time is the one of the slowest call.
+            Near the rate limit, the stream and the laps of an interactive call are
+            None: the user sees the summary of the activity (see get_activity).
+
+        :param activity_id:
+        :param resources: resources to retrieve among activity, stream and laps
+        :return: {resource: result}
+        """
+
+        def get_optional(function: Callable) -> Callable:
+            def get_resource(activity_id: int):
+                try:
+                    return function(activity_id=activity_id)
+                except RateLimitBudgetExceeded as error:
+                    # A background job is postponed instead
+                    if error.priority != INTERACTIVE:
+                        raise
+                    logging.info(
+                        f"{function.__name__} of activity {activity_id} skipped: "
+                        f"Strava rate limit"
+                    )
+                    return None
+
+            return get_resource
+
+        resource_functions = {
+            "activity": self.get_activity,
+            "stream": get_optional(self.get_activity_stream),
+            "laps": get_optional(self.get_activity_laps),
+        }
+        logging.info(f"Get activity bundle: id={activity_id} resources={resources}")
+
+        return fetch_concurrently(
+            athlete_id=self.athlete_id,
+            calls={
+                resource: functools.partial(
+                    resource_functions[resource], activity_id=activity_id
+                )
+                for resource in resources
+            },
+        )
+
+    @request_memoize
     def get_activities_for_year(self, year: int) -> pd.DataFrame:
         """
         :param year:
@@ -199,21 +540,7 @@ class StravaManager:
         # Set the end date to the end of the year
         end_date = datetime(year, 12, 31, 23, 59, 59)
 
-        # Convert datetime objects to ISO format strings
-        start_date_str = start_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-        end_date_str = end_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        # Call the get_activities function with the calculated parameters
-        activities = self.strava_client.get_activities(
-            after=start_date_str,
-            before=end_date_str,
-        )
-
-        # Format to have a DataFrame
-        activities_dict = get_strava_activities_string(activities)
-        activities_df = get_strava_activities_pandas(activities_dict)
-
-        return activities_df
+        return self.get_activities_between(start_date=start_date, end_date=end_date)
 
     def get_activities_for_month(self, year: int, month: int) -> BatchedResultsIterator:
         # Set the start date to the beginning of the specified month
@@ -235,43 +562,269 @@ class StravaManager:
 
         return activities
 
+    @request_memoize
     def get_activities_between(self, start_date: date, end_date: date) -> pd.DataFrame:
-        # Call the get_activities function with the calculated parameters
-        start_date_str = start_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-        end_date_str = end_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        activities = self.strava_client.get_activities(
-            after=start_date_str, before=end_date_str, limit=None
+        """
+            Get the activities from the local activity store (no call to STRAVA API
+            once the store has been synced)
+        :param start_date:
+        :param end_date: if it is a date, the whole day is included
+        :return: pandas with all the activities between both dates
+        """
+        activities_dict = self.get_synced_activity_store().get_activities_between(
+            start_date=start_date, end_date=end_date
         )
-
-        # Format to have a DataFrame
-        activities_dict = get_strava_activities_string(activities)
         activities_df = get_strava_activities_pandas(activities_dict)
 
         return activities_df
 
+    @request_memoize
+    def get_rollups(
+        self,
+        period: str,
+        start_bucket: str,
+        end_bucket: str,
+        activity_type: str = "Run",
+    ) -> pd.DataFrame:
+        """
+            Get the aggregates of the activities precomputed in the local activity
+            store, the time does not depend on the number of activities.
+        :param period: day, week (ISO 2024-W05), month (2024-01) or year (2024)
+        :param start_bucket: first bucket of the period
+        :param end_bucket: last bucket of the period (included)
+        :param activity_type: type of the activities
+        :return: pandas with one row per bucket: distance, distance_km, moving_time,
+            total_elevation_gain, count, average_heartrate, max_distance (longest
+            activity)
+        """
+        rollups = self.get_synced_activity_store().get_rollups(
+            period=period,
+            start_bucket=start_bucket,
+            end_bucket=end_bucket,
+            activity_type=activity_type,
+        )
+        rollups_df = pd.DataFrame(
+            rollups,
+            columns=[
+                "bucket",
+                "distance",
+                "moving_time",
+                "total_elevation_gain",
+                "count",
+                "average_heartrate",
+                "max_distance",
+            ],
+        )
+        rollups_df["distance_km"] = rollups_df["distance"] / 1e3
+
+        return rollups_df
+
+    @request_memoize
+    def get_zones_per_bucket(
+        self, period: str, start_date: date, end_date: date, activity_type: str = "Run"
+    ) -> Dict[str, pd.DataFrame]:
+        """
+            Get the time in zones of the activities aggregated per bucket of the
+            period. The zones missing in the activity store are computed in one batch
+            from the streams already retrieved (no call to STRAVA API), the
+            activities whose stream has never been retrieved are not counted.
+        :param period: day, week (ISO 2024-W05), month (2024-01) or year (2024)
+        :param start_date: first day
+        :param end_date: last day (included)
+        :param activity_type: type of the activities
+        :return: {"heartrate": pandas, "pace": pandas} with one row per bucket and
+            the seconds in each zone (columns Z1 to Z5)
+        """
+        zones_key = get_zones_key()
+        activities = self.get_synced_activity_store().get_activity_zones_between(
+            start_date=start_date,
+            end_date=end_date,
+            zones_key=zones_key,
+            activity_type=activity_type,
+        )
 
-def get_strava_activities_string(activities: BatchedResultsIterator) -> List:
+        missing_streams = {}
+        for activity_id, _, zones in activities:
+            if zones is None:
+                activity_stream = self.get_saved_activity_stream(activity_id)
+                if activity_stream is not None:
+                    missing_streams[activity_id] = ActivityStream.from_strava(
+                        activity_stream
+                    )
+        computed_zones = dict(
+            zip(missing_streams, get_activities_zones(list(missing_streams.values())))
+        )
+        if computed_zones:
+            self.activity_store.save_activity_zones(
+                zones=computed_zones, zones_key=zones_key
+            )
+
+        buckets, zones_list = [], []
+        for activity_id, start_date_local, zones in activities:
+            zones = zones or computed_zones.get(activity_id)
+            if zones is not None:
+                buckets.append(get_rollup_bucket(period, start_date_local))
+                zones_list.append(zones)
+
+        return {
+            kind: pd.DataFrame(
+                [zones[kind] for zones in zones_list], columns=ZONE_NAMES
+            )
+            .groupby(pd.Index(buckets, name="bucket", dtype=object))
+            .sum()
+            for kind in ["heartrate", "pace"]
+        }
+
+    @request_memoize
+    def get_best_efforts(self, kind: str, season: int = None) -> pd.DataFrame:
+        """
+            Get the best efforts of the runs saved in the local activity store
+        :param kind: distance (best time for each distance) or duration (best
+            distance for each duration, mean-max curve)
+        :param season: year, None for all the seasons
+        :return: pandas with one row per distance / duration: value, result, id,
+            season and pace (seconds per km)
+        """
+        best_efforts = self.get_synced_activity_store().get_best_efforts(
+            kind=kind, season=str(season) if season else None
+        )
+        best_efforts_df = pd.DataFrame(
+            best_efforts, columns=["value", "result", "id", "season"]
+        )
+        if kind == "distance":
+            best_efforts_df["pace"] = (
+                best_efforts_df["result"] / best_efforts_df["value"] * 1e3
+            )
+        else:
+            best_efforts_df["pace"] = (
+                best_efforts_df["value"] / best_efforts_df["result"] * 1e3
+            )
+        return best_efforts_df
+
+    def get_race_goal(self) -> Optional[Dict]:
+        """
+        :return: {name, date, distance} of the race goal of the athlete, None if
+            there is none
+        """
+        return self.activity_store.get_race_goal()
+
+    def save_race_goal(self, name: str, race_date: date, distance: float) -> None:
+        self.activity_store.save_race_goal(
+            name=name, race_date=race_date.isoformat(), distance=distance
+        )
+        # The progress toward the previous goal may be in the request cache
+        clear_request_cache()
+
+    @request_memoize
+    def get_race_progress(self, today: date) -> Optional[Dict]:
+        """
+            Get the progress toward the race goal from precomputed aggregates only
+            (weekly rollups and best efforts): the time does not depend on the
+            number of activities.
+        :param today: current day
+        :return: {goal, days_to_go, weekly (see get_weekly_progress), ramp (see
+            get_volume_ramp), predictions (see get_race_predictions)}, None if there
+            is no race goal
+        """
+        goal = self.get_race_goal()
+        if goal is None:
+            return None
+
+        week_buckets = get_week_buckets(end_day=today, weeks=PROGRESS_WEEKS)
+        weekly = get_weekly_progress(
+            rollups_df=self.get_rollups(
+                period="week", start_bucket=week_buckets[0], end_bucket=week_buckets[-1]
+            ),
+            end_day=today,
+        )
+
+        # Best efforts of the current and the previous seasons
+        best_efforts_df = pd.concat(
+            [
+                self.get_best_efforts(kind="distance", season=season)
+                for season in [today.year - 1, today.year]
+            ]
+        )
+        best_efforts_df = best_efforts_df.groupby("value", as_index=False)[
+            "result"
+        ].min()
+
+        return {
+            "goal": goal,
+            "days_to_go": (date.fromisoformat(goal["date"]) - today).days,
+            "weekly": weekly,
+            "ramp": get_volume_ramp(weekly),
+            "predictions": get_race_predictions(
+                best_efforts_df=best_efforts_df, race_distance=goal["distance"]
+            ),
+        }
+
+    @request_memoize
+    def get_training_load(self, start_date: date, end_date: date) -> pd.DataFrame:
+        """
+            Get the training load precomputed in the local activity store, continued
+            without activity after the last one
+        :param start_date: first day
+        :param end_date: last day (included)
+        :return: pandas indexed by the days: load (hrTSS), ctl (fitness),
+            atl (fatigue), tsb (form)
+        """
+        training_load = self.get_synced_activity_store().get_training_load(
+            start_day=start_date.isoformat(), end_day=end_date.isoformat()
+        )
+        training_load_df = pd.DataFrame(
+            training_load, columns=["day", "load", "ctl", "atl"]
+        )
+        training_load_df.index = pd.to_datetime(training_load_df.pop("day"))
+        training_load_df["tsb"] = training_load_df["ctl"] - training_load_df["atl"]
+
+        training_load_df = extend_training_load(training_load_df, end_day=end_date)
+        return training_load_df.loc[pd.Timestamp(start_date) :]
+
+
+def get_strava_activities_columns(
+    activities: BatchedResultsIterator,
+) -> Tuple[Dict[str, List], int]:
     """
-        Return from a Batch from Strava API into a list of activity dictionary
+        Return from a Batch from Strava API one list of values per activity column.
+        The Batch is consumed only once (iterating it again would fetch again all
+        the pages from the API), and the raw values of the activity model are read
+        directly instead of serializing each activity with activity.dict().
     :param BatchedResultsIterator activities: Batch
-    :return: data
+    :return: data: {column: [values]}, count: number of activities
     """
-    data = []
-    try:
-        logging.info(
-            f"""Retrieve {len(list(activities))} activities from the BatchedResultsIterator"""
-        )
-    except TypeError:
-        logging.info("Retrieve 0 activities from the BatchedResultsIterator")
-        return data
-
-    for activity in activities:
-        my_dict = activity.dict()
-        data.append(
-            [activity.id] + [my_dict.get(x) for x in get_strava_activity_column()]
-        )
+    columns = ["id"] + get_strava_activity_column()
+    data = {column: [] for column in columns}
+    appends = [(column, data[column].append) for column in columns]
+
+    for activity in activities or []:
+        fields = activity.__dict__
+        for column, append in appends:
+            value = fields.get(column)
+            # Unwrap the pydantic custom root types (ActivityType, LatLon)
+            append(getattr(value, "__root__", value))
+
+    count = len(data["id"])
+    logging.info(f"Retrieve {count} activities from the BatchedResultsIterator")
+
+    return data, count
 
+
+def get_strava_activities_json_columns(activities: List[Dict]) -> Dict[str, List]:
+    """
+        Return from activities of STRAVA API in JSON (ex: get_activity) one list of
+        values per activity column, with the values of get_strava_activities_columns:
+        the local start date has no timezone (2024-01-31T09:00:00).
+    :param activities: list of activities in JSON
+    :return: data: {column: [values]}
+    """
+    columns = ["id"] + get_strava_activity_column()
+    data = {
+        column: [activity.get(column) for activity in activities] for column in columns
+    }
+    data["start_date_local"] = [
+        value.rstrip("Z") if value else value for value in data["start_date_local"]
+    ]
     return data
 
 
@@ -304,10 +857,12 @@ def seconds_to_h(seconds: int) -> str:
     return int(hours)
 
 
-def get_strava_activities_pandas(activities: List) -> pd.DataFrame:
+def get_strava_activities_pandas(
+    activities: Union[List, Dict[str, List]]
+) -> pd.DataFrame:
     """
-        Convert the list of activities to a pandas dataframe
-    :param activities:
+        Convert the activities to a pandas dataframe
+    :param activities: list of activities [id] + columns, or one list per column
     :return:
     """
     my_cols = get_strava_activity_column()
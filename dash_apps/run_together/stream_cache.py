@@ -0,0 +1,259 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from os import environ as env
+from typing import Dict, Optional
+
+from dash_apps.run_together.activity_store import get_data_dir
+
+
+class MemoryCacheBackend:
+    """
+    LRU cache in the memory of the process, bounded by the size in bytes of the values.
+    """
+
+    def __init__(self, name: str, max_bytes: int, ttl: int):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size_bytes = 0
+        self.evictions = 0
+        self._items = OrderedDict()  # key: (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                self._remove(key)
+                return None
+            # Most recently used at the end
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            self._items[key] = (time.time() + self.ttl, value)
+            self.size_bytes += len(value)
+            # Evict the least recently used values until the cache fits in max_bytes
+            while self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._items)))
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, value = self._items.pop(key)
+        self.size_bytes -= len(value)
+
+
+class SQLiteCacheBackend:
+    """
+    LRU cache saved in a local SQLite file, shared by all the gunicorn workers,
+    bounded by the size in bytes of the values.
+    """
+
+    def __init__(self, name: str, max_bytes: int, ttl: int, path: str = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        self.path = path or os.path.join(get_data_dir(), f"{name}_cache.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, "
+                "size INTEGER, expires_at REAL, last_access REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)"
+            )
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    @property
+    def size_bytes(self) -> int:
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()
+        return row[0]
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with closing(self.connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now + self.ttl, now),
+            )
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+            # Evict the least recently used values until the cache fits in max_bytes
+            size_bytes = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM cache"
+            ).fetchone()[0]
+            for evicted_key, size in conn.execute(
+                "SELECT key, size FROM cache ORDER BY last_access"
+            ).fetchall():
+                if size_bytes <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM cache WHERE key = ?", (evicted_key,))
+                size_bytes -= size
+                self.evictions += 1
+
+
+class RedisCacheBackend:
+    """
+    Cache saved in a Redis server shared by all the gunicorn workers.
+    The TTL is set on each key, the size is bounded by the Redis server itself
+    (maxmemory + maxmemory-policy allkeys-lru).
+    """
+
+    def __init__(self, name: str, max_bytes: int, ttl: int, url: str = None):
+        # Optional dependency, only needed with a redis cache backend
+        import redis
+
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        self.redis = redis.Redis.from_url(
+            url or env.get("redisUrl") or "redis://localhost:6379/0"
+        )
+
+    @property
+    def size_bytes(self) -> int:
+        return self.redis.info("memory")["used_memory"]
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.redis.get(f"{self.name}:{key}")
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        self.redis.set(f"{self.name}:{key}", value, ex=self.ttl)
+
+
+class StreamCache:
+    """
+    Cache of the activity streams, keyed by athlete + activity id.
+    An activity stream does not change once uploaded, so a stream already displayed
+    is not downloaded again from Strava.
+        - Values serialized in JSON, the size in bytes is used for the eviction
+        - Pluggable backend: memory (one per process), sqlite or redis (shared)
+        - Hit / miss metrics
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(athlete_id: int, activity_id: int) -> str:
+        return f"{athlete_id}:{activity_id}"
+
+    def get(self, athlete_id: int, activity_id: int) -> Optional[Dict]:
+        value = self.backend.get(self.get_key(athlete_id, activity_id))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, athlete_id: int, activity_id: int, activity_stream: Dict) -> None:
+        self.backend.set(
+            self.get_key(athlete_id, activity_id),
+            json.dumps(activity_stream, separators=(",", ":")).encode(),
+        )
+
+    def get_metrics(self) -> Dict:
+        """
+        :return: hits, misses, hit_ratio, evictions and size_bytes of the cache
+        """
+        requests_count = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / requests_count if requests_count else 0.0,
+            "evictions": self.backend.evictions,
+            "size_bytes": self.backend.size_bytes,
+        }
+
+
+def get_web_worker_count() -> int:
+    """Number of gunicorn workers (WEB_CONCURRENCY, also read by gunicorn)"""
+    return int(env.get("WEB_CONCURRENCY") or 1)
+
+
+def create_cache_backend(
+    name: str, default_max_bytes: int, default_ttl: int, shared: bool = False
+):
+    """
+    Create the backend of a cache from the environment variables:
+        - {name}CacheBackend: memory, sqlite or redis. By default memory, or sqlite
+          for a shared cache when several gunicorn workers run
+        - {name}CacheMaxBytes: maximum size of the cache
+        - {name}CacheTtl: time to live of a value in seconds
+    :param shared: the values are only useful if all the workers see them (ex:
+        fragments rendered in advance by one worker)
+    """
+    backends = {
+        "memory": MemoryCacheBackend,
+        "sqlite": SQLiteCacheBackend,
+        "redis": RedisCacheBackend,
+    }
+    several_workers = get_web_worker_count() > 1
+    backend_name = env.get(f"{name}CacheBackend") or (
+        "sqlite" if shared and several_workers else "memory"
+    )
+    logging.info(f"Cache {name}: {backend_name} backend")
+    if shared and several_workers and backend_name == "memory":
+        logging.warning(
+            f"Cache {name}: memory backend with {get_web_worker_count()} workers, "
+            f"the values are not shared between the workers"
+        )
+    return backends[backend_name](
+        name=name,
+        max_bytes=int(env.get(f"{name}CacheMaxBytes") or default_max_bytes),
+        ttl=int(env.get(f"{name}CacheTtl") or default_ttl),
+    )
+
+
+_stream_cache = None
+
+
+def get_stream_cache() -> StreamCache:
+    """
+    Return the stream cache of the process (see create_cache_backend), by default:
+    memory backend, 64 MB, time to live of 7 days
+    """
+    global _stream_cache
+    if _stream_cache is None:
+        backend = create_cache_backend(
+            name="stream", default_max_bytes=64 * 1024 * 1024, default_ttl=7 * 24 * 3600
+        )
+        _stream_cache = StreamCache(backend=backend)
+    return _stream_cache
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import closing
+from os import environ as env
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dash_apps.run_together.activity_store import get_data_dir
+
+# Token type: {"access_token": str, "refresh_token": str, "expires_at": int}
+TOKEN_KEYS = ["access_token", "refresh_token", "expires_at"]
+
+
+class TokenManager:
+    """
+    Strava tokens and profile of the athletes, saved in a SQLite file shared by all
+    the gunicorn workers.
+        - The access token is refreshed with the refresh token before it expires
+          (the authorization code of the login is exchanged only once)
+        - A single refresh runs at a time for one athlete: lock between the threads
+          of the worker, and lease of the refresh between the workers (claimed in a
+          short write transaction, the call to Strava is done outside of it). The
+          token is read again once the lock is acquired, a refresh done meanwhile
+          by another callback is used instead of refreshing again.
+        - The profile of the athlete is kept stravaProfileTtl seconds
+    """
+
+    def __init__(self, path: str = None):
+        """
+        :param path: SQLite file, by default {dataDir}/tokens.sqlite
+        """
+        self.refresh_margin = int(env.get("stravaTokenRefreshMargin") or 600)
+        # Seconds a worker has to refresh a token before another one can claim it
+        self.refresh_lease = 60
+        self.refresh_poll_interval = 0.1
+        self.profile_ttl = int(env.get("stravaProfileTtl") or 24 * 3600)
+        self.path = path or os.path.join(get_data_dir(), "tokens.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Lock of an athlete kept while a refresh uses it (see get_athlete_lock)
+        self._athlete_locks = weakref.WeakValueDictionary()
+        self._athlete_locks_lock = threading.Lock()
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tokens (athlete_id INTEGER PRIMARY KEY, "
+                "access_token TEXT, refresh_token TEXT, expires_at INTEGER, "
+                "profile TEXT, profile_updated_at REAL)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(tokens)")]
+            if "refresh_lease_until" not in columns:
+                conn.execute("ALTER TABLE tokens ADD COLUMN refresh_lease_until REAL")
+
+    def connect(self) -> sqlite3.Connection:
+        # isolation_level=None: the transactions are opened explicitly
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def get_athlete_lock(self, athlete_id: int) -> threading.Lock:
+        with self._athlete_locks_lock:
+            lock = self._athlete_locks.get(athlete_id)
+            if lock is None:
+                lock = threading.Lock()
+                self._athlete_locks[athlete_id] = lock
+            return lock
+
+    @staticmethod
+    def read_token(conn: sqlite3.Connection, athlete_id: int) -> Optional[Dict]:
+        row = conn.execute(
+            "SELECT access_token, refresh_token, expires_at FROM tokens "
+            "WHERE athlete_id = ? AND refresh_token IS NOT NULL",
+            (athlete_id,),
+        ).fetchone()
+        return dict(zip(TOKEN_KEYS, row)) if row else None
+
+    def get_token(self, athlete_id: int) -> Optional[Dict]:
+        """
+        :return: token of the athlete saved, None if the athlete is unknown
+        """
+        with closing(self.connect()) as conn:
+            return self.read_token(conn=conn, athlete_id=athlete_id)
+
+    @staticmethod
+    def write_token(conn: sqlite3.Connection, athlete_id: int, token: Dict) -> None:
+        conn.execute(
+            "INSERT INTO tokens (athlete_id, access_token, refresh_token, expires_at) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (athlete_id) DO UPDATE SET "
+            "access_token = excluded.access_token, "
+            "refresh_token = excluded.refresh_token, expires_at = excluded.expires_at, "
+            "refresh_lease_until = NULL",
+            [athlete_id] + [token[key] for key in TOKEN_KEYS],
+        )
+
+    def save_token(self, athlete_id: int, token: Dict) -> None:
+        """Save the token of the athlete (ex: token of the authorization code)"""
+        with closing(self.connect()) as conn:
+            self.write_token(conn=conn, athlete_id=athlete_id, token=token)
+
+    def is_expiring(self, token: Dict) -> bool:
+        """True if the access token expires in less than stravaTokenRefreshMargin"""
+        return int(token["expires_at"]) - self.refresh_margin < time.time()
+
+    def get_valid_token(
+        self, athlete_id: int, refresh: Callable[[str], Dict]
+    ) -> Optional[Dict]:
+        """
+            Return the token of the athlete, refreshed first if it is about to expire.
+        :param athlete_id:
+        :param refresh: function exchanging a refresh token for a new token
+        :return: token valid for at least stravaTokenRefreshMargin seconds, None if
+            the athlete is unknown
+        """
+        token = self.get_token(athlete_id=athlete_id)
+        if token is None or not self.is_expiring(token):
+            return token
+
+        with self.get_athlete_lock(athlete_id):
+            token, claimed = self.claim_refresh(athlete_id=athlete_id)
+            while not claimed:
+                if token is None or not self.is_expiring(token):
+                    return token
+                # Refresh claimed by another worker: wait for its token
+                time.sleep(self.refresh_poll_interval)
+                token, claimed = self.claim_refresh(athlete_id=athlete_id)
+
+            logging.info(f"Refresh the access token of athlete={athlete_id}")
+            try:
+                new_token = refresh(token["refresh_token"])
+            except Exception:
+                self.release_refresh(athlete_id=athlete_id)
+                raise
+
+            with closing(self.connect()) as conn:
+                # Compare-and-set: only the token which was refreshed is replaced
+                updated = conn.execute(
+                    "UPDATE tokens SET access_token = ?, refresh_token = ?, "
+                    "expires_at = ?, refresh_lease_until = NULL "
+                    "WHERE athlete_id = ? AND refresh_token = ?",
+                    [new_token[key] for key in TOKEN_KEYS]
+                    + [athlete_id, token["refresh_token"]],
+                ).rowcount
+        if not updated:
+            # Token replaced during the refresh (ex: new login): it is kept
+            logging.info(f"Token of athlete={athlete_id} replaced during the refresh")
+            return self.get_token(athlete_id=athlete_id)
+        return new_token
+
+    def claim_refresh(self, athlete_id: int) -> Tuple[Optional[Dict], bool]:
+        """
+            Claim the refresh of the token of the athlete for refresh_lease seconds,
+            in a short write transaction (no call to Strava while it is held)
+        :return: (token saved, True if the refresh is claimed by this call). The
+            refresh is not claimed if the token is not expiring anymore or if
+            another worker holds the lease.
+        """
+        now = time.time()
+        with closing(self.connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                token = self.read_token(conn=conn, athlete_id=athlete_id)
+                claimed = False
+                if token is not None and self.is_expiring(token):
+                    claimed = (
+                        conn.execute(
+                            "UPDATE tokens SET refresh_lease_until = ? "
+                            "WHERE athlete_id = ? AND (refresh_lease_until IS NULL "
+                            "OR refresh_lease_until < ?)",
+                            (now + self.refresh_lease, athlete_id, now),
+                        ).rowcount
+                        == 1
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return token, claimed
+
+    def release_refresh(self, athlete_id: int) -> None:
+        """Release the lease of a failed refresh: another worker can try it"""
+        with closing(self.connect()) as conn:
+            conn.execute(
+                "UPDATE tokens SET refresh_lease_until = NULL WHERE athlete_id = ?",
+                (athlete_id,),
+            )
+
+    def get_profile(self, athlete_id: int) -> Optional[Dict]:
+        """
+        :return: profile of the athlete saved less than stravaProfileTtl seconds
+            ago, None otherwise
+        """
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT profile FROM tokens WHERE athlete_id = ? "
+                "AND profile_updated_at > ?",
+                (athlete_id, time.time() - self.profile_ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def get_profiles(self, athlete_ids: List[int]) -> Dict[int, Dict]:
+        """
+        :return: {athlete_id: profile} of the athletes with a saved profile, even if
+            it is older than stravaProfileTtl (ex: names of the members of a group)
+        """
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                f"SELECT athlete_id, profile FROM tokens "
+                f"WHERE athlete_id IN ({', '.join('?' * len(athlete_ids))}) "
+                f"AND profile IS NOT NULL",
+                list(athlete_ids),
+            ).fetchall()
+        return {athlete_id: json.loads(profile) for athlete_id, profile in rows}
+
+    def save_profile(self, athlete_id: int, profile: Dict) -> None:
+        with closing(self.connect()) as conn:
+            conn.execute(
+                "INSERT INTO tokens (athlete_id, profile, profile_updated_at) "
+                "VALUES (?, ?, ?) ON CONFLICT (athlete_id) DO UPDATE SET "
+                "profile = excluded.profile, "
+                "profile_updated_at = excluded.profile_updated_at",
+                (athlete_id, json.dumps(profile), time.time()),
+            )
+
+
+_token_manager = None
+
+
+def get_token_manager() -> TokenManager:
+    """Return the token manager of the process"""
+    global _token_manager
+    if _token_manager is None:
+        _token_manager = TokenManager()
+    return _token_manager
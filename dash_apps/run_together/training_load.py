@@ -0,0 +1,336 @@
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import date, timedelta
+from os import environ as env
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dash_apps.run_together.activity_stream import ActivityStream
+
+# Time constants in days of the fitness (chronic training load, CTL) and of the
+# fatigue (acute training load, ATL)
+CTL_DAYS = 42
+ATL_DAYS = 7
+
+
+@dataclass(frozen=True)
+class HeartRateProfile:
+    """
+    Heart rates of the athlete used by the training load (beats per minute):
+    resting, maximum and lactate threshold (by default 88% of the heart rate reserve)
+    """
+
+    resting: float
+    maximum: float
+    threshold: float
+
+    @classmethod
+    def from_env(cls) -> "HeartRateProfile":
+        """Profile set with restingHeartrate, maxHeartrate and thresholdHeartrate"""
+        resting = float(env.get("restingHeartrate") or 60)
+        maximum = float(env.get("maxHeartrate") or 190)
+        threshold = float(
+            env.get("thresholdHeartrate") or resting + 0.88 * (maximum - resting)
+        )
+        return cls(resting=resting, maximum=maximum, threshold=threshold)
+
+    @property
+    def key(self) -> str:
+        """Identify the profile the saved training load was computed with"""
+        return f"{self.resting:g}-{self.maximum:g}-{self.threshold:g}"
+
+
+def get_trimp_per_minute(heartrate: np.ndarray, profile: HeartRateProfile):
+    """
+        Banister TRIMP of one minute at the heart rate:
+        hr_reserve * 0.64 * exp(1.92 * hr_reserve)
+    :param heartrate: heart rates (bpm), NaN if unknown
+    :param profile: heart rates of the athlete
+    :return: TRIMP per minute, same shape as heartrate
+    """
+    hr_reserve = np.clip(
+        (np.asarray(heartrate, dtype=np.float64) - profile.resting)
+        / (profile.maximum - profile.resting),
+        0,
+        1,
+    )
+    return hr_reserve * 0.64 * np.exp(1.92 * hr_reserve)
+
+
+def get_hr_tss(trimp, profile: HeartRateProfile):
+    """
+    :param trimp: Banister TRIMP
+    :return: hrTSS, 100 is one hour at the threshold heart rate
+    """
+    return trimp / (60 * get_trimp_per_minute(profile.threshold, profile)) * 100
+
+
+def get_activities_load(
+    moving_time: np.ndarray, average_heartrate: np.ndarray, profile: HeartRateProfile
+) -> np.ndarray:
+    """
+        hrTSS of the activities from their moving time and average heart rate, 0 for
+        the activities without heart rate. The TRIMP is convex: an activity with
+        intervals is underestimated (see get_stream_load).
+    :param moving_time: seconds, one value per activity
+    :param average_heartrate: bpm, NaN if the activity has no heart rate
+    :param profile: heart rates of the athlete
+    :return: hrTSS of each activity
+    """
+    trimp = (
+        np.asarray(moving_time, dtype=np.float64)
+        / 60
+        * get_trimp_per_minute(average_heartrate, profile)
+    )
+    return np.nan_to_num(get_hr_tss(trimp, profile))
+
+
+def get_stream_load(
+    activity_stream: ActivityStream, profile: HeartRateProfile
+) -> Optional[float]:
+    """
+        hrTSS of the activity summed over the samples of its heart rate stream,
+        weighted by the time between samples (pauses excluded)
+    :param activity_stream: stream of the activity
+    :param profile: heart rates of the athlete
+    :return: hrTSS, None if the stream has no heart rate
+    """
+    if len(activity_stream.heartrate) < 2:
+        return None
+    trimp = np.dot(
+        activity_stream.sample_time / 60,
+        get_trimp_per_minute(activity_stream.heartrate, profile),
+    )
+    return float(get_hr_tss(trimp, profile))
+
+
+def get_daily_load(
+    days: np.ndarray, load: np.ndarray, start_day: date, end_day: date
+) -> pd.Series:
+    """
+        Sum the load of the activities per day, the days without activity are 0
+    :param days: day of each activity (datetime64[D] or ISO strings 2024-01-31)
+    :param load: load of each activity
+    :param start_day: first day of the series
+    :param end_day: last day of the series (included)
+    :return: load per day, indexed by the days
+    """
+    index = pd.date_range(start_day, end_day, freq="D")
+    offsets = (
+        np.asarray(days, dtype="datetime64[D]") - np.datetime64(start_day, "D")
+    ).astype(np.int64)
+    in_range = (offsets >= 0) & (offsets < len(index))
+    daily_load = np.bincount(
+        offsets[in_range], weights=np.asarray(load)[in_range], minlength=len(index)
+    )
+    return pd.Series(daily_load, index=index)
+
+
+def get_ewma(daily_load: pd.Series, days: int, initial: float = 0.0) -> np.ndarray:
+    """
+        Exponentially weighted average of the load, from the value of the day before:
+        value = previous + (load - previous) / days
+        Computed by the pandas ewm recurrence (no Python loop over the days).
+    :param daily_load: load per day
+    :param days: time constant
+    :param initial: value of the day before the first day
+    :return: value of each day
+    """
+    values = np.concatenate([[initial], daily_load.to_numpy(dtype=np.float64)])
+    ewma = pd.Series(values).ewm(alpha=1 / days, adjust=False).mean()
+    return ewma.to_numpy()[1:]
+
+
+def get_training_load(
+    daily_load: pd.Series, initial: Tuple[float, float] = (0.0, 0.0)
+) -> pd.DataFrame:
+    """
+        Fitness, fatigue and form of each day of the series
+    :param daily_load: load (hrTSS) per day, see get_daily_load
+    :param initial: (ctl, atl) of the day before the first day, to continue a
+        training load already computed
+    :return: pandas indexed by the days: load, ctl (fitness), atl (fatigue),
+        tsb (form = ctl - atl)
+    """
+    ctl = get_ewma(daily_load, days=CTL_DAYS, initial=initial[0])
+    atl = get_ewma(daily_load, days=ATL_DAYS, initial=initial[1])
+    return pd.DataFrame(
+        {"load": daily_load.to_numpy(), "ctl": ctl, "atl": atl, "tsb": ctl - atl},
+        index=daily_load.index,
+    )
+
+
+def extend_training_load(training_load: pd.DataFrame, end_day: date) -> pd.DataFrame:
+    """
+        Continue the training load without activity until end_day: fitness and
+        fatigue decrease geometrically from the last day
+    :param training_load: see get_training_load
+    :param end_day: last day (included)
+    :return: training load until end_day
+    """
+    if training_load.empty:
+        return training_load
+    last_day = training_load.index[-1].date()
+    if end_day <= last_day:
+        return training_load
+
+    index = pd.date_range(last_day + timedelta(days=1), end_day, freq="D")
+    elapsed = np.arange(1, len(index) + 1)
+    last = training_load.iloc[-1]
+    ctl = last["ctl"] * (1 - 1 / CTL_DAYS) ** elapsed
+    atl = last["atl"] * (1 - 1 / ATL_DAYS) ** elapsed
+    rest_days = pd.DataFrame(
+        {"load": 0.0, "ctl": ctl, "atl": atl, "tsb": ctl - atl}, index=index
+    )
+    return pd.concat([training_load, rest_days])
+
+
+class TrainingLoadStoreMixin:
+    """
+    Training load of the ActivityStore per day (load, fitness and fatigue),
+    computed from the loads of the activities, updated from the first day of the
+    activities saved
+    """
+
+    def create_training_load_tables(self, conn: sqlite3.Connection) -> None:
+        """Create the tables, the activities already saved are computed"""
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS activity_loads "
+            "(id INTEGER PRIMARY KEY, load REAL)"
+        )
+        training_load_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master "
+            "WHERE type = 'table' AND name = 'training_load'"
+        ).fetchone()
+        if not training_load_exists:
+            conn.execute(
+                "CREATE TABLE training_load (day TEXT PRIMARY KEY, load REAL, "
+                "ctl REAL, atl REAL)"
+            )
+            first_day = conn.execute(
+                "SELECT MIN(start_date_local) FROM activities"
+            ).fetchone()[0]
+            self.update_training_load(
+                conn=conn, start_dates_local=[first_day] if first_day else []
+            )
+
+    @staticmethod
+    def update_training_load(conn: sqlite3.Connection, start_dates_local: List[str]):
+        """
+            Compute again the training load from the first day of the dates, the
+            fitness and fatigue continue from the values saved for the day before.
+            The load of an activity is the one computed from its heart rate stream
+            (see save_activity_loads), otherwise the one of its average heart rate.
+            The whole history is computed again when the heart rate profile changes
+            (the loads of the streams are removed).
+        :param conn: connection with the transaction saving the activities
+        :param start_dates_local: start dates of the activities added / modified
+        """
+        if not start_dates_local:
+            return
+        first_day = min(start_dates_local)[:10]
+
+        profile = HeartRateProfile.from_env()
+        profile_key = conn.execute(
+            "SELECT value FROM sync_state WHERE key = 'training_load_profile'"
+        ).fetchone()
+        if profile_key is None or profile_key[0] != profile.key:
+            first_day = ""
+            conn.execute("DELETE FROM activity_loads")
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state "
+                "VALUES ('training_load_profile', ?)",
+                (profile.key,),
+            )
+
+        previous = conn.execute(
+            "SELECT day, ctl, atl FROM training_load WHERE day < ? "
+            "ORDER BY day DESC LIMIT 1",
+            (first_day,),
+        ).fetchone()
+        activities = conn.execute(
+            "SELECT substr(start_date_local, 1, 10), moving_time, "
+            "average_heartrate, activity_loads.load "
+            "FROM activities LEFT JOIN activity_loads USING (id) "
+            "WHERE start_date_local >= ?",
+            (first_day,),
+        ).fetchall()
+        conn.execute("DELETE FROM training_load WHERE day >= ?", (first_day,))
+        if not activities:
+            return
+
+        days, moving_time, average_heartrate, stream_load = zip(*activities)
+        days = np.array(days, dtype="datetime64[D]")
+        stream_load = np.array(stream_load, dtype=np.float64)
+        load = np.where(
+            np.isnan(stream_load),
+            get_activities_load(
+                moving_time=np.array(moving_time, dtype=np.float64),
+                average_heartrate=np.array(average_heartrate, dtype=np.float64),
+                profile=profile,
+            ),
+            stream_load,
+        )
+        if previous is None:
+            start_day, initial = days.min(), (0.0, 0.0)
+        else:
+            start_day = np.datetime64(previous[0], "D") + 1
+            initial = (previous[1], previous[2])
+
+        training_load = get_training_load(
+            daily_load=get_daily_load(
+                days=days,
+                load=load,
+                start_day=start_day.astype(date),
+                end_day=days.max().astype(date),
+            ),
+            initial=initial,
+        )
+        conn.executemany(
+            "INSERT INTO training_load VALUES (?, ?, ?, ?)",
+            zip(
+                training_load.index.strftime("%Y-%m-%d"),
+                training_load["load"].tolist(),
+                training_load["ctl"].tolist(),
+                training_load["atl"].tolist(),
+            ),
+        )
+
+    def save_activity_loads(self, loads: Dict[int, float]) -> None:
+        """
+            Save the loads computed from the heart rate streams of activities, and
+            update the training load from their day
+        :param loads: {activity_id: hrTSS}
+        """
+        with closing(self.connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO activity_loads VALUES (?, ?)", loads.items()
+            )
+            self.update_training_load(
+                conn=conn,
+                start_dates_local=self.get_start_dates_local(
+                    conn=conn, activity_ids=list(loads)
+                ),
+            )
+
+    def get_training_load(self, start_day: str, end_day: str) -> List[Dict]:
+        """
+            Return the training load saved between both days, starting with the last
+            day saved before start_day (the days after the last activity are not
+            saved, see extend_training_load)
+        :param start_day: 2024-01-31
+        :param end_day: 2024-12-31 (included)
+        :return: list of {day, load, ctl, atl}
+        """
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                "SELECT day, load, ctl, atl FROM training_load "
+                "WHERE day <= ? AND day >= "
+                "(SELECT IFNULL(MAX(day), '') FROM training_load WHERE day <= ?) "
+                "ORDER BY day",
+                (end_day, start_day),
+            ).fetchall()
+        return [dict(zip(["day", "load", "ctl", "atl"], row)) for row in rows]
@@ -0,0 +1,205 @@
+import json
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime, time
+from os import environ as env
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from dash_apps.run_together.activity_stream import ActivityStream
+from dash_apps.run_together.training_load import HeartRateProfile
+
+ZONE_NAMES = ["Z1", "Z2", "Z3", "Z4", "Z5"]
+
+# Lower bounds of the zones 2 to 5:
+# - heart rate: fraction of the maximum heart rate
+# - pace: fraction of the speed at the threshold pace
+HEARTRATE_ZONE_BOUNDS = [0.6, 0.7, 0.8, 0.9]
+PACE_ZONE_BOUNDS = [0.78, 0.88, 0.95, 1.02]
+
+# Format of the local start dates of the activities saved (see to_sqlite_value)
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def get_threshold_speed() -> float:
+    """Speed in m/s of the threshold pace of the athlete (thresholdPace in s/km)"""
+    return 1000 / float(env.get("thresholdPace") or 270)
+
+
+def get_zones_key() -> str:
+    """Identify the settings the saved zones were computed with"""
+    return f"{HeartRateProfile.from_env().maximum:g}-{get_threshold_speed():.4f}"
+
+
+def get_time_in_zones(
+    values: List[np.ndarray], weights: List[np.ndarray], bounds: np.ndarray
+) -> np.ndarray:
+    """
+        Time spent in each zone by several activities in one pass: the samples of
+        all the activities are concatenated, and the zone of each sample is offset by
+        its activity, so a single np.bincount gives the histograms of all of them.
+    :param values: samples of each activity (ex: heart rate)
+    :param weights: seconds of each sample (see ActivityStream.sample_time)
+    :param bounds: lower bounds of the zones 2 to N, in the unit of the values
+    :return: seconds per zone, shape (number of activities, number of zones)
+    """
+    zone_count = len(bounds) + 1
+    if not values:
+        return np.zeros((0, zone_count))
+    lengths = [len(x) for x in values]
+    zones = np.searchsorted(bounds, np.concatenate(values), side="right")
+    zones += np.repeat(np.arange(len(values)) * zone_count, lengths)
+    time_in_zones = np.bincount(
+        zones, weights=np.concatenate(weights), minlength=len(values) * zone_count
+    )
+    return time_in_zones.reshape(len(values), zone_count)
+
+
+def get_activities_zones(
+    activity_streams: List[ActivityStream],
+) -> List[Dict[str, List[float]]]:
+    """
+        Time in the heart rate zones and in the pace zones of the activities, the
+        samples are weighted by their time (irregular samples and pauses)
+    :param activity_streams: streams of the activities
+    :return: for each activity {"heartrate": [seconds per zone],
+        "pace": [seconds per zone]}, no time in the zones without the stream
+    """
+    heartrate_bounds = (
+        np.array(HEARTRATE_ZONE_BOUNDS) * HeartRateProfile.from_env().maximum
+    )
+    pace_bounds = np.array(PACE_ZONE_BOUNDS) * get_threshold_speed()
+
+    sample_times = [x.sample_time for x in activity_streams]
+    speeds = [x.speed for x in activity_streams]
+    has_heartrate = [len(x.heartrate) == len(x.time) for x in activity_streams]
+    heartrate = get_time_in_zones(
+        values=[
+            x.heartrate if has else np.empty(0)
+            for x, has in zip(activity_streams, has_heartrate)
+        ],
+        weights=[
+            weights if has else np.empty(0)
+            for weights, has in zip(sample_times, has_heartrate)
+        ],
+        bounds=heartrate_bounds,
+    )
+    pace = get_time_in_zones(
+        values=speeds,
+        weights=[
+            # Samples without moving are not in the pace zones
+            np.where(speed > 0, weights, 0)
+            for speed, weights in zip(speeds, sample_times)
+        ],
+        bounds=pace_bounds,
+    )
+    return [
+        {"heartrate": heartrate_zones.tolist(), "pace": pace_zones.tolist()}
+        for heartrate_zones, pace_zones in zip(heartrate, pace)
+    ]
+
+
+class ZonesStoreMixin:
+    """
+    Time in the heart rate / pace zones of the activities of the ActivityStore,
+    saved with the settings of the zones they were computed with (see
+    get_zones_key)
+    """
+
+    @staticmethod
+    def create_activity_zones_table(conn: sqlite3.Connection) -> None:
+        """Create the table of the time in zones per activity"""
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS activity_zones (id INTEGER PRIMARY KEY, "
+            "zones_key TEXT, heartrate TEXT, pace TEXT)"
+        )
+
+    def save_activity_zones(
+        self, zones: Dict[int, Dict[str, List[float]]], zones_key: str
+    ) -> None:
+        """
+            Save the time in zones of activities (see get_activities_zones). The
+            version of the data only changes if zones are new or different: the
+            zones saved again when an activity is displayed do not invalidate the
+            calendars in the fragment cache.
+        :param zones: {activity_id: {"heartrate": [...], "pace": [...]}}
+        :param zones_key: settings of the zones (see get_zones_key)
+        """
+        with closing(self.connect()) as conn, conn:
+            total_changes = conn.total_changes
+            conn.executemany(
+                "INSERT INTO activity_zones VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET zones_key = excluded.zones_key, "
+                "heartrate = excluded.heartrate, pace = excluded.pace "
+                "WHERE zones_key IS NOT excluded.zones_key "
+                "OR heartrate IS NOT excluded.heartrate OR pace IS NOT excluded.pace",
+                [
+                    (
+                        activity_id,
+                        zones_key,
+                        json.dumps(activity_zones["heartrate"]),
+                        json.dumps(activity_zones["pace"]),
+                    )
+                    for activity_id, activity_zones in zones.items()
+                ],
+            )
+            # The calendars display the zones
+            if conn.total_changes > total_changes:
+                self.increment_data_version(conn=conn)
+
+    def get_activity_zones_between(
+        self, start_date: date, end_date: date, zones_key: str, activity_type: str
+    ) -> List[Tuple[int, str, Optional[Dict[str, List[float]]]]]:
+        """
+            Return the time in zones of the activities of one type with a
+            start_date_local between both dates (whole days included)
+        :param start_date:
+        :param end_date:
+        :param zones_key: settings of the zones, the zones saved with other
+            settings are not returned
+        :param activity_type: ex: Run
+        :return: list of (id, start_date_local, zones), zones is None if they have not
+            been computed
+        """
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, start_date_local, heartrate, pace FROM activities "
+                "LEFT JOIN activity_zones USING (id) "
+                "WHERE start_date_local BETWEEN ? AND ? AND type = ? "
+                "AND (zones_key IS NULL OR zones_key = ?) "
+                "ORDER BY start_date_local",
+                (
+                    datetime.combine(start_date, time.min).strftime(DATETIME_FORMAT),
+                    datetime.combine(end_date, time.max).strftime(DATETIME_FORMAT),
+                    activity_type,
+                    zones_key,
+                ),
+            ).fetchall()
+        return [
+            (
+                activity_id,
+                start_date_local,
+                None
+                if heartrate is None
+                else {"heartrate": json.loads(heartrate), "pace": json.loads(pace)},
+            )
+            for activity_id, start_date_local, heartrate, pace in rows
+        ]
+
+    def get_activity_zones(
+        self, activity_id: int, zones_key: str
+    ) -> Optional[Dict[str, List[float]]]:
+        """
+        :return: time in zones of the activity, None if they have not been computed
+            with these settings
+        """
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT heartrate, pace FROM activity_zones "
+                "WHERE id = ? AND zones_key = ?",
+                (activity_id, zones_key),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"heartrate": json.loads(row[0]), "pace": json.loads(row[1])}
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from dash_apps.run_together.activity_store import ActivityStore
+
+# Columns of the activities saved by the tests (see get_strava_activity_column)
+COLUMNS = [
+    "start_date",
+    "start_date_local",
+    "type",
+    "distance",
+    "moving_time",
+    "total_elevation_gain",
+    "average_heartrate",
+]
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """The local data of each test are saved in its own temporary folder"""
+    monkeypatch.setenv("dataDir", str(tmp_path))
+    for name in ["restingHeartrate", "maxHeartrate", "thresholdHeartrate"]:
+        monkeypatch.delenv(name, raising=False)
+    return tmp_path
+
+
+@pytest.fixture
+def activity_store(data_dir) -> ActivityStore:
+    return ActivityStore(athlete_id=1, columns=COLUMNS)
+
+
+def make_activities(
+    ids: List[int], start: datetime, days: int, rng: np.random.Generator
+) -> Dict[str, List]:
+    """
+        Synthetic activities at random times between start and start + days: 80% of
+        runs, some without heart rate
+    :param ids: ids of the activities
+    :param start: first day
+    :param days: number of days
+    :param rng: random generator
+    :return: one list per column, see ActivityStore.save_activities
+    """
+    activities = {column: [] for column in ["id"] + COLUMNS}
+    for activity_id in ids:
+        start_date = start + timedelta(seconds=float(rng.uniform(0, days * 86400)))
+        distance = float(rng.uniform(3000, 30000))
+        activities["id"].append(activity_id)
+        activities["start_date"].append(start_date.strftime("%Y-%m-%dT%H:%M:%SZ"))
+        activities["start_date_local"].append(start_date.strftime("%Y-%m-%dT%H:%M:%S"))
+        activities["type"].append("Run" if rng.random() < 0.8 else "Ride")
+        activities["distance"].append(distance)
+        activities["moving_time"].append(int(distance / rng.uniform(2.5, 4)))
+        activities["total_elevation_gain"].append(float(rng.uniform(0, 500)))
+        activities["average_heartrate"].append(
+            float(rng.uniform(120, 180)) if rng.random() < 0.9 else None
+        )
+    return activities
+
+
+def get_saved_activities(activity_store: ActivityStore) -> Dict[str, List]:
+    """All the activities of the store, one list per column"""
+    activities = activity_store.get_activities_between(
+        start_date=datetime(1970, 1, 1), end_date=datetime(2100, 1, 1)
+    )
+    return {
+        column: [activity[i] for activity in activities]
+        for i, column in enumerate(["id"] + COLUMNS)
+    }
@@ -0,0 +1,167 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from dash_apps.run_together.activity_store import ActivityStore
+from dash_apps.run_together.activity_stream import ActivityStream
+from dash_apps.run_together.best_efforts import (
+    BEST_EFFORT_DISTANCES,
+    DISTANCE,
+    DURATION,
+    MEAN_MAX_DURATIONS,
+    get_activity_efforts,
+    get_best_distances,
+    get_best_times,
+)
+from tests.conftest import get_saved_activities, make_activities
+
+
+def get_interval_run() -> ActivityStream:
+    """1 Hz run of 3000 s at 3 m/s with 300 s at 5 m/s starting at 1000 s"""
+    speed = np.full(3000, 3.0)
+    speed[1000:1300] = 5.0
+    return ActivityStream.from_strava(
+        {
+            "time": {"data": list(range(3001))},
+            "distance": {"data": np.concatenate([[0], np.cumsum(speed)]).tolist()},
+        }
+    )
+
+
+def test_best_times_interval_run():
+    activity_stream = get_interval_run()
+    best_times = get_best_times(
+        time=activity_stream.time.astype(np.float64),
+        distance=activity_stream.distance.astype(np.float64),
+        distances=[400, 1000, 1500, 2000, 10000],
+    )
+    # 2000 m: 1500 m in the 300 s at 5 m/s + 500 m at 3 m/s
+    np.testing.assert_allclose(best_times[:4], [80, 200, 300, 300 + 500 / 3], rtol=1e-5)
+    # Longer than the activity (9600 m)
+    assert np.isnan(best_times[4])
+
+
+def test_best_distances_interval_run():
+    activity_stream = get_interval_run()
+    best_distances = get_best_distances(
+        time=activity_stream.time.astype(np.float64),
+        distance=activity_stream.distance.astype(np.float64),
+        durations=[10, 300, 600, 3000, 3600],
+    )
+    np.testing.assert_allclose(
+        best_distances[:4], [50, 1500, 1500 + 900, 9600], rtol=1e-5
+    )
+    assert np.isnan(best_distances[4])
+
+
+@pytest.mark.parametrize("n_samples", [0, 1])
+def test_best_efforts_too_short(n_samples):
+    time = np.arange(n_samples, dtype=np.float64)
+    assert np.isnan(get_best_times(time, time * 3, [400])).all()
+    assert np.isnan(get_best_distances(time, time * 3, [10])).all()
+
+
+def test_activity_efforts_only_covered():
+    efforts = get_activity_efforts(get_interval_run())
+    assert {(kind, value) for kind, value, _ in efforts} == {
+        (DISTANCE, value) for value in BEST_EFFORT_DISTANCES.values() if value <= 9600
+    } | {(DURATION, value) for value in MEAN_MAX_DURATIONS if value <= 3000}
+    # Without distance stream
+    assert (
+        get_activity_efforts(ActivityStream.from_strava({"time": {"data": [0]}})) == []
+    )
+
+
+def get_brute_force_best_efforts(
+    activity_store: ActivityStore, efforts: dict, kind: str, season: str = None
+) -> list:
+    """Best effort of each value among the efforts of the runs of the season"""
+    activities = get_saved_activities(activity_store)
+    seasons = {
+        activity_id: start_date_local[:4]
+        for activity_id, start_date_local, activity_type in zip(
+            activities["id"], activities["start_date_local"], activities["type"]
+        )
+        if activity_type == "Run"
+    }
+    best = {}
+    for activity_id, activity_efforts in efforts.items():
+        if activity_id not in seasons or season not in [None, seasons[activity_id]]:
+            continue
+        for effort_kind, value, result in activity_efforts:
+            if effort_kind != kind:
+                continue
+            if value not in best or (
+                result < best[value][0] if kind == DISTANCE else result > best[value][0]
+            ):
+                best[value] = (result, activity_id, seasons[activity_id])
+    return [
+        {"value": value, "result": result, "id": activity_id, "season": season}
+        for value, (result, activity_id, season) in sorted(best.items())
+    ]
+
+
+def assert_best_efforts_equal(activity_store: ActivityStore, efforts: dict):
+    for kind in [DISTANCE, DURATION]:
+        for season in [None, "2022", "2023", "2024"]:
+            assert activity_store.get_best_efforts(
+                kind=kind, season=season
+            ) == get_brute_force_best_efforts(activity_store, efforts, kind, season)
+
+
+def make_efforts(rng: np.random.Generator) -> list:
+    """Random efforts of one activity (no tie between the results)"""
+    return [
+        (DISTANCE, value, float(value / rng.uniform(3, 5)))
+        for value in [400, 1000, 5000]
+        if rng.random() < 0.8
+    ] + [
+        (DURATION, value, float(value * rng.uniform(3, 5)))
+        for value in [60, 600]
+        if rng.random() < 0.8
+    ]
+
+
+def test_season_ranking_matches_brute_force(activity_store):
+    """
+    The best efforts merged with the efforts of each new activity, and the seasons
+    ranked again when activities change, are the best of the efforts saved
+    """
+    rng = np.random.default_rng(0)
+    activity_store.save_activities(
+        make_activities(
+            list(range(1, 121)), start=datetime(2022, 1, 1), days=1095, rng=rng
+        )
+    )
+    efforts = {}
+    for activity_id in rng.permutation(np.arange(1, 121)).tolist():
+        efforts[activity_id] = make_efforts(rng)
+        activity_store.save_activity_efforts(activity_id, efforts[activity_id])
+    assert_best_efforts_equal(activity_store, efforts)
+
+    # Efforts computed again (ex: stream corrected): the season is ranked again
+    for activity_id in [1, 2, 3]:
+        efforts[activity_id] = make_efforts(rng)
+        activity_store.save_activity_efforts(activity_id, efforts[activity_id])
+    assert_best_efforts_equal(activity_store, efforts)
+
+    # Activities moved to another season or changed to a ride
+    moved = make_activities(
+        list(range(10, 40)), start=datetime(2022, 1, 1), days=1095, rng=rng
+    )
+    activity_store.save_activities(moved)
+    assert_best_efforts_equal(activity_store, efforts)
+
+    # Activities holding best efforts deleted
+    deleted = sorted(
+        {
+            effort["id"]
+            for effort in activity_store.get_best_efforts(kind=DISTANCE)
+            + activity_store.get_best_efforts(kind=DURATION)
+        }
+    )[:5]
+    activity_store.delete_activities(deleted)
+    for activity_id in deleted:
+        del efforts[activity_id]
+    assert_best_efforts_equal(activity_store, efforts)
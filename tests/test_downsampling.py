@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from dash_apps.run_together.activity_stream import ActivityStream
+from dash_apps.run_together.components.activity_details import (
+    GRAPH_MAX_POINTS,
+    get_graph_stream,
+)
+from dash_apps.run_together.downsampling import lttb_indexes
+
+
+@pytest.mark.parametrize("n_points, n_out", [(0, 10), (1, 10), (2, 10), (10, 10)])
+def test_not_more_points_than_n_out(n_points, n_out):
+    x = np.arange(n_points, dtype=np.float64)
+    np.testing.assert_array_equal(lttb_indexes(x, x**2, n_out), np.arange(n_points))
+
+
+@pytest.mark.parametrize("n_out", [0, 1, 2])
+def test_n_out_too_small_keeps_all_points(n_out):
+    x = np.arange(50, dtype=np.float64)
+    np.testing.assert_array_equal(lttb_indexes(x, x, n_out), np.arange(50))
+
+
+@pytest.mark.parametrize("n_points, n_out", [(11, 10), (1000, 3), (1000, 100)])
+def test_collinear_points(n_points, n_out):
+    x = np.arange(n_points, dtype=np.float64)
+    indexes = lttb_indexes(x, 2 * x + 1, n_out)
+    assert len(indexes) == n_out
+    assert indexes[0] == 0 and indexes[-1] == n_points - 1
+    assert (np.diff(indexes) > 0).all()
+
+
+def test_keeps_peaks():
+    rng = np.random.default_rng(0)
+    x = np.cumsum(rng.uniform(0.5, 1.5, 10000))
+    y = 150 + rng.normal(0, 1, 10000)
+    y[[1234, 5678]] = [190, 100]
+    indexes = lttb_indexes(x, y, 200)
+    assert len(indexes) == 200
+    assert (np.diff(indexes) > 0).all()
+    assert {1234, 5678} <= set(indexes.tolist())
+
+
+@pytest.mark.parametrize(
+    "streams", [["time", "distance", "heartrate"], ["time", "distance"], ["time"]]
+)
+def test_graph_stream_capped(streams):
+    """With or without heart rate / distance, the graph has at most GRAPH_MAX_POINTS"""
+    n_samples = 3 * GRAPH_MAX_POINTS + 1
+    activity_stream = ActivityStream.from_strava(
+        {
+            "time": {"data": list(range(n_samples))},
+            "distance": {"data": [3.0 * i for i in range(n_samples)]},
+            "heartrate": {"data": [150] * n_samples},
+        }
+    )
+    activity_stream = ActivityStream(
+        **{
+            name: getattr(activity_stream, name)
+            if name in streams
+            else getattr(activity_stream, name)[:0]
+            for name in ["time", "distance", "heartrate", "latlng"]
+        }
+    )
+    graph_stream = get_graph_stream(activity_stream)
+    assert len(graph_stream) == GRAPH_MAX_POINTS
+    assert graph_stream.time[0] == 0 and graph_stream.time[-1] == n_samples - 1
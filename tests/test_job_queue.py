@@ -0,0 +1,106 @@
+import threading
+from contextlib import closing
+
+import pytest
+
+from dash_apps.run_together.job_queue import JobQueue
+
+
+@pytest.fixture
+def job_queue(data_dir) -> JobQueue:
+    return JobQueue()
+
+
+def test_pending_job_with_same_key_replaced(job_queue):
+    job_queue.enqueue("activity", {"aspect_type": "create"}, key="activity:1")
+    job_queue.enqueue("activity", {"aspect_type": "update"}, key="activity:1")
+    job_queue.enqueue("activity", {"aspect_type": "create"}, key="activity:2")
+    assert job_queue.get_counts() == {"pending": 2}
+
+    job = job_queue.claim()
+    assert (job.kind, job.payload, job.attempts) == (
+        "activity",
+        {"aspect_type": "update"},
+        1,
+    )
+
+
+def test_jobs_without_key_not_replaced(job_queue):
+    job_queue.enqueue("backfill", {"page": 1})
+    job_queue.enqueue("backfill", {"page": 1})
+    assert job_queue.get_counts() == {"pending": 2}
+
+
+def test_event_during_running_job_queued(job_queue):
+    """An event received while the job of the same key runs is processed after"""
+    job_queue.enqueue("activity", {"aspect_type": "create"}, key="activity:1")
+    running = job_queue.claim()
+    job_queue.enqueue("activity", {"aspect_type": "delete"}, key="activity:1")
+    assert job_queue.get_counts() == {"pending": 1, "running": 1}
+
+    job_queue.complete(running)
+    assert job_queue.claim().payload == {"aspect_type": "delete"}
+    assert job_queue.claim() is None
+
+
+def test_claim_oldest_available(job_queue):
+    job_queue.enqueue("backfill", {"page": 2}, delay=3600)
+    job_queue.enqueue("backfill", {"page": 1})
+    assert job_queue.claim().payload == {"page": 1}
+    # The delayed job is not available yet
+    assert job_queue.claim() is None
+
+
+def test_fail_retry_then_failed(job_queue, monkeypatch):
+    monkeypatch.setattr(job_queue, "max_attempts", 2)
+    job_queue.enqueue("activity", {"id": 1})
+    job = job_queue.claim()
+    job_queue.fail(job, "error")
+    # Retried later (backoff)
+    assert job_queue.claim() is None
+    assert job_queue.get_counts() == {"pending": 1}
+
+    with closing(job_queue.connect()) as conn:
+        conn.execute("UPDATE jobs SET available_at = 0")
+    job = job_queue.claim()
+    assert job.attempts == 2
+    job_queue.fail(job, "error")
+    assert job_queue.get_counts() == {"failed": 1}
+
+
+def test_postpone_not_counted(job_queue):
+    job_queue.enqueue("activity", {"id": 1})
+    job_queue.postpone(job_queue.claim(), delay=0)
+    assert job_queue.claim().attempts == 1
+
+
+def test_job_of_dead_worker_claimed_again(job_queue, monkeypatch):
+    job_queue.enqueue("activity", {"id": 1})
+    job = job_queue.claim()
+    assert job_queue.claim() is None
+
+    monkeypatch.setattr(job_queue, "visibility_timeout", -1)
+    claimed_again = job_queue.claim()
+    assert (claimed_again.id, claimed_again.attempts) == (job.id, 2)
+
+
+def test_concurrent_workers_claim_each_job_once(job_queue):
+    for page in range(200):
+        job_queue.enqueue("backfill", {"page": page})
+
+    claimed = []
+
+    def worker():
+        # Each worker has its own connections, like the gunicorn workers
+        worker_queue = JobQueue(path=job_queue.path)
+        while (job := worker_queue.claim()) is not None:
+            claimed.append(job.payload["page"])
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == list(range(200))
+    assert job_queue.get_counts() == {"running": 200}
@@ -0,0 +1,96 @@
+import numpy as np
+import polyline
+import pytest
+
+from dash_apps.run_together.polyline_simplification import (
+    encode_positions,
+    get_fit_zoom,
+    get_meters_per_pixel,
+    simplify_for_zoom,
+    simplify_rdp,
+)
+
+
+def get_distances_to_segments(points: np.ndarray, indexes: np.ndarray) -> np.ndarray:
+    """
+    Distance of each point to the line through the two points kept around it (the
+    line of its segment in the simplified polyline)
+    """
+    distances = np.zeros(len(points))
+    for start, end in zip(indexes[:-1], indexes[1:]):
+        vector = points[end] - points[start]
+        relative = points[start : end + 1] - points[start]
+        length = np.hypot(*vector)
+        distances[start : end + 1] = (
+            np.abs(vector[0] * relative[:, 1] - vector[1] * relative[:, 0]) / length
+            if length
+            else np.hypot(relative[:, 0], relative[:, 1])
+        )
+    return distances
+
+
+@pytest.mark.parametrize("n_points", [0, 1, 2])
+def test_less_than_three_points(n_points):
+    points = np.arange(2 * n_points, dtype=np.float64).reshape(-1, 2)
+    np.testing.assert_array_equal(simplify_rdp(points, 1.0), np.arange(n_points))
+    np.testing.assert_array_equal(simplify_for_zoom(points, 10), np.arange(n_points))
+
+
+def test_collinear_points_only_ends():
+    x = np.linspace(0, 1000, 500)
+    np.testing.assert_array_equal(
+        simplify_rdp(np.column_stack((x, 0.5 * x)), 0.01), [0, 499]
+    )
+
+
+def test_same_position():
+    """Activity without move (ex: treadmill with GPS): segments of length 0"""
+    points = np.zeros((100, 2))
+    points[50] = [0, 3]
+    np.testing.assert_array_equal(simplify_rdp(points, 1.0), [0, 50, 99])
+    np.testing.assert_array_equal(simplify_rdp(points, 5.0), [0, 99])
+
+
+@pytest.mark.parametrize("tolerance", [0.5, 2.0, 10.0])
+def test_points_within_tolerance(tolerance):
+    rng = np.random.default_rng(0)
+    points = np.cumsum(rng.normal(0, 3, (2000, 2)), axis=0)
+    indexes = simplify_rdp(points, tolerance)
+    assert indexes[0] == 0 and indexes[-1] == 1999
+    assert (np.diff(indexes) > 0).all()
+    assert len(indexes) < 2000
+    assert (get_distances_to_segments(points, indexes) <= tolerance).all()
+
+
+def test_more_points_when_zoom_in():
+    rng = np.random.default_rng(1)
+    angle = np.linspace(0, 2 * np.pi, 5000)
+    latlng = np.column_stack(
+        (48.85 + 0.02 * np.sin(angle), 2.35 + 0.03 * np.cos(angle))
+    ) + rng.normal(0, 2e-5, (5000, 2))
+    counts = [len(simplify_for_zoom(latlng, zoom)) for zoom in [10, 13, 16, 19]]
+    assert counts == sorted(counts)
+    assert counts[0] < 200 and counts[-1] > 1000
+
+
+def test_meters_per_pixel():
+    # Zoom 0: the equator (40075 km) on one tile of 256 pixels
+    assert get_meters_per_pixel(0, 0) == pytest.approx(40075016.69 / 256)
+    assert get_meters_per_pixel(1, 60) == pytest.approx(40075016.69 / 256 / 4)
+
+
+def test_fit_zoom():
+    bounds = [[48.83, 2.32], [48.87, 2.38]]
+    zoom = get_fit_zoom(bounds, width=800, height=600)
+    assert zoom == get_fit_zoom(bounds, width=800, height=600, max_zoom=zoom)
+    assert get_fit_zoom(bounds, width=1600, height=1200) == zoom + 1
+    # Single point: maximum zoom
+    assert get_fit_zoom([[48.85, 2.35], [48.85, 2.35]], 800, 600) == 18
+
+
+def test_encode_positions():
+    latlng = np.array([[48.85341, 2.3488], [48.85, 2.35]], dtype=np.float32)
+    assert polyline.decode(encode_positions(latlng)) == [
+        (48.85341, 2.3488),
+        (48.85, 2.35),
+    ]
@@ -0,0 +1,97 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dash_apps.run_together.race_goal import (
+    PROGRESS_WEEKS,
+    RIEGEL_EXPONENT,
+    get_race_predictions,
+    get_riegel_times,
+    get_vdot,
+    get_vdot_time,
+    get_volume_ramp,
+    get_week_buckets,
+    get_weekly_progress,
+)
+
+
+def test_riegel_times():
+    times = get_riegel_times(
+        times=np.array([1200.0, 2500.0]),
+        distances=np.array([5000.0, 10000.0]),
+        race_distance=10000,
+    )
+    np.testing.assert_allclose(times, [1200 * 2**RIEGEL_EXPONENT, 2500])
+
+
+@pytest.mark.parametrize(
+    "distance, time, vdot",
+    [
+        # Tables of Daniels' Running Formula
+        (5000, 19 * 60 + 57, 50),
+        (10000, 41 * 60 + 21, 50),
+        (42195, 3 * 3600 + 10 * 60 + 49, 50),
+        (5000, 30 * 60 + 40, 30),
+    ],
+)
+def test_vdot_daniels_tables(distance, time, vdot):
+    assert get_vdot(np.array([distance]), np.array([time]))[0] == pytest.approx(
+        vdot, abs=0.3
+    )
+
+
+@pytest.mark.parametrize("distance", [1000, 5000, 21097.5, 42195])
+@pytest.mark.parametrize("time_per_km", [180, 300, 420])
+def test_vdot_time_inverse_of_vdot(distance, time_per_km):
+    time = distance / 1000 * time_per_km
+    vdot = get_vdot(np.array([distance]), np.array([time]))[0]
+    assert get_vdot_time(vdot, distance) == pytest.approx(time, rel=1e-3)
+
+
+def test_race_predictions():
+    best_efforts_df = pd.DataFrame(
+        {"value": [400, 1000, 5000, 10000], "result": [70, 250, 1200, 2600]}
+    )
+    predictions = get_race_predictions(best_efforts_df, race_distance=21097.5)
+    # Riegel from the closest distance, VDOT from the best effort (the 5 km)
+    assert predictions["reference"] == 10000
+    assert predictions["riegel"] == pytest.approx(2600 * 2.10975**RIEGEL_EXPONENT)
+    assert predictions["vdot"] == pytest.approx(
+        get_vdot(np.array([5000.0]), np.array([1200.0]))[0]
+    )
+    assert predictions["vdot_time"] == pytest.approx(
+        get_vdot_time(predictions["vdot"], 21097.5)
+    )
+
+
+def test_race_predictions_without_effort():
+    best_efforts_df = pd.DataFrame({"value": [400], "result": [70]})
+    assert get_race_predictions(best_efforts_df, race_distance=5000) is None
+    assert get_race_predictions(best_efforts_df[:0], race_distance=5000) is None
+
+
+def test_week_buckets_over_new_year():
+    assert get_week_buckets(end_day=date(2021, 1, 5), weeks=3) == [
+        "2020-W52",
+        "2020-W53",
+        "2021-W01",
+    ]
+
+
+def test_weekly_progress_and_volume_ramp():
+    buckets = get_week_buckets(end_day=date(2024, 6, 5), weeks=PROGRESS_WEEKS)
+    # 20 km per week, then 30 km per week for the last 4 complete weeks
+    distance = [20000.0] * (PROGRESS_WEEKS - 5) + [30000.0] * 4 + [5000.0]
+    rollups_df = pd.DataFrame(
+        {"bucket": buckets, "distance": distance, "max_distance": distance}
+    ).drop(index=0)
+    weekly_progress = get_weekly_progress(rollups_df, end_day=date(2024, 6, 5))
+    assert weekly_progress.index.tolist() == buckets
+    assert weekly_progress["distance_km"].iloc[0] == 0
+    assert weekly_progress["long_run_km"].iloc[-1] == 5
+    assert get_volume_ramp(weekly_progress) == pytest.approx(0.5)
+
+    weekly_progress["distance_km"] = 0.0
+    assert get_volume_ramp(weekly_progress) is None
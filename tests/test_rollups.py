@@ -0,0 +1,118 @@
+from contextlib import closing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dash_apps.run_together.activity_store import ActivityStore
+from dash_apps.run_together.rollups import ROLLUP_PERIODS, get_rollup_bucket
+from tests.conftest import COLUMNS, get_saved_activities, make_activities
+
+
+def get_full_rollups(activity_store: ActivityStore, period: str) -> pd.DataFrame:
+    """Rollups aggregated from scratch from all the activities saved"""
+    activities = pd.DataFrame(get_saved_activities(activity_store))
+    activities["bucket"] = [
+        get_rollup_bucket(period, x) for x in activities["start_date_local"]
+    ]
+    activities["heartrate_time"] = activities["moving_time"].where(
+        activities["average_heartrate"].notna()
+    )
+    activities["heartrate_sum"] = (
+        activities["average_heartrate"] * activities["moving_time"]
+    )
+    rollups = activities.groupby(["type", "bucket"]).agg(
+        distance=("distance", "sum"),
+        moving_time=("moving_time", "sum"),
+        total_elevation_gain=("total_elevation_gain", "sum"),
+        count=("id", "count"),
+        heartrate_time=("heartrate_time", "sum"),
+        heartrate_sum=("heartrate_sum", "sum"),
+        max_distance=("distance", "max"),
+    )
+    rollups["average_heartrate"] = rollups["heartrate_sum"] / rollups[
+        "heartrate_time"
+    ].replace(0, np.nan)
+    return rollups.drop(columns=["heartrate_time", "heartrate_sum"])
+
+
+def assert_rollups_equal(activity_store: ActivityStore):
+    for period in ROLLUP_PERIODS:
+        expected = get_full_rollups(activity_store, period)
+        for activity_type in ["Run", "Ride"]:
+            saved = pd.DataFrame(
+                activity_store.get_rollups(
+                    period=period,
+                    start_bucket="",
+                    end_bucket="~",
+                    activity_type=activity_type,
+                ),
+                columns=["bucket"] + list(expected.columns),
+            ).set_index("bucket")
+            if activity_type not in expected.index:
+                assert saved.empty
+                continue
+            pd.testing.assert_frame_equal(
+                saved.astype(np.float64),
+                expected.loc[activity_type][saved.columns].astype(np.float64),
+                check_names=False,
+            )
+
+
+@pytest.mark.parametrize(
+    "period, start_date_local, bucket",
+    [
+        ("day", "2024-01-31T09:00:00", "2024-01-31"),
+        ("month", "2024-01-31T09:00:00", "2024-01"),
+        ("year", "2024-01-31T09:00:00", "2024"),
+        ("week", "2024-01-31T09:00:00", "2024-W05"),
+        # ISO week of the previous / next year
+        ("week", "2021-01-01T09:00:00", "2020-W53"),
+        ("week", "2024-12-30T09:00:00", "2025-W01"),
+    ],
+)
+def test_get_rollup_bucket(period, start_date_local, bucket):
+    assert get_rollup_bucket(period, start_date_local) == bucket
+
+
+def test_touched_buckets_match_full_aggregation(activity_store):
+    """
+    Only the buckets of the activities saved / deleted are computed again: the
+    rollups are the ones aggregated from all the activities
+    """
+    rng = np.random.default_rng(0)
+    # Around the new year: ISO weeks over two years
+    start = datetime(2020, 12, 1)
+    history = make_activities(list(range(1, 201)), start=start, days=500, rng=rng)
+    for batch in np.array_split(rng.permutation(200), 4):
+        activity_store.save_activities(
+            {column: [values[i] for i in batch] for column, values in history.items()}
+        )
+        assert_rollups_equal(activity_store)
+
+    # Activities moved to another bucket, or changed to another type
+    moved = make_activities([5, 50, 120], start=start, days=500, rng=rng)
+    moved["type"] = ["Ride", "Run", "Ride"]
+    activity_store.save_activities(moved)
+    assert_rollups_equal(activity_store)
+
+    activity_store.delete_activities([1, 2, 3, 50, 1000])
+    assert_rollups_equal(activity_store)
+
+
+def test_rollups_of_existing_store(data_dir):
+    """A store created before the rollups aggregates all its activities"""
+    activity_store = ActivityStore(athlete_id=1, columns=COLUMNS)
+    activity_store.save_activities(
+        make_activities(
+            list(range(1, 51)),
+            start=datetime(2024, 1, 1),
+            days=90,
+            rng=np.random.default_rng(1),
+        )
+    )
+    with closing(activity_store.connect()) as conn, conn:
+        conn.execute("DROP TABLE rollups")
+
+    assert_rollups_equal(ActivityStore(athlete_id=1, columns=COLUMNS))
@@ -0,0 +1,98 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from dash_apps.run_together import rate_budget, strava_http, strava_manager
+from dash_apps.run_together.rate_budget import (
+    BACKGROUND,
+    INTERACTIVE,
+    RATE_LIMIT_WINDOW,
+    RateLimitBudgetExceeded,
+    get_rate_limit_budget,
+    strava_priority,
+)
+from dash_apps.run_together.strava_http import create_http_session
+from dash_apps.run_together.strava_manager import (
+    StravaManager,
+    get_strava_activity_column,
+)
+
+
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    """Strava API answering 429: the 15 minutes limit is reached"""
+
+    requests_count = 0
+
+    def do_GET(self):
+        RateLimitedHandler.requests_count += 1
+        self.send_response(429)
+        self.send_header("X-RateLimit-Limit", "100,1000")
+        self.send_header("X-RateLimit-Usage", "100,356")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def strava_api_url(monkeypatch):
+    """Local server in place of the Strava API"""
+    RateLimitedHandler.requests_count = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RateLimitedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}/api/v3"
+    monkeypatch.setattr(strava_http, "STRAVA_API_URL", url)
+    monkeypatch.setattr(strava_manager, "STRAVA_API_URL", url)
+    monkeypatch.setattr(strava_http.StravaRetry, "max_rate_limit_wait", 0)
+    monkeypatch.setattr(rate_budget, "_rate_limit_budget", None)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def test_rate_limit_reset_later_raises(strava_api_url):
+    """
+    The reset is later than max_rate_limit_wait: no retry, the usage of the 429 is
+    saved in the budget and the call raises RateLimitBudgetExceeded
+    """
+    with strava_priority(BACKGROUND), pytest.raises(RateLimitBudgetExceeded) as error:
+        create_http_session().get(f"{strava_api_url}/activities/1")
+    assert error.value.priority == BACKGROUND
+    assert 0 < error.value.wait <= RATE_LIMIT_WINDOW
+    assert RateLimitedHandler.requests_count == 1
+
+    budget = get_rate_limit_budget()
+    assert budget.get_usage()["short_usage"] == 100
+    assert budget.get_wait(INTERACTIVE) > 0
+
+
+@pytest.fixture
+def rate_limited_manager(strava_api_url, monkeypatch) -> StravaManager:
+    """StravaManager of an athlete with one activity saved in the store"""
+    monkeypatch.setenv("stravaClientId", "1")
+    monkeypatch.setenv("stravaClientSecret", "secret")
+    manager = StravaManager(session=False)
+    manager.athlete_id = 1
+    manager.strava_client.access_token = "token"
+    columns = ["id"] + get_strava_activity_column()
+    activity = {column: [None] for column in columns}
+    activity.update(id=[42], name=["Morning Run"], type=["Run"])
+    manager.activity_store.save_activities(activity)
+    return manager
+
+
+def test_activity_bundle_near_rate_limit(rate_limited_manager):
+    """The user sees the summary saved in the store, without stream and laps"""
+    bundle = rate_limited_manager.get_activity_bundle(activity_id=42)
+    assert bundle["activity"]["name"] == "Morning Run"
+    assert bundle["stream"] is None
+    assert bundle["laps"] is None
+
+
+def test_activity_bundle_of_job_near_rate_limit(rate_limited_manager):
+    """A background job is postponed: the rate limit is raised"""
+    with strava_priority(BACKGROUND), pytest.raises(RateLimitBudgetExceeded):
+        rate_limited_manager.get_activity_bundle(activity_id=42, resources=("stream",))
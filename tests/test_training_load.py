@@ -0,0 +1,146 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dash_apps.run_together.activity_store import ActivityStore
+from dash_apps.run_together.training_load import (
+    ATL_DAYS,
+    CTL_DAYS,
+    HeartRateProfile,
+    extend_training_load,
+    get_activities_load,
+    get_daily_load,
+    get_training_load,
+)
+from tests.conftest import get_saved_activities, make_activities
+
+
+def get_full_training_load(activity_store: ActivityStore) -> pd.DataFrame:
+    """Training load computed from scratch from all the activities saved"""
+    activities = get_saved_activities(activity_store)
+    days = np.array([x[:10] for x in activities["start_date_local"]], "datetime64[D]")
+    load = get_activities_load(
+        moving_time=np.array(activities["moving_time"], dtype=np.float64),
+        average_heartrate=np.array(activities["average_heartrate"], dtype=np.float64),
+        profile=HeartRateProfile.from_env(),
+    )
+    return get_training_load(
+        get_daily_load(
+            days=days,
+            load=load,
+            start_day=days.min().astype(date),
+            end_day=days.max().astype(date),
+        )
+    )
+
+
+def get_saved_training_load(activity_store: ActivityStore) -> pd.DataFrame:
+    rows = activity_store.get_training_load(start_day="", end_day="9999")
+    return pd.DataFrame(rows).set_index("day")
+
+
+def assert_training_load_equal(activity_store: ActivityStore):
+    expected = get_full_training_load(activity_store)
+    saved = get_saved_training_load(activity_store)
+    assert saved.index.tolist() == expected.index.strftime("%Y-%m-%d").tolist()
+    for column in ["load", "ctl", "atl"]:
+        np.testing.assert_allclose(saved[column], expected[column], rtol=1e-9)
+
+
+def test_get_training_load_recurrence():
+    rng = np.random.default_rng(0)
+    daily_load = pd.Series(
+        rng.uniform(0, 150, 400) * (rng.random(400) < 0.6),
+        index=pd.date_range("2024-01-01", periods=400, freq="D"),
+    )
+    training_load = get_training_load(daily_load, initial=(30.0, 20.0))
+
+    ctl, atl = 30.0, 20.0
+    for day, load in daily_load.items():
+        ctl += (load - ctl) / CTL_DAYS
+        atl += (load - atl) / ATL_DAYS
+        assert training_load.loc[day, "ctl"] == pytest.approx(ctl)
+        assert training_load.loc[day, "atl"] == pytest.approx(atl)
+        assert training_load.loc[day, "tsb"] == pytest.approx(ctl - atl)
+
+
+def test_get_training_load_continued():
+    """Computed in two parts from the values of the day before: same values"""
+    rng = np.random.default_rng(1)
+    daily_load = pd.Series(
+        rng.uniform(0, 150, 200),
+        index=pd.date_range("2024-01-01", periods=200, freq="D"),
+    )
+    full = get_training_load(daily_load)
+    first = get_training_load(daily_load[:120])
+    second = get_training_load(
+        daily_load[120:], initial=tuple(first.iloc[-1][["ctl", "atl"]])
+    )
+    pd.testing.assert_frame_equal(pd.concat([first, second]), full)
+
+
+def test_get_daily_load_sum_per_day():
+    days = np.array(["2024-01-02", "2024-01-02", "2024-01-04", "2023-12-31"])
+    daily_load = get_daily_load(
+        days=days,
+        load=np.array([10.0, 5.0, 7.0, 100.0]),
+        start_day=date(2024, 1, 1),
+        end_day=date(2024, 1, 5),
+    )
+    assert daily_load.tolist() == [0.0, 15.0, 0.0, 7.0, 0.0]
+
+
+def test_extend_training_load():
+    daily_load = pd.Series(
+        [100.0, 50.0], index=pd.date_range("2024-01-01", periods=2, freq="D")
+    )
+    extended = extend_training_load(get_training_load(daily_load), date(2024, 1, 20))
+    rest_days = pd.Series(0.0, index=pd.date_range("2024-01-03", "2024-01-20"))
+    full = get_training_load(pd.concat([daily_load, rest_days]))
+    np.testing.assert_allclose(extended.to_numpy(), full.to_numpy())
+
+
+def test_incremental_update_matches_full_recompute(activity_store):
+    """
+    Activities saved in batches out of order, moved to another day and deleted: the
+    training load updated from the first day modified is the one computed from
+    scratch
+    """
+    rng = np.random.default_rng(2)
+    start = datetime(2022, 1, 1)
+    history = make_activities(list(range(1, 301)), start=start, days=730, rng=rng)
+    batches = np.array_split(rng.permutation(300), 5)
+    for batch in batches:
+        activity_store.save_activities(
+            {column: [values[i] for i in batch] for column, values in history.items()}
+        )
+        assert_training_load_equal(activity_store)
+
+    # Activities of the history moved to other days
+    activity_store.save_activities(
+        make_activities([10, 150, 299], start=start, days=730, rng=rng)
+    )
+    assert_training_load_equal(activity_store)
+
+    # The first and the last activities deleted
+    activities = get_saved_activities(activity_store)
+    order = np.argsort(activities["start_date_local"])
+    activity_store.delete_activities(
+        [activities["id"][order[0]], activities["id"][order[-1]], 42]
+    )
+    assert_training_load_equal(activity_store)
+
+
+def test_profile_change_recomputes_history(activity_store, monkeypatch):
+    rng = np.random.default_rng(3)
+    start = datetime(2023, 1, 1)
+    activity_store.save_activities(
+        make_activities(list(range(1, 101)), start=start, days=365, rng=rng)
+    )
+    monkeypatch.setenv("maxHeartrate", "200")
+    activity_store.save_activities(
+        make_activities([101], start=datetime(2023, 12, 31), days=1, rng=rng)
+    )
+    assert_training_load_equal(activity_store)